@@ -53,8 +53,12 @@ from typing import Callable, Iterable
 from collections import namedtuple
 from prettyprinter import pformat
 
+from thoth_notebooks.instrumentation import instrument
+
 logger = logging.getLogger()
 
+%load_ext thoth_notebooks.instrumentation
+
 # %% {"require": ["notebook/js/codecell"], "init_cell": true}
 import pandas as pd
 import numpy as np
@@ -238,17 +242,31 @@ filter_dfs(df_structure, "script")
 # %% {"hidden": true}
 filter_dfs(df_structure, "script_sha256")
 
+# %% [markdown] {"hidden": true}
+# The structure above describes a single document only. Build the schema catalog of the whole corpus to see how often each key path is present, which types are observed and how many distinct values it has (paths constant across the corpus are candidates for dropping):
+
+# %% {"hidden": true}
+from thoth_notebooks.schema import SchemaCatalog
+
+schema_catalog = SchemaCatalog().update(document for _, document in inspection_store.iterate_results())
+schema_catalog.save("inspection-schema.pickle")
+
+schema_catalog.query("job_log__hwinfo", depth=3)
+
 # %% [markdown] {"hidden": true}
 # ---
 # %% [markdown] {"heading_collapsed": true}
 # ## Mapping InspectionRun JSON to pandas DataFrame
 
 # %% {"init_cell": true, "hidden": true}
+from thoth_notebooks.log_store import LogStore
+
+log_store = LogStore("build_logs")
 inspection_results = []
 
 for document_id, document in inspection_store.iterate_results():
-    # pop build logs to save some memory (not necessary for now)
-    document["build_log"] = None
+    # keep only a handle of the compressed build log to save memory, the log is loaded on access
+    document["build_log"] = log_store.put(document_id, document["build_log"])
 
     inspection_results.append(document)
 
@@ -347,64 +365,8 @@ df.drop(rejected.index, axis=1, inplace=True)
 # %% [markdown] {"hidden": true}
 # ---
 
-# %% {"init_cell": true, "code_folding": [6], "hidden": true}
-def process_inspection_results(
-    inspection_results: List[dict],
-    exclude: Union[list, set] = None,
-    apply: List[Tuple] = None,
-    drop: bool = True,
-    verbose: bool = False,
-) -> pd.DataFrame:
-    """Process inspection result into pd.DataFrame."""
-    if not inspection_results:
-        return ValueError("Empty iterable provided.")
-
-    exclude = exclude or []
-    apply = apply or ()
-
-    df = json_normalize(
-        inspection_results, sep="__"
-    )  # each row resembles InspectionResult
-
-    if len(df) <= 1:
-        return df
-
-    for regex, func in apply:
-        for col in df.filter(regex=regex).columns:
-            df[col] = df[col].apply(func)
-
-    keys = [k for k in inspection_results[0] if not k in exclude]
-    for k in keys:
-        if k in exclude:
-            continue
-        d = df.filter(regex=k)
-        p = profile(d)
-
-        rejected = (
-            p.description_set["variables"]
-            .query("distinct_count <= 1 & type != 'UNSUPPORTED'")
-            .filter(regex="^((?!version).)*$", axis=0)
-        )  # explicitly include versions
-
-        if verbose:
-            print("Rejected columns: ", rejected.index)
-
-        if drop:
-            df.drop(rejected.index, axis=1, inplace=True)
-
-    df = (
-        df.eval(
-            "status__job__duration   = status__job__finished_at   - status__job__started_at",
-            engine="python"
-        )
-        .eval(
-            "status__build__duration = status__build__finished_at - status__build__started_at",
-            engine="python"
-        )
-    )
-
-    return df
-
+# %% {"init_cell": true, "hidden": true}
+from thoth_notebooks.inspection import process_inspection_results
 
 # %% {"hidden": true}
 df = process_inspection_results(
@@ -552,205 +514,17 @@ df_duration.job_duration.iplot(
 # ## Library usage
 
 
-# %% {"code_folding": [8, 65, 81, 100, 175], "init_cell": true}
-# -*- coding: utf-8 -*-
-
-"""Thoth InspectionRun dashboard app."""
-
+# %% {"init_cell": true}
 pd.set_option("precision", 4)
 pd.set_option("colheader_justify", "center")
 
-
-def create_duration_dataframe(inspection_df: pd.DataFrame):
-    """Compute statistics and duration DataFrame."""
-    if len(inspection_df) <= 0:
-        raise ValueError("Empty DataFrame provided")
-
-    try:
-        inspection_df.drop("build_log", axis=1, inplace=True)
-    except KeyError:
-        pass
-
-    data = (
-        inspection_df.filter(like="duration")
-        .rename(columns=lambda s: s.replace("status__", "").replace("__", "_"))
-        .apply(lambda ts: pd.to_timedelta(ts).dt.total_seconds())
-    )
-
-    def compute_duration_stats(group):
-        return (
-            group.eval(
-                "job_duration_mean           = job_duration.mean()", engine="python"
-            )
-            .eval(
-                "job_duration_upper_bound    = job_duration + job_duration.std()",
-                engine="python",
-            )
-            .eval(
-                "job_duration_lower_bound    = job_duration - job_duration.std()",
-                engine="python",
-            )
-            .eval(
-                "build_duration_mean         = build_duration.mean()", engine="python"
-            )
-            .eval(
-                "build_duration_upper_bound  = build_duration + build_duration.std()",
-                engine="python",
-            )
-            .eval(
-                "build_duration_lower_bound  = build_duration - build_duration.std()",
-                engine="python",
-            )
-        )
-
-    if isinstance(inspection_df.index, pd.MultiIndex):
-        n_levels = len(inspection_df.index.levels)
-
-        # compute duration stats for each group separately
-        data = data.groupby(level=list(range(n_levels - 1)), sort=False).apply(
-            compute_duration_stats
-        )
-    else:
-        data = compute_duration_stats(data)
-
-    return data.round(4)
-
-
-def create_duration_box(
-    data: pd.DataFrame, columns: Union[str, List[str]] = None, **kwargs
-):
-    """Create duration Box plot."""
-    columns = columns if columns is not None else data.filter(regex="duration$").columns
-
-    figure = data[columns].iplot(
-        kind="box",
-        title=kwargs.pop("title", "InspectionRun duration"),
-        yTitle="duration [s]",
-        asFigure=True,
-    )
-
-    return figure
-
-
-def create_duration_scatter(
-    data: pd.DataFrame, columns: Union[str, List[str]] = None, **kwargs
-):
-    columns = columns if columns is not None else data.filter(regex="duration$").columns
-
-    figure = data[columns].iplot(
-        kind="scatter",
-        title=kwargs.pop("title", "InspectionRun duration"),
-        yTitle="duration [s]",
-        xTitle="inspection ID",
-        asFigure=True,
-    )
-
-    return figure
-
-
-def create_duration_scatter_with_bounds(
-    data: pd.DataFrame,
-    col: str,
-    index: Union[list, pd.Index, pd.RangeIndex] = None,
-    **kwargs,
-):
-    """Create duration Scatter plot."""
-    df_duration = (
-        data[[col]]
-        .eval(f"upper_bound = {col} + {col}.std()", engine="python")
-        .eval(f"lower_bound = {col} - {col}.std()", engine="python")
-    )
-
-    index = index if index is not None else df_duration.index
-
-    if isinstance(index, pd.MultiIndex):
-        index = (
-            index.levels[-1] if len(index.levels[-1]) == len(df) else np.arange(len(df))
-        )
-
-    upper_bound = go.Scatter(
-        name="Upper Bound",
-        x=index,
-        y=df_duration.upper_bound,
-        mode="lines",
-        marker=dict(color="lightgray"),
-        line=dict(width=0),
-        fillcolor="rgba(68, 68, 68, 0.3)",
-        fill="tonexty",
-    )
-
-    trace = go.Scatter(
-        name="Duration",
-        x=index,
-        y=df_duration[col],
-        mode="lines",
-        line=dict(color="rgb(31, 119, 180)"),
-        fillcolor="rgba(68, 68, 68, 0.3)",
-        fill="tonexty",
-    )
-
-    lower_bound = go.Scatter(
-        name="Lower Bound",
-        x=index,
-        y=df_duration.lower_bound,
-        marker=dict(color="lightgray"),
-        line=dict(width=0),
-        mode="lines",
-    )
-
-    data = [lower_bound, trace, upper_bound]
-    m = df_duration[col].mean()
-
-    layout = go.Layout(
-        yaxis=dict(title="duration [s]"),
-        xaxis=dict(title="inspection ID"),
-        shapes=[
-            {
-                "type": "line",
-                "x0": 0,
-                "x1": len(index),
-                "y0": m,
-                "y1": m,
-                "line": {"color": "red", "dash": "longdash"},
-            }
-        ],
-        title=kwargs.pop("title", "InspectionRun duration"),
-        showlegend=False,
-    )
-
-    fig = go.Figure(data=data, layout=layout)
-
-    return fig
-
-
-def create_duration_histogram(
-    data: pd.DataFrame,
-    columns: Union[str, List[str]] = None,
-    bins: int = None,
-    **kwargs,
-):
-    """Create duration histogram."""
-    columns = columns if columns is not None else data.filter(regex="duration$").columns
-
-    if not bins:
-        bins = np.max(
-            [
-                np.lib.histograms._hist_bin_auto(data[col].values, None)
-                for col in columns
-            ]
-        )
-
-    figure = data[columns].iplot(
-        title=kwargs.pop("title", "InspectionRun distribution"),
-        yTitle="count",
-        xTitle="durations [ms]",
-        kind="hist",
-        bins=int(np.ceil(bins)),
-        asFigure=True,
-    )
-
-    return figure
-
+from thoth_notebooks.inspection import (
+    create_duration_dataframe,
+    create_duration_box,
+    create_duration_scatter,
+    create_duration_scatter_with_bounds,
+    create_duration_histogram,
+)
 
 # %%
 df = process_inspection_results(
@@ -788,230 +562,71 @@ py.iplot(fig)
 
 
 # %% [markdown]
-# ## Grouping and filtering
+# ### Static export
 #
-# The goal of this part is to have a function which divides inspection jobs into “categories”, the function accepts loaded inspection JSON files and a key which should be used to split input inspection documents.
+# Figures are rendered on a pool of renderer processes started once, figures which did NOT change since the last run are skipped.
 
-# %% {"code_folding": [6], "init_cell": true}
-def _resolve_query(
-    query: str,
-    context: pd.DataFrame = None,
-    resolvers: tuple = None,
-    engine: str = None,
-    parser: str = "pandas",
-):
-    """Resolve query in the given context."""
-    from pandas.core.computation.expr import Expr
-    from pandas.core.computation.eval import _ensure_scope
-
-    if not query:
-        return context
-
-    q = query
-    q = re.sub(r"\[\(", "", q)
-    q = re.sub(r"\b(\d)+\b", "", q)
-    q = re.sub(r"[+\-\*:!<>=~.|&%]", " ", q)
-
-    # get our (possibly passed-in) scope
-    resolvers = resolvers or ()
-    if isinstance(context, pd.DataFrame):
-        index_resolvers = context._get_index_resolvers()
-        resolvers = tuple(resolvers) + (dict(context.iteritems()), index_resolvers)
-
-    repl = []
-    for idx, resolver in enumerate(resolvers):
-        keys = resolver.keys()
-
-        for op in set(q.split()):
-            matches = [(op, k) for k in keys if re.search(op, k)]
-
-            if len(matches) == 1:
-                op, key = matches[0]
-                repl.append((idx, op, resolver[key]))
-
-            elif len(matches) > 1:
-                raise KeyError(f"Ambiguous query operand provided: `{op}`")
-
-    for idx, op, val in repl:
-        resolvers[idx][op] = val
-
-    env = _ensure_scope(level=1, resolvers=resolvers, target=context)
-    expr = Expr(query, engine=engine, parser=parser, env=env)
-
-    def _resolve_operands(operands) -> list:
-        for op in operands:
-            # complex query
-            if op.is_scalar:
-                continue
-
-            if hasattr(op, "operands"):
-                yield from _resolve_operands(op.operands)
-
-            yield str(op)
-
-    operands = set(_resolve_operands(expr.terms.operands))
-
-    for op in operands:
-        try:
-            query = query.replace(op, env.resolvers[op].name)
-        except KeyError:
-            pass
-
-    return context.query(query)
-
-
-# %% {"code_folding": [0, 21], "init_cell": true}
-def _is_valid_group(df: pd.DataFrame, groupby: Union[str, List[str]]):
-    """"""
-    is_valid = False
-    try:
-        # check that grouping is possible
-        is_valid = len(df.groupby(groupby).indices) >= 1
-        if not is_valid:
-            logger.warning(f"Column '{groupby!s}' could NOT be used as index group. Dropped.")
-    
-    except TypeError:
-        logger.warning(f"Column '{groupby!s}' dtype NOT understood. Dropped")
-    
-    return is_valid
-
-
-def group_inspection_dataframe(
-    inspection_df: pd.DataFrame,
-    groupby: Union[str, list, set] = None,
-    exclude: Union[str, list, set] = None,
-    as_group: bool = False,
-    as_index: bool = False,
-):
-    """"""
-    groupby = groupby or []
-    exclude = exclude or []
-
-    if isinstance(groupby, str):
-        groupby = [groupby]
-
-    if isinstance(exclude, str):
-        exclude = [exclude]
-
-    groups = []
-
-    for key in groupby:
-        columns_idx = inspection_df.columns.str.contains(key)
-        columns = inspection_df.columns[columns_idx]
-
-        if not len(columns):
-            raise KeyError(
-                f"Could NOT find suitable column given the keys: `{groupby}`"
-            )
-
-        groups.extend(columns)
-
-    index_groups = []
+# %%
+from thoth_notebooks.figures import FigureExporter
 
-    for col in inspection_df[groups].columns:
-        # check that the column name is not excluded
-        if any(re.search(e, col) for e in exclude):
-            continue
+with FigureExporter("InspectionRun", max_workers=4, width=1200, height=600) as exporter:
+    exporter.add(
+        create_duration_box(df_duration, ["build_duration", "job_duration"]), "duration_box", folder_name="BoxPlots"
+    )
+    exporter.add(
+        create_duration_scatter(df_duration, "job_duration", title="InspectionRun job duration"),
+        "job_duration_scatter",
+        folder_name="ScatterPlots",
+    )
+    exporter.add(
+        create_duration_scatter(df_duration, "build_duration", title="InspectionRun build duration"),
+        "build_duration_scatter",
+        folder_name="ScatterPlots",
+    )
+    exporter.add(create_duration_histogram(df_duration, ["job_duration"]), "job_duration_histogram", folder_name="Histograms")
 
-        if _is_valid_group(inspection_df, col):
-            index_groups.append(col)
+exporter.stats
 
-    index_groups = pd.Series(index_groups).unique().tolist()
+# %% [markdown]
+# ### Stratified preview
+#
+# Instead of taking the first N inspection results, a fast preview keeps a random sample of at most `per_stratum` inspections of each batch (the identifier encoded in the inspection ID), sampled in a single pass over the listing of inspection IDs. Only the sampled inspection results are retrieved.
 
-    # construct multi-index if grouping is requested
-    group = inspection_df.groupby(index_groups)
-    
-    if as_group:
-        return group
-    
-    indices = group.indices
+# %%
+from thoth_notebooks.sampling import StratifiedSampler, drop_build_log, duration_statistics
 
-    levels = []
-    for level, values in indices.items():
-        if isinstance(level, tuple):
-            levels.extend([(*level, v) for v in values])
-        else:
-            levels.extend([(level, v) for v in values])
+sampler = StratifiedSampler(per_stratum=20, seed=42)
+sampler.update_ids(inspection_store.get_document_listing())
+sampler.fetch(inspection_store, transform=drop_build_log)
 
-    index = pd.MultiIndex.from_tuples(levels, names=[*index_groups, None])
-    
-    if as_index:
-        return index
+sampler.strata()
 
-    return (
-        inspection_df.set_index(index).drop(index_groups, axis=1).sort_index(level=-1)
-    )
+# %%
+df_preview = process_inspection_results(
+    sampler.documents(),
+    exclude=["build_log", "created", "inspection_id"],
+    apply=[("created|started_at|finished_at", pd.to_datetime)],
+    drop=False
+)
 
+duration_statistics(create_duration_dataframe(df_preview), sampler.labels(), sampler.population())
 
-# %% {"code_folding": [2], "init_cell": true}
-def filter_inspection_dataframe(
-    inspection_df: pd.DataFrame, like: str = None, regex: str = None, axis: int = None
-) -> pd.DataFrame:
-    """"""
-    if not any([like, regex]):
-        return inspection_df
-
-    filtered_df = inspection_df.filter(like=like, regex=regex, axis=axis)
-
-    if not any(filtered_df.columns.str.contains("duration")):
-        # duration columns must be present
-        filtered_df = filtered_df.join(inspection_df.filter(like="duration"))
-
-    inspection_df = filtered_df
-
-    return inspection_df
-
-
-# %% {"code_folding": [11], "init_cell": true}
-def query_inspection_dataframe(
-    inspection_df: List[dict],
-    *,
-    query: str = None,
-    groupby: Union[str, list, set] = None,
-    exclude: Union[str, list, set] = None,
-    like: str = None,
-    regex: str = None,
-    axis: int = None,
-    sort_index: Union[bool, int, List[int]] = True,
-    engine: str = None,
-) -> pd.DataFrame:
-    """Query inspection DataFrame.
-    
-    The order of operations is as follows:
-    
-        query resolution -> grouping -> filtering
-    
-    :param inspection_df: inspection DataFrame to be filtered as returned by `process_inspection_results`
-    :param groupby: column or list of columns to group the DataFrame by
-    :param exclude: patterns that should be excluded from grouping
-    :param query: pandas query to be evaluated on the filtered DataFrame
-    :param like, regex, axis: parameters passed to the `pd.DataFrame.filter` function
-    :param engine: engine to evaluate the query passed to `where` parameter, see `pd.eval` for more information
-        
-        The string provided does NOT need to match the whole column name, the function tries to determine
-        the most suitable column name automatically.
-        
-    :param **groupby_kwargs: additional parameters passed to the `pd.DataFrame.groupby` function
-    """
-    # resolve query
-    inspection_df = _resolve_query(query=query, context=inspection_df)
-
-    if groupby:
-        inspection_df = group_inspection_dataframe(
-            inspection_df, groupby=groupby, exclude=exclude
-        )
+# %% [markdown]
+# ## Grouping and filtering
+#
+# The goal of this part is to have a function which divides inspection jobs into “categories”, the function accepts loaded inspection JSON files and a key which should be used to split input inspection documents.
 
-    # filter
-    df = filter_inspection_dataframe(inspection_df, like=like, regex=regex, axis=axis)
+# %% {"init_cell": true}
+from thoth_notebooks.inspection import resolve_query
 
-    if sort_index:
-        if isinstance(sort_index, bool):
-            levels = np.arange(df.index.nlevels - 1).tolist()
-        else:
-            levels = sort_index
+# %% {"init_cell": true}
+from thoth_notebooks.inspection import group_inspection_dataframe
 
-        return df.sort_index(level=levels)
+# %% {"init_cell": true}
+from thoth_notebooks.inspection import filter_inspection_dataframe
 
+# %% {"init_cell": true}
+from thoth_notebooks.inspection import query_inspection_dataframe
 
 # %% {"init_cell": true}
 df = process_inspection_results(
@@ -1066,6 +681,16 @@ d = query_inspection_dataframe(
 )
 d.head()
 
+# %% [markdown]
+# Build logs of failed inspections are available through the log handles, logs missing in the local store (e.g. of inspections processed with logs discarded) are retrieved in bulk:
+
+# %%
+from thoth_notebooks.log_store import failed_inspection_ids
+
+failed_logs = log_store.prefetch(inspection_store, failed_inspection_ids(df))
+
+print(failed_logs[0].text if failed_logs else "No failed inspections.")
+
 # %% [markdown]
 # ### Creation of duration dataframe from filtered inspection results
 
@@ -1088,230 +713,18 @@ df_duration.head()
 # %% [markdown]
 # ## Visualizing grouped data
 
-# %% {"code_folding": [4, 34, 56], "init_cell": true}
-def get_column_group(
-    df: pd.DataFrame,
-    columns: Union[List[Union[str, int]], pd.Index] = None,
-    label: str = None,
-) -> pd.DataFrame:
-    """"""
-    columns = columns or df.columns
-
-    if all(isinstance(c, int) for c in columns):
-        columns = [df.columns[i] for i in columns]
-
-    if not label:
-        cols = [col.split("_") for col in columns]
-
-        common_words = set(functools.reduce(np.intersect1d, cols))
-        if common_words:
-            label = "_".join(w for w in cols[0] if w in common_words).strip("_")
-            
-            if len(label) <= 0:
-                label = str(tuple(columns))
-        else:
-            label = str(tuple(columns))
-
-    Group = namedtuple("Group", columns)
-
-    groups = []
-    for i, row in df[columns].iterrows():
-        groups.append(Group(*row))
-
-    return pd.Series(groups, name=label)
-
-
-def get_index_group(
-    df: pd.DataFrame, names: List[Union[str, int]] = None, label: str = None
-) -> pd.Series:
-    """"""
-    names = names or list(filter(bool, df.index.names[:-1]))
-
-    if all(isinstance(n, int) for n in names):
-        names = [df.index.names[i] for i in names]
-
-    index = df.index.to_frame(index=False)
-    group = get_column_group(index[names])
-
-    index = index.drop(columns=names)
-    group_indices = pd.DataFrame(group).join(index).values.tolist()
-
-    group_index = pd.MultiIndex.from_tuples(
-        group_indices, names=[group.name, *index.columns[:-1], None]
-    )
-
-    return group_index
-
-
-def set_index_group(
-    df: pd.DataFrame, names: List[Union[str, int]] = None, label: str = None
-) -> pd.DataFrame:
-    """"""
-    group_index = get_index_group(df, names, label)
-
-    return df.set_index(group_index)
-
+# %% {"init_cell": true}
+from thoth_notebooks.inspection import (
+    get_column_group,
+    get_index_group,
+    set_index_group,
+)
 
 # %% [markdown]
 # ---
 
-# %% {"code_folding": [], "init_cell": true}
-def make_subplots(
-    data: pd.DataFrame, columns: List[str] = None, *, kind: str = "box", **kwargs
-):
-    """"""
-    if kind not in ("box", "histogram", "scatter", "scatter_with_bounds"):
-        raise ValueError(f"Can NOT handle plot of kind: {kind}.")
-
-    index = data.index.droplevel(-1).unique()
-
-    if len(index.names) > 2:
-        logger.warning(
-            f"Can only handle hierarchical index of depth <= 2, got {len(index.names)}. Grouping index."
-        )
-
-        return make_subplots(
-            set_index_group(data, range(index.nlevels - 1)),
-            columns,
-            kind=kind,
-            **kwargs,
-        )
-
-    grid = ff.create_facet_grid(
-        data.reset_index(),
-        facet_row=index.names[1] if index.nlevels > 1 else None,
-        facet_col=index.names[0],
-        trace_type="box",  # box does not need data specification
-        ggplot2=True,
-    )
-
-    shape = np.shape(grid._grid_ref)[:-1]
-
-    sub_plots = tools.make_subplots(
-        rows=shape[0],
-        cols=shape[1],
-        shared_yaxes=kwargs.pop("shared_yaxes", True),
-        shared_xaxes=kwargs.pop("shared_xaxes", False),
-        print_grid=kwargs.pop("print_grid", False),
-    )
-
-    if isinstance(index, pd.MultiIndex):
-        index_grid = zip(*index.labels)
-    else:
-        index_grid = iter(np.transpose([
-            np.tile(np.arange(shape[1]), shape[0]), np.repeat(np.arange(shape[0]), shape[1])
-        ]))
-        
-    for idx, grp in data.groupby(level=np.arange(index.nlevels).tolist()):
-        if not isinstance(columns, str) and kind == "scatter_with_bounds":
-            if columns is None:
-                raise ValueError(
-                    "`scatter_with_bounds` requires `col` argument, not provided."
-                )
-            try:
-                columns, = columns
-            except ValueError:
-                raise ValueError(
-                    "`scatter_with_bounds` does not allow for multiple columns."
-                )
-
-        fig = eval(f"create_duration_{kind}(grp, columns, **kwargs)")
-
-        col, row = map(int, next(index_grid))  # col-first plotting
-        for trace in fig.data:
-            sub_plots.append_trace(trace, row + 1, col + 1)
-
-    layout = sub_plots.layout
-    layout.update(
-        title=kwargs.get("title", fig.layout.title),
-        shapes=grid.layout.shapes,
-        annotations=grid.layout.annotations,
-        showlegend=False,
-    )
-
-    x_dom_vals = [k for k in layout.to_plotly_json().keys() if "xaxis" in k]
-    y_dom_vals = [k for k in layout.to_plotly_json().keys() if "yaxis" in k]
-
-    layout_shapes = pd.DataFrame(layout.to_plotly_json()["shapes"]).sort_values(
-        ["x0", "y0"]
-    )
-
-    h_shapes = layout_shapes[~layout_shapes.x0.duplicated(keep=False)]
-    v_shapes = layout_shapes[~layout_shapes.y0.duplicated(keep=False)]
-    
-    # handle single-columns
-    h_shapes = h_shapes.query("y1 - y0 != 1")
-    v_shapes = v_shapes.query("x1 - x0 != 1")
-
-    # update axis domains and layout
-    for idx, x_axis in enumerate(x_dom_vals):
-        x0, x1 = h_shapes.iloc[idx % shape[1]][["x0", "x1"]]
-
-        layout[x_axis].domain = (x0 + 0.03, x1 - 0.03)
-        layout[x_axis].update(showticklabels=False, zeroline=False)
-
-    for idx, y_axis in enumerate(y_dom_vals):
-        y0, y1 = v_shapes.iloc[idx % shape[0]][["y0", "y1"]]
-
-        layout[y_axis].domain = (y0 + 0.03, y1 - 0.03)
-        layout[y_axis].update(zeroline=False)
-        
-    # correct annotation to match the relevant group and width
-    annot_df = pd.DataFrame(layout.to_plotly_json()['annotations']).sort_values(['x', 'y'])
-    annot_df = annot_df[annot_df.text.str.len() > 0]
-    
-    aw = min(  # annotation width magic
-        int(max(60 / shape[1] - ( 2 * shape[1]), 6)),
-        int(max(30 / shape[0] - ( 2 * shape[0]), 6))
-    )
-    
-    for i, annot_idx in enumerate(annot_df.index):
-        annot = layout.annotations[annot_idx]
-        
-        index_label: Union[str, Any] = annot["text"]
-        if isinstance(index, pd.MultiIndex):
-            index_axis = i >= shape[1]
-            if shape[0] == 1:
-                pass  # no worries, the order and label are aight
-            elif shape[1] == 1:
-                index_label = index.levels[index_axis][max(0, i - 1)]
-            else:
-                index_label = index.levels[index_axis][i % shape[1]]
-        
-        text: str = str(index_label)
-        
-        annot["text"] = re.sub(r"^(.{%d}).*(.{%d})$" % (aw, aw), "\g<1>...\g<2>", text)
-        annot["hovertext"] = "<br>".join(pformat(index_label).split("\n"))
-        
-    # add axis titles as plot annotations
-    layout.annotations = (
-        *layout.annotations,
-        {
-            "x": 0.5,
-            "y": -0.05,
-            "xref": "paper",
-            "yref": "paper",
-            "text": fig.layout.xaxis["title"]["text"],
-            "showarrow": False
-        },
-        {
-            "x": -0.05,
-            "y": 0.5,
-            "xref": "paper",
-            "yref": "paper",
-            "text": fig.layout.yaxis["title"]["text"],
-            "textangle": -90,
-            "showarrow": False
-        },
-    )
-    
-    # custom user layout updates
-    user_layout = kwargs.pop("layout", None)
-    if user_layout:
-        layout.update(user_layout)
-
-    return sub_plots
-
+# %% {"init_cell": true}
+from thoth_notebooks.inspection import make_subplots
 
 # %%
 d = query_inspection_dataframe(df, groupby=["platform", "ncpus"], exclude="node")
@@ -1339,22 +752,8 @@ d.head()
 # %% [markdown]
 # ## Further analysis
 
-# %% {"init_cell": true, "code_folding": []}
-def show_categories(inspection_df):
-    """List categories and if requested plot them"""
-    index = inspection_df.index.droplevel(-1).unique()
-    
-    for n, idx in enumerate(index.values):
-        print("\nCategory {}/{}".format(n + 1, len(index)))
-        if len(index.names) > 1:
-            for name, ind in zip(index.names, idx):
-                print(f"{name} :",ind)
-        else:
-            print(f"{index.names[0]} :",idx)
-
-        frame = inspection_df.loc[idx]
-        print("Number of rows (jobs) is:", frame.shape[0])
-
+# %% {"init_cell": true}
+from thoth_notebooks.inspection import show_categories
 
 # %%
 d = query_inspection_dataframe(df, groupby="specification__python__requirements_locked__default", exclude="node")
@@ -1386,5 +785,107 @@ dn = query_inspection_dataframe(df, groupby="platform__release", exclude="node")
 
 show_categories(dn)
 
+# %% [markdown]
+# ### Comparison of groups
+#
+# Differences of mean and median job duration between all pairs of hardware groups, with bootstrap confidence intervals. A difference is significant if its interval does NOT contain zero.
+
+# %%
+from thoth_notebooks.bootstrap import compare_groups
+
+d = query_inspection_dataframe(df, groupby=["platform", "ncpus"], exclude="node")
+d = d.join(create_duration_dataframe(d)[["job_duration"]])
+
+comparison = compare_groups(d, n_resamples=5000, seed=42)
+comparison[comparison.significant]
+
+# %% [markdown]
+# ### Software stacks
+#
+# Software stacks as a sparse matrix of inspections x (package name, package version), identical stacks share a hash and package versions are related to job duration without widening the frame.
+
+# %%
+from thoth_notebooks.stacks import PackageMatrix, stack_groups
+
+stacks = PackageMatrix.from_dataframe(df)
+
+stack_groups(stacks)
+
+# %%
+job_duration = create_duration_dataframe(df).job_duration.set_axis(df.inspection_id, axis=0)
+
+stacks.feature_effects(job_duration).head(20)
+
+# %% [markdown]
+# ### CPU features
+#
+# CPU flags encoded into bitset columns, queries on flags and grouping by x86-64 ISA level are vectorized bitwise operations.
+
+# %%
+from thoth_notebooks.cpu_flags import encode_flag_columns, flag_bitsets
+
+flags_column = df.filter(regex=r"hwinfo__cpu.*__flags$").columns[0]
+df_flags, cpu_flags = encode_flag_columns(df, column=flags_column)
+
+df_flags[cpu_flags.has(flag_bitsets(df_flags, flags_column), "avx512f")].inspection_id
+
+# %%
+d = query_inspection_dataframe(df_flags, groupby="isa_level", like="duration", exclude="node")
+
+show_categories(d)
+
+# %% [markdown]
+# ### Contention
+#
+# Number of other inspection jobs running at the start of each job and on average during its run, overall and on the same node, to check whether duration variance comes from overlapping jobs.
+
+# %%
+from thoth_notebooks.contention import add_contention_columns, running_jobs
+
+df = add_contention_columns(df)
+
+d = query_inspection_dataframe(df, groupby=["platform", "ncpus"], like="contention", exclude="node")
+d = d.join(create_duration_dataframe(d)[["job_duration"]])
+d.groupby(level=[0, 1]).corr()["job_duration"].unstack()
+
+# %%
+py.iplot(running_jobs(df).iplot(kind="scatter", title="Running inspection jobs", asFigure=True))
+
+# %% [markdown]
+# ### Duration regressions
+#
+# Inspections are processed in the order of their start, a CUSUM detector per hardware platform and software stack reports when jobs got slower together with the first offending inspections. The detector is persisted, next runs process only new inspections (use `backfill` to process the full history again). Inspections which started less than `lag` before the latest finished job are kept pending, so that jobs still running do NOT arrive after later ones were processed.
+
+# %%
+from pathlib import Path
+
+from thoth_notebooks.changepoint import RegressionDetector
+
+detector_path = Path("duration-regressions.pickle")
+if detector_path.exists():
+    detector = RegressionDetector.load(detector_path)
+else:
+    detector = RegressionDetector(
+        groupby=["platform", "ncpus", "requirements_locked__default"], column="job_duration", exclude="node"
+    )
+
+detector.update(df.join(create_duration_dataframe(df)[["job_duration"]]))
+detector.save(detector_path)
+
+detector.events()
+
 # %% [markdown]
 # ---
+
+# %% [markdown]
+# ## Instrumentation
+#
+# Wall time, CPU time, peak memory and row counts of the cells and library functions executed so far
+
+# %%
+from thoth_notebooks import instrumentation
+
+instrumentation.summary()
+
+# %%
+py.iplot(instrumentation.create_flame_chart())
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the columnar aggregation of adviser results from a fixture store."""
+
+import json
+
+import pandas as pd
+import pytest
+
+from thoth_notebooks.adviser import aggregate_adviser_results
+from thoth_notebooks.adviser import iter_justifications
+from thoth_notebooks.adviser import justification_counts
+from thoth_notebooks.fixtures import FixtureStore
+
+CVE = {"message": "Package has a CVE", "type": "WARNING", "package_name": "urllib3"}
+PINNED = {"message": "Package version pinned", "type": "INFO", "package_name": "tensorflow"}
+NO_OBSERVATIONS = {"message": "No observations for the stack", "type": "INFO"}
+
+
+def _document(index: int) -> dict:
+    """Adviser documents of two versions, newer and older report formats and failed runs."""
+    if index % 4 == 0:
+        return {"metadata": {"analyzer_version": "0.7.3"}, "result": {"error": True, "error_msg": "Resolution failed"}}
+
+    if index % 4 == 1:
+        report = [[[CVE, PINNED], {"requirements": {}}], [[CVE], {"requirements": {}}]]
+        return {"metadata": {"analyzer_version": "0.6.0"}, "result": {"error": False, "report": report}}
+
+    report = {"products": [{"justification": [CVE, PINNED]}, {"justification": None}], "stack_info": [NO_OBSERVATIONS]}
+    return {"metadata": {"analyzer_version": "0.7.3"}, "result": {"error": False, "report": report}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    fixtures_dir = tmp_path / "AdvisersResultsStore"
+    fixtures_dir.mkdir()
+    for i in range(40):
+        (fixtures_dir / f"adviser-{i:04d}.json").write_text(json.dumps(_document(i)))
+
+    store = FixtureStore(fixtures_dir=fixtures_dir)
+    store.connect()
+
+    return store
+
+
+def test_iter_justifications():
+    assert list(iter_justifications("adviser-0", _document(0))) == [("adviser-0", "Resolution failed", "ERROR", None)]
+
+    # older adviser: [[justification, project], ...]
+    messages = [row[1] for row in iter_justifications("adviser-1", _document(1))]
+    assert messages == [CVE["message"], PINNED["message"], CVE["message"]]
+
+    assert list(iter_justifications("adviser-2", _document(2))) == [
+        ("adviser-2", CVE["message"], "WARNING", "urllib3"),
+        ("adviser-2", PINNED["message"], "INFO", "tensorflow"),
+        ("adviser-2", NO_OBSERVATIONS["message"], "INFO", None),
+    ]
+
+    assert list(iter_justifications("adviser-3", {"result": {"report": None}})) == []
+
+
+def test_aggregate_adviser_results(store):
+    df = aggregate_adviser_results(store, adviser_version="0.7.3", max_workers=4)
+
+    # 10 failed runs and 20 reports of 3 justifications each
+    assert len(df) == 10 + 20 * 3
+    assert df["document_id"].nunique() == 30
+    assert not df["document_id"].isin([f"adviser-{i:04d}" for i in range(1, 40, 4)]).any()
+
+    for column in ("message", "type", "package_name"):
+        assert df[column].dtype == "category"
+
+    assert df.loc[df["type"] == "ERROR", "message"].unique().tolist() == ["Resolution failed"]
+    assert df["package_name"].isna().sum() == 10 + 20
+
+
+def test_chunks(store):
+    df = aggregate_adviser_results(store, max_workers=4)
+
+    # categorical columns of small chunks are concatenated into the same table
+    chunked = aggregate_adviser_results(store, max_workers=4, chunk_size=7)
+    for column in ("message", "type", "package_name"):
+        assert chunked[column].dtype == "category"
+    pd.testing.assert_frame_equal(chunked.astype(object), df.astype(object))
+
+    limited = aggregate_adviser_results(store, max_workers=4, limit=4)
+    assert limited["document_id"].unique().tolist() == [f"adviser-{i:04d}" for i in range(4)]
+
+    assert aggregate_adviser_results(store, adviser_version="0.1.0").empty
+
+
+def test_justification_counts(store):
+    histogram, heatmap = justification_counts(aggregate_adviser_results(store, max_workers=4))
+
+    assert histogram.to_dict() == {
+        CVE["message"]: 10 * 2 + 20,
+        PINNED["message"]: 10 + 20,
+        NO_OBSERVATIONS["message"]: 20,
+        "Resolution failed": 10,
+    }
+    assert histogram.index[0] == CVE["message"]
+    assert heatmap.loc[CVE["message"]].to_dict() == {"ERROR": 0, "INFO": 0, "WARNING": 40}
+    assert heatmap.loc["Resolution failed", "ERROR"] == 10
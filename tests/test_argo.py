@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of batch submission of Argo workflows against the in-process fake API."""
+
+import asyncio
+import threading
+
+import pytest
+
+from thoth_notebooks.argo import FakeArgoApi
+from thoth_notebooks.argo import FakeWatch
+from thoth_notebooks.argo import run_batch
+from thoth_notebooks.argo import submit_batch
+
+WORKFLOW = {"metadata": {"generateName": "inspection-batch-"}, "spec": {"arguments": {"parameters": []}}}
+
+
+class _CountingApi(FakeArgoApi):
+    """Fake API recording the maximum number of workflows running at once."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.running = 0
+        self.max_running = 0
+        self._counter_lock = threading.Lock()
+
+    def create_namespaced_workflow(self, namespace, body):
+        with self._counter_lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+        return super().create_namespaced_workflow(namespace, body)
+
+    def _set_phase(self, name, phase):
+        with self._counter_lock:
+            self.running -= 1
+
+        super()._set_phase(name, phase)
+
+
+class _FailingWatch(FakeWatch):
+    """Watch which fails as the API server would on an expired resource version."""
+
+    def stream(self, func, namespace, label_selector=None, **kwargs):
+        raise ConnectionError("Expired: too old resource version")
+        yield  # pragma: no cover
+
+
+def test_concurrency_limit():
+    api = _CountingApi(duration=lambda workflow: 0.02)
+
+    df = run_batch(
+        api, "argo", WORKFLOW, [{"identifier": i} for i in range(20)], max_concurrent=3, watch_cls=FakeWatch
+    )
+
+    assert len(df) == 20
+    assert 1 <= api.max_running <= 3
+
+
+def test_latency_table():
+    api = FakeArgoApi(duration=lambda workflow: 0.01, failure_rate=0.5, seed=42)
+
+    df = run_batch(api, "argo", WORKFLOW, [{"identifier": i} for i in range(10)], max_concurrent=5, watch_cls=FakeWatch)
+
+    assert df.index.name == "name"
+    assert df.index.is_unique
+    assert {"phase", "error", "queued", "create_latency", "start_latency", "completion_latency"} <= set(df.columns)
+    assert set(df["phase"]) <= {"Succeeded", "Failed"}
+    assert df["error"].isna().all()
+
+    assert (df["queued"] >= 0).all()
+    assert (df["create_latency"] >= 0).all()
+    assert (df["completion_latency"] >= df["create_latency"]).all()
+    assert (df["completion_latency"] >= df["start_latency"]).all()
+
+    for name in df.index:
+        parameters = api._workflows[name]["spec"]["arguments"]["parameters"]
+        assert [p["value"] for p in parameters] == [name.rsplit("-", 1)[1]]
+
+
+def test_timeout():
+    api = FakeArgoApi(duration=lambda workflow: 60)
+
+    df = run_batch(api, "argo", WORKFLOW, [{"identifier": 0}], timeout=0.1, watch_cls=FakeWatch)
+
+    assert df["phase"].tolist() == ["Timeout"]
+
+
+def test_failing_watch():
+    api = FakeArgoApi(duration=lambda workflow: 60)
+
+    with pytest.raises(RuntimeError, match="failed") as exc_info:
+        run_batch(api, "argo", WORKFLOW, [{"identifier": i} for i in range(5)], max_concurrent=2, watch_cls=_FailingWatch)
+
+    assert isinstance(exc_info.value.__cause__, ConnectionError)
+
+
+def test_empty_batch():
+    api = FakeArgoApi()
+
+    df = run_batch(api, "argo", WORKFLOW, [], watch_cls=FakeWatch)
+
+    assert df.empty
+    assert df.index.name == "name"
+    assert {"phase", "error", "queued", "create_latency", "start_latency", "completion_latency"} <= set(df.columns)
+    assert api._workflows == {}
+
+
+def test_submit_batch_in_running_loop():
+    async def main():
+        return await submit_batch(FakeArgoApi(), "argo", WORKFLOW, [{"identifier": 0}], watch_cls=FakeWatch)
+
+    loop = asyncio.new_event_loop()
+    try:
+        df = loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+    assert df["phase"].tolist() == ["Succeeded"]
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the parallel papermill runner of notebook templates."""
+
+import yaml
+
+import nbformat
+
+from nbformat.v4 import new_code_cell
+from nbformat.v4 import new_notebook
+
+from thoth_notebooks.batch import run_batch
+from thoth_notebooks.batch import split_parameters
+
+# glues the value the same way `scrapbook.glue` does, scrapbook is NOT needed in the kernel
+_GLUE = """\
+from IPython.display import display
+
+def glue(name, value):
+    scrap = {"name": name, "data": value, "encoder": "json", "version": 1}
+    display({"application/scrapbook.scrap.json+json": scrap}, raw=True, metadata={"scrapbook": {"name": name}})
+"""
+
+_BODY = """\
+import time
+
+identifier, = IDENTIFIERS_INSPECTION
+with open(f"{TIMES_DIR}/{identifier}", "w") as f:
+    f.write(str(time.time()))
+
+time.sleep(1)
+glue("identifier_length", len(identifier))
+
+with open(f"{TIMES_DIR}/{identifier}", "a") as f:
+    f.write(" " + str(time.time()))
+
+if identifier == "broken":
+    raise ValueError("broken identifier")
+"""
+
+
+def _template(path):
+    parameters = new_code_cell('IDENTIFIERS_INSPECTION = []\nTIMES_DIR = "."')
+    parameters.metadata["tags"] = ["parameters"]
+
+    nb = new_notebook(metadata={"kernelspec": {"name": "python3", "display_name": "Python 3", "language": "python"}})
+    nb.cells = [parameters, new_code_cell(_GLUE), new_code_cell(_BODY)]
+    nbformat.write(nb, str(path))
+
+    return path
+
+
+def test_split_parameters():
+    split = split_parameters({"IDENTIFIERS_INSPECTION": ["a", "b", "a"], "static_figure": True})
+
+    assert split == [
+        {"IDENTIFIERS_INSPECTION": ["a"], "static_figure": True},
+        {"IDENTIFIERS_INSPECTION": ["b"], "static_figure": True},
+    ]
+
+
+def test_run_batch(tmp_path):
+    template = _template(tmp_path / "template.ipynb")
+    times_dir = tmp_path / "times"
+    times_dir.mkdir()
+
+    identifiers = ["a", "bb", "broken", "dddd"]
+    report = run_batch(
+        template,
+        tmp_path / "output",
+        {"IDENTIFIERS_INSPECTION": identifiers, "TIMES_DIR": str(times_dir)},
+        max_workers=2,
+    )
+
+    # at most two notebooks were running at once
+    intervals = [tuple(map(float, (times_dir / i).read_text().split())) for i in identifiers]
+    running = [sum(start <= t < end for start, end in intervals) for t, _ in intervals]
+    assert max(running) <= 2
+    assert len({r["pid"] for r in report["results"]}) <= 2
+
+    assert [r["identifier"] for r in report["results"]] == identifiers
+    assert [r["status"] for r in report["results"]] == ["ok", "ok", "failed", "ok"]
+    assert report["succeeded"] == 3
+    assert report["failed"] == 1
+
+    broken = report["results"][2]
+    assert "broken identifier" in broken["error"]
+    assert broken["failed_cell"] is not None
+    assert broken["slowest_cells"][0]["source"] == "import time"
+
+    assert report["scraps"] == {"identifier_length": {"a": 1, "bb": 2, "broken": 6, "dddd": 4}}
+
+    with open(tmp_path / "output" / "report.yaml") as f:
+        assert yaml.safe_load(f) == report
+
+    merged = nbformat.read(report["merged_path"], as_version=4)
+    titles = [c.source for c in merged.cells if c.cell_type == "markdown" and c.source.startswith("# ")]
+    assert titles == [f"# {i}" for i in identifiers]
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the vectorized bootstrap comparison of groups."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from thoth_notebooks.bootstrap import _segment_statistics
+from thoth_notebooks.bootstrap import bootstrap_groups
+from thoth_notebooks.bootstrap import compare_groups
+
+
+def _grouped(seed: int = 42, n: int = 400) -> pd.DataFrame:
+    """Durations of three groups indexed by (platform, ncpus), the 4 CPU group is faster by 10 seconds."""
+    rng = np.random.default_rng(seed)
+
+    platform = np.repeat(["x86_64", "x86_64", "ppc64le"], n)
+    ncpus = np.repeat([2, 4, 2], n)
+    duration = rng.normal(100, 5, 3 * n) - 10 * (ncpus == 4)
+
+    index = pd.MultiIndex.from_arrays([platform, ncpus, np.arange(3 * n)], names=["platform", "ncpus", None])
+
+    return pd.DataFrame({"job_duration": duration}, index=index)
+
+
+def test_segment_statistics_match_numpy():
+    rng = np.random.default_rng(0)
+
+    sizes = np.array([1, 4, 5])
+    offsets = np.array([0, 1, 5])
+    sorted_values = np.concatenate([np.sort(rng.normal(size=s)) for s in sizes])
+
+    # each row of the index matrix resamples rows within their groups
+    indexes = np.concatenate([o + rng.integers(0, s, size=(50, s)) for o, s in zip(offsets, sizes)], axis=1)
+
+    for statistic, func in [("mean", np.mean), ("median", np.median)]:
+        expected = np.array(
+            [[func(sorted_values[row[o:o + s]]) for o, s in zip(offsets, sizes)] for row in indexes]
+        )
+        np.testing.assert_allclose(_segment_statistics(sorted_values, offsets, sizes, indexes, statistic), expected)
+
+
+def test_bootstrap_distribution_of_the_mean():
+    rng = np.random.default_rng(1)
+    values = np.concatenate([rng.normal(0, 1, 500), rng.normal(5, 2, 500)])
+    codes = np.repeat([0, 1], 500)
+
+    distribution = bootstrap_groups(values, codes, 2, statistics=("mean",), n_resamples=4000, seed=42)
+
+    assert distribution.shape == (1, 4000, 2)
+    # standard error of the mean is sigma / sqrt(n)
+    np.testing.assert_allclose(distribution[0].std(axis=0), [1 / np.sqrt(500), 2 / np.sqrt(500)], rtol=0.1)
+    np.testing.assert_allclose(distribution[0].mean(axis=0), [values[:500].mean(), values[500:].mean()], atol=0.02)
+
+
+def test_bootstrap_is_reproducible():
+    values = np.arange(20, dtype=np.float64)
+    codes = np.repeat([0, 1], 10)
+
+    first = bootstrap_groups(values, codes, 2, n_resamples=100, seed=42)
+    second = bootstrap_groups(values, codes, 2, n_resamples=100, seed=42, chunk_size=7)
+
+    np.testing.assert_array_equal(first, second)
+
+    with pytest.raises(ValueError):
+        bootstrap_groups(values, codes, 3, n_resamples=10)
+
+
+def test_compare_groups():
+    result = compare_groups(_grouped(), n_resamples=2000, seed=42)
+
+    assert result.index.names == ["column", "statistic", "group_a", "group_b"]
+    assert len(result) == 2 * 3  # (mean, median) x pairs of 3 groups
+
+    mean = result.xs(("job_duration", "mean")).reset_index()
+
+    def pair(group_a, group_b) -> pd.Series:
+        [row] = mean[(mean.group_a == group_a) & (mean.group_b == group_b)].to_dict("records")
+        return pd.Series(row)
+
+    fast = pair(("x86_64", 2), ("x86_64", 4))
+
+    # the true difference is 10 seconds, standard error of the difference is 5 * sqrt(2 / 400)
+    assert fast["ci_low"] < 10 < fast["ci_high"]
+    assert fast["ci_high"] - fast["ci_low"] == pytest.approx(2 * 1.96 * 5 * np.sqrt(2 / 400), rel=0.15)
+    assert fast["significant"]
+    assert fast["n_a"] == fast["n_b"] == 400
+
+    same = pair(("x86_64", 2), ("ppc64le", 2))
+    assert same["ci_low"] < same["difference"] < same["ci_high"]
+
+
+def test_compare_groups_by_level():
+    result = compare_groups(_grouped(), groupby="ncpus", statistics=("median",), n_resamples=500, seed=42)
+
+    assert result.index.get_level_values("group_a").tolist() == [2]
+    assert result.index.get_level_values("group_b").tolist() == [4]
+    assert result["n_a"].tolist() == [800]
+    assert result["significant"].all()
+
+
+def test_compare_groups_requires_groups():
+    df = _grouped().reset_index(drop=True)
+
+    with pytest.raises(ValueError):
+        compare_groups(df)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of reading build logs, naming their reports and caching their analyses."""
+
+import math
+import pickle
+import tracemalloc
+
+from thoth_notebooks.build_logs import AnalysisCache
+from thoth_notebooks.build_logs import fingerprint_log
+from thoth_notebooks.build_logs import read_log
+from thoth_notebooks.build_logs import report_name
+
+
+def test_read_log(tmp_path):
+    path = tmp_path / "build.log"
+    path.write_text("".join(f"line {i}\n" for i in range(10000)))
+
+    assert read_log(path) == path.read_text()
+    assert read_log(path, max_lines=2) == "line 9998\nline 9999\n"
+    # whole lines are dropped from the beginning of the log
+    assert read_log(path, max_size=25) == "line 9998\nline 9999\n"
+    assert read_log(path, max_lines=1, max_size=25) == "line 9999\n"
+
+
+def test_read_log_long_line(tmp_path):
+    path = tmp_path / "build.log"
+    path.write_text("start\n" + "x" * 100 + "\n")
+
+    assert read_log(path, max_size=10) == "x" * 9 + "\n"
+    assert read_log(path, max_size=None) == path.read_text()
+
+
+def test_read_log_memory_is_bounded(tmp_path):
+    path = tmp_path / "build.log"
+    with open(path, "w") as f:
+        for i in range(200000):
+            f.write(f"Collecting package-{i} from https://pypi.org/simple/package-{i}/\n")
+
+    assert path.stat().st_size > 10 * 2 ** 20
+
+    tracemalloc.start()
+    try:
+        log = read_log(path, max_size=2 ** 20)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(log) <= 2 ** 20
+    assert log.endswith("package-199999/\n")
+    assert peak < 4 * 2 ** 20
+
+
+def test_report_name(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+
+    name_a = report_name(tmp_path / "a" / "build.log")
+    name_b = report_name(tmp_path / "b" / "build.log")
+
+    assert name_a != name_b
+    assert name_a.startswith("build.log-") and name_a.endswith(".json")
+    assert report_name(tmp_path / "a" / "build.log") == name_a
+
+
+def test_fingerprint_log():
+    log = "Collecting numpy\nStored in directory: /tmp/pip-ephem-wheel-cache-_4menpyv/wheels/c6/6e/7d/ef751ae03b7d\n"
+    other = "Collecting numpy\nStored in directory: /tmp/pip-ephem-wheel-cache-x1y2z3/wheels/0a/1b/2c/0123456789ab\n"
+
+    assert fingerprint_log(log) == fingerprint_log(other)
+    assert fingerprint_log(log) != fingerprint_log("Collecting pandas\n")
+
+
+def test_cache_hits_and_misses():
+    cache = AnalysisCache()
+    log = "2020-01-01T10:00:00Z Collecting numpy\nERROR: No matching distribution found for numpy==0.0.1\n"
+
+    assert math.isnan(cache.stats["hit_rate"])
+
+    key = cache.key(log)
+    assert cache.get(key) is None
+    cache.put(key, {"handler": "pip"})
+
+    # the same failure logged at another time is a hit
+    assert cache.get(cache.key(log.replace("2020-01-01T10:00:00Z", "2020-01-02T03:04:05Z"))) == {"handler": "pip"}
+    assert cache.get(cache.key("Collecting pandas\n")) is None
+
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 2
+    assert cache.stats["hit_rate"] == 1 / 3
+
+
+def test_cache_evicts_least_recently_used():
+    cache = AnalysisCache(max_entries=2)
+
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+
+    cache.put("c", 3)
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats["evictions"] == 1
+
+
+def test_cache_size_bound():
+    value = "x" * 1000
+    size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    cache = AnalysisCache(max_size=int(2.5 * size))
+    for key in "abc":
+        cache.put(key, value)
+
+    assert len(cache) == 2
+    assert cache.size == 2 * size <= cache.max_size
+    assert cache.get("a") is None
+
+    # re-inserting the key does NOT count its size twice
+    cache.put("c", value)
+    assert cache.size == 2 * size
+
+    # values larger than the whole cache are NOT stored and do NOT evict anything
+    cache.put("large", "x" * (3 * size))
+    assert cache.get("large") is None
+    assert len(cache) == 2
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the content-addressed cache of template stages."""
+
+import pytest
+
+from thoth_notebooks.cache import StageCache
+from thoth_notebooks.cache import fingerprint
+
+
+class _Counter:
+    """Stage function counting its calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return args, kwargs
+
+
+class _Unhashable:
+    """Argument which can NOT be pickled nor hashed, e.g. a DataFrame holding open handles."""
+
+    def __reduce__(self):
+        raise TypeError("can NOT pickle")
+
+
+def test_parameters_are_part_of_the_key(tmp_path):
+    cache = StageCache(tmp_path)
+    func = _Counter()
+
+    assert cache.run("stage", func, ["a", "b"], limit=1, parameters={"limit": 1}) == ((["a", "b"],), {"limit": 1})
+    assert cache.run("stage", func, ["a", "b"], limit=1, parameters={"limit": 1}) == ((["a", "b"],), {"limit": 1})
+    assert func.calls == 1
+    assert cache.stats["stage"]["hit"]
+
+    cache.run("stage", func, ["a", "b"], limit=2, parameters={"limit": 2})
+    assert func.calls == 2
+
+
+def test_inputs_are_part_of_the_key(tmp_path):
+    cache = StageCache(tmp_path)
+    func = _Counter()
+
+    cache.run("stage", func, inputs={"cvut-6": ["inspection-b", "inspection-a"]})
+    cache.run("stage", func, inputs={"cvut-6": ["inspection-a", "inspection-b"]})
+    assert func.calls == 1
+
+    cache.run("stage", func, inputs={"cvut-7": ["inspection-a", "inspection-b"]})
+    assert func.calls == 2
+
+
+def test_arguments_are_not_hashed(tmp_path):
+    cache = StageCache(tmp_path)
+    upstream = cache.run("upstream", lambda: "result", parameters={"identifier": "cvut-6"})
+
+    calls = []
+
+    def downstream(result, data):
+        calls.append(data)
+        return result.upper()
+
+    assert cache.run("downstream", downstream, upstream, _Unhashable(), depends_on=["upstream"]) == "RESULT"
+    assert cache.run("downstream", downstream, upstream, _Unhashable(), depends_on=["upstream"]) == "RESULT"
+    assert len(calls) == 1
+
+
+def test_arguments_without_key(tmp_path):
+    cache = StageCache(tmp_path)
+
+    with pytest.raises(ValueError):
+        cache.run("stage", _Counter(), ["a"])
+
+
+def test_downstream_stages(tmp_path):
+    cache = StageCache(tmp_path)
+    downstream = _Counter()
+
+    upstream = cache.run("upstream", sorted, {"a", "b"}, parameters={"identifiers": ["a", "b"]})
+    cache.run("downstream", downstream, upstream, depends_on=["upstream"])
+    cache.run("downstream", downstream, upstream, depends_on=["upstream"])
+    assert downstream.calls == 1
+
+    upstream = cache.run("upstream", sorted, {"a", "b", "c"}, parameters={"identifiers": ["a", "b", "c"]})
+    cache.run("downstream", downstream, upstream, depends_on=["upstream"])
+    assert downstream.calls == 2
+
+
+def test_failed_stage_is_not_resolved(tmp_path):
+    cache = StageCache(tmp_path)
+
+    def fail():
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError):
+        cache.run("upstream", fail)
+
+    with pytest.raises(KeyError):
+        cache.run("downstream", _Counter(), depends_on=["upstream"])
+
+
+def test_fingerprint():
+    assert fingerprint(["b", "a", "a"]) == fingerprint(["a", "b"])
+    assert fingerprint({"x": ["a"], "y": ["b"]}) != fingerprint({"x": ["a", "b"]})
+    assert fingerprint({"x": ["b", "a"]}) == fingerprint({"x": ["a", "b"]})
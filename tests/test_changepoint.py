@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the online duration regression detector."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from thoth_notebooks.changepoint import RegressionDetector
+
+
+def _inspections(n: int = 400, shift_at: int = 200, seed: int = 42) -> pd.DataFrame:
+    """Inspections started every 10 minutes, jobs get 3 standard deviations slower at `shift_at`."""
+    rng = np.random.default_rng(seed)
+
+    duration = rng.normal(100, 10, n)
+    duration[shift_at:] += 30
+
+    started = pd.Timestamp("2020-01-01", tz="UTC") + pd.to_timedelta(np.arange(n) * 600, unit="s")
+
+    return pd.DataFrame(
+        {
+            "inspection_id": [f"i{i:03d}" for i in range(n)],
+            "status__job__started_at": started,
+            "status__job__finished_at": started + pd.to_timedelta(duration, unit="s"),
+            "job_duration": duration,
+            "job_log__hwinfo__platform__processor": "x86_64",
+            "job_log__hwinfo__platform__node": [f"node-{i % 3}" for i in range(n)],
+        }
+    )
+
+
+def _detector(**kwargs) -> RegressionDetector:
+    return RegressionDetector(groupby="platform", exclude="node", **kwargs)
+
+
+def test_detects_regression():
+    detector = _detector()
+    detector.backfill(_inspections(), flush=True)
+
+    events = detector.events()
+    assert len(events) == 1
+    assert events["group"][0] == ("x86_64",)
+    assert events["detected_id"][0] >= "i200"
+    assert events["first_offending_ids"][0][0] == "i200"
+    assert events["offending_mean"][0] > events["baseline_mean"][0]
+
+
+def test_incremental_matches_backfill():
+    df = _inspections()
+
+    backfill = _detector()
+    backfill.backfill(df, flush=True)
+
+    # jobs around the shift were still running at the first fetch, their documents arrive later
+    held_back = df["inspection_id"].isin([f"i{i:03d}" for i in range(195, 208)])
+    first = df.iloc[:210][~held_back.iloc[:210]]
+
+    detector = _detector()
+    detector.update(first)
+    assert detector.pending > 0
+
+    detector.update(df.iloc[150:])  # overlapping batches are fine
+    detector.update(df.iloc[:0], flush=True)
+
+    pd.testing.assert_frame_equal(detector.events(), backfill.events())
+
+
+def test_group_columns_are_kept(tmp_path):
+    df = _inspections()
+
+    detector = _detector()
+    detector.update(df.iloc[:100])
+
+    # another column matching the group pattern does NOT restart groups
+    detector.update(df.iloc[100:].assign(job_log__hwinfo__platform__release="5.4"))
+    assert list(detector._groups) == [("x86_64",)]
+
+    detector.save(tmp_path / "detector.pickle")
+    loaded = RegressionDetector.load(tmp_path / "detector.pickle")
+    assert loaded.pending == detector.pending
+
+    with pytest.raises(KeyError):
+        loaded.update(df.drop(columns=["job_log__hwinfo__platform__processor"]))
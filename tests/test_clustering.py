@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the solver error classifier and the template cache."""
+
+import pytest
+
+from thoth_notebooks import clustering
+from thoth_notebooks.clustering import SolverErrorClassifier
+from thoth_notebooks.clustering import TemplateCache
+from thoth_notebooks.clustering import classify_messages
+from thoth_notebooks.clustering import normalize_message
+
+MESSAGES = [
+    "No matching distribution found for tensorflow==1.13.1",
+    "No matching distribution found for numpy==1.16.0",
+    "Could not find a version that satisfies the requirement torch>=1.0",
+    "Command errored out with exit status 1: /usr/bin/python3 setup.py egg_info",
+    "Failed building wheel for psycopg2 in /tmp/pip-install-abc/psycopg2",
+    "ERROR: Package requires a different Python: 3.6.8 not in >=3.7",
+] * 5
+
+OTHER_MESSAGES = [
+    "Connection to pypi.org timed out after 60 seconds",
+    "Hash mismatch for urllib3 sha256:0a1b2c3d4e5f",
+    "Permission denied: /root/.cache/pip",
+] * 10
+
+
+def _classifier(messages=MESSAGES, **kwargs) -> SolverErrorClassifier:
+    classifier = SolverErrorClassifier(n_clusters=3, n_features=2 ** 10, **kwargs)
+    return classifier.partial_fit(messages)
+
+
+def test_normalize_message():
+    assert normalize_message(MESSAGES[0]) == normalize_message(MESSAGES[1])
+
+
+def test_fingerprint():
+    assert SolverErrorClassifier(n_clusters=3).fingerprint is None
+
+    classifier = _classifier()
+    assert classifier.fingerprint == _classifier().fingerprint
+    # the same number of samples seen, but a different model (e.g. retrained on other documents)
+    assert classifier.fingerprint != _classifier(OTHER_MESSAGES).fingerprint
+
+    fingerprint = classifier.fingerprint
+    classifier.partial_fit(MESSAGES)
+    assert classifier.fingerprint != fingerprint
+
+
+def test_template_cache(tmp_path):
+    path = tmp_path / "templates.pickle"
+    classifier = _classifier()
+
+    cache = TemplateCache.load(path, classifier)
+    assignments = dict(classify_messages(classifier, enumerate(MESSAGES), cache=cache))
+    cache.save()
+
+    assert cache.misses == len(set(map(normalize_message, MESSAGES)))
+    assert assignments == dict(enumerate(classifier.predict(MESSAGES).tolist()))
+
+    assert TemplateCache.load(path, classifier).assignments == cache.assignments
+    assert TemplateCache.load(path, _classifier(OTHER_MESSAGES)).assignments == {}
+
+    with pytest.raises(ValueError):
+        list(classify_messages(_classifier(OTHER_MESSAGES), enumerate(MESSAGES), cache=cache))
+
+
+@pytest.mark.parametrize("normalize", [True, False])
+def test_classify_messages_matches_predict(normalize):
+    classifier = _classifier(normalize=normalize)
+    messages = MESSAGES + OTHER_MESSAGES
+
+    assignments = dict(classify_messages(classifier, enumerate(messages)))
+
+    assert assignments == dict(enumerate(classifier.predict(messages).tolist()))
+
+
+def test_messages_are_normalized_once(monkeypatch):
+    classifier = _classifier()
+
+    calls = []
+
+    def counting_normalize_message(message, *args, **kwargs):
+        calls.append(message)
+        return normalize_message(message, *args, **kwargs)
+
+    monkeypatch.setattr(clustering, "normalize_message", counting_normalize_message)
+
+    list(classify_messages(classifier, enumerate(MESSAGES)))
+    assert len(calls) == len(MESSAGES)
+
+    calls.clear()
+    classifier.partial_fit(MESSAGES)
+    assert len(calls) == len(MESSAGES)
+
+
+def test_normalize_is_part_of_the_fingerprint():
+    assert _classifier(normalize=False).fingerprint != _classifier(normalize=True).fingerprint
+    assert not _classifier(normalize=False).normalize
+
+
+def test_save_load(tmp_path):
+    classifier = _classifier()
+    classifier.rejected_ids.add("solver-rejected")
+    classifier.save(tmp_path / "classifier.pickle")
+
+    loaded = SolverErrorClassifier.load(tmp_path / "classifier.pickle")
+    assert loaded.fingerprint == classifier.fingerprint
+    assert loaded.rejected_ids == {"solver-rejected"}
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of job contention computed by the sweep over start and finish timestamps."""
+
+import numpy as np
+import pandas as pd
+
+from thoth_notebooks.contention import add_contention_columns
+from thoth_notebooks.contention import contention
+from thoth_notebooks.contention import sweep_contention
+
+
+def _brute_force(started: np.ndarray, finished: np.ndarray):
+    running, overlap = [], []
+    for i in range(len(started)):
+        others = np.arange(len(started)) != i
+        running.append(int(((started[others] <= started[i]) & (finished[others] > started[i])).sum()))
+
+        shared = np.clip(np.minimum(finished[others], finished[i]) - np.maximum(started[others], started[i]), 0, None)
+        duration = finished[i] - started[i]
+        overlap.append(shared.sum() / duration if duration > 0 else running[-1])
+
+    return np.array(running), np.array(overlap)
+
+
+def test_sweep_matches_brute_force():
+    rng = np.random.default_rng(42)
+    started = rng.uniform(0, 1000, 200).round()
+    finished = started + rng.exponential(50, 200).round()
+
+    running, overlap = sweep_contention(started, finished)
+    expected_running, expected_overlap = _brute_force(started, finished)
+
+    np.testing.assert_array_equal(running, expected_running)
+    np.testing.assert_allclose(overlap, expected_overlap, atol=1e-9)
+
+
+def _inspections(started, finished, nodes) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "status__job__started_at": pd.to_datetime(started, unit="s", utc=True),
+            "status__job__finished_at": pd.to_datetime(finished, unit="s", utc=True),
+            "job_log__hwinfo__platform__node": nodes,
+        }
+    )
+
+
+def test_contention_per_node():
+    df = _inspections([0, 5, 5, 100], [10, 20, 8, 110], ["a", "a", "b", None])
+    result = contention(df)
+
+    assert result["contention__running_at_start"].tolist() == [0, 2, 2, 0]
+    assert result["contention__node__running_at_start"].tolist()[:3] == [0, 1, 0]
+    assert np.isnan(result["contention__node__running_at_start"].iloc[3])
+
+
+def test_empty_frame():
+    df = _inspections([], [], [])
+
+    result = add_contention_columns(df)
+    assert len(result) == 0
+    assert "contention__node__mean_overlap" in result.columns
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the vectorized grouped correlation against scipy."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scipy import stats
+
+from thoth_notebooks.correlation import correlate
+from thoth_notebooks.correlation import to_matrix
+
+COUNTERS = ["job_log__usage__ru_nvcsw", "job_log__usage__ru_nivcsw"]
+TARGETS = ["job_duration", "build_duration"]
+
+
+def _grouped(seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n = 60
+
+    # rows with a missing platform form a group of their own
+    platform = rng.choice(np.array(["x86_64", "ppc64le", None], dtype=object), n)
+    ncpus = rng.choice([2, 4], n)
+
+    nvcsw = rng.poisson(1000, n).astype(float)
+    nivcsw = rng.poisson(50, n).astype(float)
+    df = pd.DataFrame(
+        {
+            COUNTERS[0]: nvcsw,
+            COUNTERS[1]: nivcsw,
+            TARGETS[0]: 0.1 * nvcsw + rng.normal(0, 5, n),
+            TARGETS[1]: rng.normal(100, 5, n),
+            "job_log__hwinfo__platform__node": "node-0",  # NOT numeric, ignored
+        },
+        index=pd.MultiIndex.from_arrays([platform, ncpus, np.arange(n)], names=["platform", "ncpus", None]),
+    )
+    # incomplete rows are NOT considered
+    df.iloc[[3, 17], 0] = np.nan
+    df.iloc[25, 2] = np.nan
+
+    return df
+
+
+@pytest.mark.parametrize("method, func", [("spearman", stats.spearmanr), ("pearson", stats.pearsonr)])
+def test_matches_scipy_per_group(method, func):
+    df = _grouped()
+
+    result = correlate(df, x=r"^job_log__usage__ru_", y=TARGETS, method=method)
+
+    assert result.index.names == ["platform", "ncpus", "x", "y"]
+    assert set(result.index.get_level_values("x")) == set(COUNTERS)
+
+    complete = df[COUNTERS + TARGETS].dropna()
+    groups = complete.groupby(level=["platform", "ncpus"], dropna=False)
+    assert groups.ngroups == 6
+
+    rows = result.reset_index()
+    assert rows["platform"].isna().any()
+    rows = rows.fillna({"platform": "<missing>"}).set_index(["platform", "ncpus", "x", "y"])
+
+    for (platform, ncpus), group in groups:
+        platform = "<missing>" if pd.isna(platform) else platform
+
+        for x in COUNTERS:
+            for y in TARGETS:
+                expected = func(group[x], group[y])
+                row = rows.loc[(platform, ncpus, x, y)]
+
+                assert row["n"] == len(group)
+                assert row["r"] == pytest.approx(expected[0], abs=1e-10)
+                assert row["p_value"] == pytest.approx(expected[1], rel=1e-6)
+
+
+def test_ungrouped():
+    df = _grouped().reset_index(drop=True)
+
+    result = correlate(df, x=COUNTERS, y=TARGETS, method="spearman")
+    complete = df[COUNTERS + TARGETS].dropna()
+
+    matrix = to_matrix(result)
+    assert matrix.shape == (2, 2)
+    assert matrix.loc[COUNTERS[0], TARGETS[0]] == pytest.approx(
+        stats.spearmanr(complete[COUNTERS[0]], complete[TARGETS[0]])[0]
+    )
+    assert matrix.loc[COUNTERS[0], TARGETS[0]] > 0.5
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        correlate(_grouped(), x=COUNTERS, y=TARGETS, method="kendall")
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the bitset encoding of CPU flags."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from thoth_notebooks.cpu_flags import DEFAULT_COLUMN
+from thoth_notebooks.cpu_flags import ISA_LEVEL_COLUMN
+from thoth_notebooks.cpu_flags import ISA_LEVELS
+from thoth_notebooks.cpu_flags import FlagVocabulary
+from thoth_notebooks.cpu_flags import encode_flag_columns
+from thoth_notebooks.cpu_flags import flag_bitsets
+from thoth_notebooks.cpu_flags import flag_columns
+
+V1 = list(ISA_LEVELS[1])
+V2 = V1 + list(ISA_LEVELS[2])
+V3 = V2 + list(ISA_LEVELS[3])
+V4 = V3 + list(ISA_LEVELS[4])
+
+# flags of CPUs which are NOT part of ISA levels, enough of them to need more than one word
+EXTRA = [f"extra_flag_{i}" for i in range(80)]
+
+
+def _inspections(flags) -> pd.DataFrame:
+    return pd.DataFrame({"inspection_id": [f"inspection-{i}" for i in range(len(flags))], DEFAULT_COLUMN: flags})
+
+
+def test_round_trip():
+    flags = [V4 + EXTRA, " ".join(V2 + ["AES"]), [], None, np.nan, V1 + EXTRA[::7]]
+    df, vocabulary = encode_flag_columns(_inspections(flags))
+
+    assert DEFAULT_COLUMN not in df.columns
+    assert flag_columns(df) == [f"{DEFAULT_COLUMN}_{i}" for i in range(vocabulary.n_words)]
+    assert vocabulary.n_words == 2
+    assert df[flag_columns(df)].dtypes.tolist() == [np.uint64] * vocabulary.n_words
+
+    expected = [V4 + EXTRA, V2 + ["aes"], [], [], [], V1 + EXTRA[::7]]
+    assert vocabulary.decode(flag_bitsets(df)) == [sorted(flags) for flags in expected]
+
+
+def test_reused_vocabulary():
+    _, vocabulary = encode_flag_columns(_inspections([V3]))
+
+    df, same = encode_flag_columns(_inspections([V1 + ["aes"]]), vocabulary=vocabulary, drop=False)
+
+    assert same is vocabulary
+    assert DEFAULT_COLUMN in df.columns
+    # flags NOT in the vocabulary are dropped
+    assert vocabulary.decode(flag_bitsets(df)) == [sorted(V1)]
+
+
+def test_has():
+    df, vocabulary = encode_flag_columns(_inspections([V4, V3, V1 + ["aes"], []]))
+    bitsets = flag_bitsets(df)
+
+    assert vocabulary.has(bitsets, "avx512f").tolist() == [True, False, False, False]
+    assert vocabulary.has(bitsets, "AVX2", "fma").tolist() == [True, True, False, False]
+    assert vocabulary.has(bitsets, "avx512f", "aes", any_of=True).tolist() == [True, False, True, False]
+
+    # flags NOT in the vocabulary are NOT set in any of the bitsets
+    assert vocabulary.has(bitsets, "unknown").tolist() == [False] * 4
+    assert vocabulary.has(bitsets, "avx2", "unknown").tolist() == [False] * 4
+    assert vocabulary.has(bitsets, "avx2", "unknown", any_of=True).tolist() == [True, True, False, False]
+    assert vocabulary.has(bitsets).tolist() == [True] * 4
+
+
+@pytest.mark.parametrize("level", sorted(ISA_LEVELS))
+def test_isa_level_boundaries(level):
+    vocabulary = FlagVocabulary(EXTRA)
+    flags = [flag for isa_level in range(1, level + 1) for flag in ISA_LEVELS[isa_level]]
+
+    # each flag missing drops the level, levels above are NOT reached without the levels below
+    missing = [[f for f in flags if f != flag] for flag in ISA_LEVELS[level]]
+    skipped = [flag for isa_level in ISA_LEVELS if isa_level != level - 1 for flag in ISA_LEVELS[isa_level]]
+    bitsets = vocabulary.encode([flags, flags + EXTRA] + missing + ([skipped] if level > 1 else []))
+
+    levels = vocabulary.isa_level(bitsets).tolist()
+    assert levels[:2] == [level, level]
+    assert levels[2:2 + len(missing)] == [level - 1] * len(missing)
+    if level > 1:
+        assert levels[-1] == level - 2
+
+
+def test_isa_level_column():
+    df, _ = encode_flag_columns(_inspections([V4, V3, V2, V1, []]))
+
+    assert df[ISA_LEVEL_COLUMN].tolist() == [4, 3, 2, 1, 0]
+    assert df.groupby(ISA_LEVEL_COLUMN).size().tolist() == [1] * 5
+
+
+def test_memory():
+    # a handful of CPU models, flags of each row parsed from its own document
+    models = [V4 + EXTRA, V3 + EXTRA[:60], V2 + EXTRA[:40]]
+    df = _inspections([list(models[i % len(models)]) for i in range(10000)])
+
+    encoded, _ = encode_flag_columns(df)
+
+    before = df[DEFAULT_COLUMN].memory_usage(deep=True, index=False)
+    after = encoded[flag_columns(encoded)].memory_usage(deep=True, index=False).sum()
+    assert before >= 10 * after
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the batched static export of figures with a fake renderer."""
+
+import json
+import os
+
+import pytest
+
+from thoth_notebooks.figures import MANIFEST_NAME
+from thoth_notebooks.figures import FigureExporter
+from thoth_notebooks.figures import figure_to_json
+
+
+def _render(spec, path, fmt, **options):
+    """Write the figure specification instead of an image, together with the process which rendered it."""
+    with open(path, "w") as f:
+        json.dump({"spec": json.loads(spec), "format": fmt, "options": options, "pid": os.getpid()}, f)
+
+
+def _fail(spec, path, fmt, **options):
+    raise RuntimeError("renderer crashed")
+
+
+def _warmup():
+    with open(os.environ["WARMUP_LOG"], "a") as f:
+        f.write(f"{os.getpid()}\n")
+
+
+def _figure(title: str) -> dict:
+    return {"data": [{"type": "box", "y": [1, 2, 3]}], "layout": {"title": title}}
+
+
+def _exporter(output_dir, **kwargs) -> FigureExporter:
+    return FigureExporter(output_dir, renderer=_render, warmup=None, max_workers=2, **kwargs)
+
+
+def test_export(tmp_path):
+    with _exporter(tmp_path, width=1200) as exporter:
+        assert exporter.add(_figure("duration"), "duration_box", folder_name="BoxPlots")
+        assert exporter.add(_figure("duration"), "duration_box", folder_name="BoxPlots", fmt="svg", height=600)
+
+    image = json.loads((tmp_path / "BoxPlots" / "duration_box.png").read_text())
+    assert image["spec"] == _figure("duration")
+    assert image["options"] == {"width": 1200}
+    assert image["pid"] != os.getpid()
+
+    svg = json.loads((tmp_path / "BoxPlots" / "duration_box.svg").read_text())
+    assert (svg["format"], svg["options"]) == ("svg", {"width": 1200, "height": 600})
+
+    assert exporter.stats["rendered"] == 2
+    assert set(json.loads((tmp_path / MANIFEST_NAME).read_text())) == {
+        "BoxPlots/duration_box.png",
+        "BoxPlots/duration_box.svg",
+    }
+
+
+def test_unchanged_figures_are_skipped(tmp_path):
+    with _exporter(tmp_path) as exporter:
+        exporter.add(_figure("duration"), "duration")
+        exporter.add(_figure("rate"), "rate")
+        exporter.add(_figure("batches"), "batches")
+
+    (tmp_path / "batches.png").unlink()
+
+    with _exporter(tmp_path) as exporter:
+        assert not exporter.add(_figure("duration"), "duration")
+        # a changed figure, changed export options and an image removed since the previous run
+        assert exporter.add(_figure("rate [GFLOPS]"), "rate")
+        assert exporter.add(_figure("duration"), "duration", scale=2)
+        assert exporter.add(_figure("batches"), "batches")
+
+    assert (exporter.stats["queued"], exporter.stats["rendered"], exporter.stats["skipped"]) == (4, 3, 1)
+    assert json.loads((tmp_path / "rate.png").read_text())["spec"] == _figure("rate [GFLOPS]")
+    assert json.loads((tmp_path / "duration.png").read_text())["options"] == {"scale": 2}
+    assert (tmp_path / "batches.png").exists()
+
+
+def test_the_last_write_wins(tmp_path):
+    with _exporter(tmp_path) as exporter:
+        for i in range(5):
+            exporter.add(_figure(f"batch {i}"), "batch")
+
+    assert json.loads((tmp_path / "batch.png").read_text())["spec"] == _figure("batch 4")
+    assert exporter.stats["rendered"] == 5
+
+
+def test_failed_figures(tmp_path, caplog):
+    with FigureExporter(tmp_path, renderer=_fail, warmup=None, max_workers=1) as exporter:
+        exporter.add(_figure("duration"), "duration")
+
+    assert exporter.stats["failed"] == 1
+    assert "renderer crashed" in caplog.text
+    # failed figures are rendered again on the next run
+    assert json.loads((tmp_path / MANIFEST_NAME).read_text()) == {}
+
+
+def test_warmup_once_per_worker(tmp_path, monkeypatch):
+    monkeypatch.setenv("WARMUP_LOG", str(tmp_path / "warmup.log"))
+
+    with FigureExporter(tmp_path / "figures", renderer=_render, warmup=_warmup, max_workers=2) as exporter:
+        for i in range(20):
+            exporter.add(_figure(f"batch {i}"), f"batch_{i}")
+
+    warmed_up = (tmp_path / "warmup.log").read_text().split()
+    assert 1 <= len(warmed_up) <= 2
+    assert len(set(warmed_up)) == len(warmed_up)
+
+    rendered_by = {json.loads(path.read_text())["pid"] for path in (tmp_path / "figures").glob("*.png")}
+    assert rendered_by <= set(map(int, warmed_up))
+
+
+def test_figure_to_json():
+    assert figure_to_json({"layout": {"title": "a"}, "data": []}) == '{"data":[],"layout":{"title":"a"}}'
+
+    with pytest.raises(TypeError):
+        figure_to_json("NOT a figure")
+
+
+def test_intercept(tmp_path):
+    pio = pytest.importorskip("plotly.io")
+    write_image = pio.write_image
+    path = tmp_path / "project" / "Histograms" / "duration.png"
+
+    with _exporter(tmp_path / "project").intercept() as exporter:
+        # e.g. plot builders of thoth.lab called with `save_result=True`
+        pio.write_image(_figure("duration"), str(path), width=800)
+        assert exporter.stats["queued"] == 1
+
+    assert pio.write_image is write_image
+    assert json.loads(path.read_text())["options"] == {"width": 800}
+    assert exporter.stats["rendered"] == 1
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of package version aggregates pulled from a recorded graph."""
+
+from pathlib import Path
+
+import pandas as pd
+
+from thoth_notebooks.graph import GraphCache
+from thoth_notebooks.graph import RecordedSource
+from thoth_notebooks.graph import fetch_package_versions
+from thoth_notebooks.graph import join_inspection_packages
+from thoth_notebooks.graph import record_package_versions
+
+RECORDED = Path(__file__).parent / "fixtures" / "graph-package-versions.json"
+
+
+def test_fetch_package_versions():
+    versions = fetch_package_versions(RecordedSource(RECORDED)).astype({"package_name": str, "package_version": str})
+    versions = versions.set_index(["package_name", "package_version"]).sort_index()
+
+    assert versions.to_dict("index") == {
+        ("flask", "1.0.2"): {"count": 2, "n_versions": 1},
+        ("numpy", "1.16.2"): {"count": 3, "n_versions": 1},
+        ("tensorflow", "1.13.1"): {"count": 2, "n_versions": 2},
+        ("tensorflow", "1.14.0"): {"count": 1, "n_versions": 2},
+    }
+
+
+def test_record_package_versions(tmp_path):
+    record_package_versions(RecordedSource(RECORDED), tmp_path / "recorded.json")
+
+    assert list(RecordedSource(tmp_path / "recorded.json").fetch_counts()) == list(
+        RecordedSource(RECORDED).fetch_counts()
+    )
+
+
+def test_cache(tmp_path):
+    cache = GraphCache(tmp_path, ttl=3600)
+    source = RecordedSource(RECORDED)
+
+    versions = fetch_package_versions(source, cache=cache)
+    pd.testing.assert_frame_equal(cache.get(source.key), versions)
+
+    assert GraphCache(tmp_path, ttl=-1).get(source.key) is None
+
+
+def test_join_inspection_packages():
+    inspection_df = pd.DataFrame(
+        {
+            "specification__python__requirements_locked__default__tensorflow__version": ["==1.13.1", "==2.0.0"],
+            "specification__python__requirements_locked__default__Flask__version": ["==1.0.2", None],
+        },
+        index=pd.Index(["inspection-a", "inspection-b"], name="inspection_id"),
+    )
+
+    joined = join_inspection_packages(inspection_df, fetch_package_versions(RecordedSource(RECORDED)))
+    joined = joined.reset_index().set_index(["inspection_id", "package_name"]).sort_index()
+
+    assert joined["in_graph"].to_dict() == {
+        ("inspection-a", "flask"): True,
+        ("inspection-a", "tensorflow"): True,
+        ("inspection-b", "tensorflow"): False,
+    }
+    assert joined.loc[("inspection-b", "tensorflow"), "n_versions"] == 2
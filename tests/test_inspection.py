@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of grouping and querying of the inspection DataFrame."""
+
+import pandas as pd
+
+from thoth_notebooks.inspection import group_inspection_dataframe
+from thoth_notebooks.inspection import query_inspection_dataframe
+from thoth_notebooks.inspection import resolve_query
+
+
+def _inspection_df() -> pd.DataFrame:
+    # rows of the groups are interleaved, grouping has to reorder them
+    return pd.DataFrame(
+        {
+            "job_log__hwinfo__cpu__ncpus": [4, 2, 4, 2, 8],
+            "job_log__hwinfo__platform__node": ["n0", "n1", "n0", "n1", "n2"],
+            "status__job__duration": pd.to_timedelta([40, 20, 41, 21, 80], unit="s"),
+            "inspection_id": ["i0", "i1", "i2", "i3", "i4"],
+        }
+    )
+
+
+def test_group_keeps_rows_with_their_groups():
+    df = _inspection_df()
+
+    grouped = group_inspection_dataframe(df, groupby="ncpus", exclude="node")
+
+    assert grouped.index.names == ["job_log__hwinfo__cpu__ncpus", None]
+    assert "job_log__hwinfo__cpu__ncpus" not in grouped.columns
+
+    # each row is labeled by its own group and its original position
+    for (ncpus, position), row in grouped.iterrows():
+        assert df.loc[position, "job_log__hwinfo__cpu__ncpus"] == ncpus
+        assert df.loc[position, "inspection_id"] == row["inspection_id"]
+
+    assert sorted(grouped.index.get_level_values(-1)) == list(range(len(df)))
+
+
+def test_group_by_multiple_columns():
+    grouped = group_inspection_dataframe(_inspection_df(), groupby=["ncpus", "node"]).sort_index()
+
+    assert grouped.loc[(2, "n1")]["inspection_id"].tolist() == ["i1", "i3"]
+    assert grouped.loc[(4, "n0")]["inspection_id"].tolist() == ["i0", "i2"]
+
+
+def test_resolve_query():
+    df = _inspection_df()
+
+    assert resolve_query("ncpus > 2", context=df)["inspection_id"].tolist() == ["i0", "i2", "i4"]
+    assert resolve_query(None, context=df) is df
+
+
+def test_query_inspection_dataframe():
+    d = query_inspection_dataframe(_inspection_df(), query="ncpus < 8", groupby="ncpus", like="duration")
+
+    assert list(d.columns) == ["status__job__duration"]
+    assert d.loc[2, "status__job__duration"].dt.total_seconds().tolist() == [20, 21]
+    assert d.loc[4, "status__job__duration"].dt.total_seconds().tolist() == [40, 41]
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of timing and memory instrumentation of library functions and notebook cells."""
+
+import json
+import time
+
+import pytest
+
+from thoth_notebooks import instrumentation
+from thoth_notebooks.instrumentation import clear_log
+from thoth_notebooks.instrumentation import export_log
+from thoth_notebooks.instrumentation import get_log
+from thoth_notebooks.instrumentation import instrument
+from thoth_notebooks.instrumentation import peak_rss
+from thoth_notebooks.instrumentation import summary
+
+
+@pytest.fixture(autouse=True)
+def _log():
+    clear_log()
+    yield
+    clear_log()
+
+
+@pytest.fixture
+def shell():
+    from IPython.core.interactiveshell import InteractiveShell
+
+    ip = InteractiveShell.instance()
+    ip.run_line_magic("load_ext", "thoth_notebooks.instrumentation")
+    yield ip
+    ip.run_line_magic("unload_ext", "thoth_notebooks.instrumentation")
+    InteractiveShell.clear_instance()
+
+
+@instrument
+def _sleep(items, seconds):
+    time.sleep(seconds)
+    return items[:1]
+
+
+@instrument(name="outer")
+def _outer(items):
+    return _sleep(items, 0.01) + _sleep(items, 0.01)
+
+
+def test_instrument():
+    assert _sleep([1, 2, 3], 0.1) == [1]
+
+    [record] = get_log()
+    assert record["name"] == "_sleep"
+    assert record["kind"] == "function"
+    assert record["wall_time"] >= 0.1
+    assert record["cpu_time"] < record["wall_time"]
+    assert record["peak_rss_delta"] >= 0
+    assert (record["rows_in"], record["rows_out"]) == (3, 1)
+    assert record["success"] is True
+    assert record["parent"] is None
+
+
+def test_call_tree():
+    _outer([1, 2])
+
+    log = get_log()
+    assert [(r["name"], r["parent"], r["depth"]) for r in log] == [
+        ("_sleep", "outer", 1),
+        ("_sleep", "outer", 1),
+        ("outer", None, 0),
+    ]
+
+    df = summary()
+    assert df.loc[("_sleep", "function"), "calls"] == 2
+    assert df.loc[("outer", "function"), "wall_time"] >= df.loc[("_sleep", "function"), "wall_time"]
+
+
+def test_failed_call(tmp_path):
+    with pytest.raises(TypeError):
+        _sleep(None, 0)
+
+    [record] = get_log()
+    assert record["success"] is False
+    assert record["rows_out"] is None
+
+    # the failed call is NOT left on the stack of running calls
+    _sleep([1], 0)
+    assert get_log()[-1]["parent"] is None
+
+    export_log(tmp_path / "log.jsonl")
+    assert [json.loads(line)["success"] for line in (tmp_path / "log.jsonl").read_text().splitlines()] == [False, True]
+
+
+def test_peak_rss_delta():
+    # peak RSS is a high-water mark of the process, allocate more than the peak so far to raise it
+    size = peak_rss() + 64 * 2 ** 20
+    allocate = instrument(lambda size: len(b"x" * size))
+
+    assert allocate(size) == size
+    assert get_log()[0]["peak_rss_delta"] >= 64 * 2 ** 20
+
+
+def test_ipython_extension(shell):
+    shell.run_cell("import time\ntime.sleep(0.1)", store_history=True)
+    shell.run_cell("list(range(5))", store_history=True)
+    shell.run_cell("raise ValueError('broken cell')", store_history=True)
+
+    log = get_log()
+    assert [r["kind"] for r in log] == ["cell"] * 3
+    assert [r["source"] for r in log] == ["import time", "list(range(5))", "raise ValueError('broken cell')"]
+    assert [r["success"] for r in log] == [True, True, False]
+    assert log[0]["wall_time"] >= 0.1
+    assert log[1]["rows_out"] == 5
+    assert all(r["peak_rss_delta"] >= 0 for r in log)
+    assert [r["name"] for r in log] == ["cell [1]", "cell [2]", "cell [3]"]
+
+    # loading the extension again does NOT record cells twice
+    instrumentation.load_ipython_extension(shell)
+    shell.run_cell("x = 1")
+    assert len(get_log()) == 4
+
+
+def test_ipython_extension_unloaded(shell):
+    shell.run_line_magic("unload_ext", "thoth_notebooks.instrumentation")
+    shell.run_cell("x = 1")
+    assert get_log() == []
+    assert instrumentation._CELL_INSTRUMENTATION is None
+
+    shell.run_line_magic("load_ext", "thoth_notebooks.instrumentation")
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the local compressed store of build logs."""
+
+import json
+import pickle
+
+import pandas as pd
+import pytest
+
+from thoth_notebooks.fixtures import FixtureStore
+from thoth_notebooks.log_store import INDEX_FILE_NAME
+from thoth_notebooks.log_store import LogHandle
+from thoth_notebooks.log_store import LogStore
+from thoth_notebooks.log_store import failed_inspection_ids
+
+
+def _log(index: int) -> str:
+    return "".join(f"STEP {step}: RUN pip3 install tensorflow=={index}.0 ✓\n" for step in range(200))
+
+
+@pytest.fixture
+def inspection_store(tmp_path):
+    fixtures_dir = tmp_path / "InspectionResultsStore"
+    fixtures_dir.mkdir()
+    for i in range(10):
+        document = {"inspection_id": f"inspection-{i}", "build_log": _log(i) if i != 9 else None}
+        (fixtures_dir / f"inspection-{i}.json").write_text(json.dumps(document))
+
+    store = FixtureStore(fixtures_dir=fixtures_dir)
+    store.connect()
+
+    return store
+
+
+def test_put(tmp_path):
+    log_store = LogStore(tmp_path / "logs")
+
+    handle = log_store.put("inspection-0", _log(0))
+    assert isinstance(handle, LogHandle)
+    assert handle.text == str(handle) == _log(0)
+
+    # the log of a document is stored only once
+    assert log_store.put("inspection-0", _log(1)) == handle
+    assert log_store.put("inspection-0", None) == handle
+    assert log_store.put("inspection-1", handle) is handle
+    assert log_store.put("inspection-1", None) is None
+    assert "inspection-1" not in log_store
+
+    log_store.put("inspection-1", _log(1))
+    assert len(log_store) == 2
+    assert log_store.handle("inspection-1").text == _log(1)
+
+    stats = log_store.stats()
+    assert stats["logs"] == 2
+    assert stats["size"] < (len(_log(0)) + len(_log(1))) // 10
+
+
+def test_reopen(tmp_path):
+    log_store = LogStore(tmp_path / "logs")
+    for i in range(3):
+        log_store.put(f"inspection-{i}", _log(i))
+
+    # an interrupted write of the index entry and an entry whose data were NOT written
+    with open(tmp_path / "logs" / INDEX_FILE_NAME, "a") as f:
+        f.write("inspection-3\t100000\t10\ninspection-4\t12")
+
+    reopened = LogStore(tmp_path / "logs")
+    assert len(reopened) == 3
+    assert reopened.handle("inspection-3") is None
+    assert reopened.handle("inspection-2").text == _log(2)
+
+
+def test_read_many(tmp_path):
+    log_store = LogStore(tmp_path / "logs")
+    for i in range(5):
+        log_store.put(f"inspection-{i}", _log(i))
+
+    handles = log_store.handles(["inspection-3", "inspection-9", "inspection-0"])
+    assert handles.name == "build_log"
+    assert handles.index.tolist() == ["inspection-3", "inspection-9", "inspection-0"]
+    assert handles["inspection-9"] is None
+
+    assert log_store.read_many(handles) == [_log(3), None, _log(0)]
+
+
+def test_pickled_handles(tmp_path):
+    log_store = LogStore(tmp_path / "logs")
+    df = pd.DataFrame({"inspection_id": ["inspection-0", "inspection-1"]})
+    df["build_log"] = [log_store.put(i, _log(n)) for n, i in enumerate(df["inspection_id"])]
+
+    loaded = pickle.loads(pickle.dumps(df))
+
+    assert [handle.text for handle in loaded["build_log"]] == [_log(0), _log(1)]
+    assert loaded["build_log"].tolist() == df["build_log"].tolist()
+
+
+def test_prefetch(tmp_path, inspection_store, caplog):
+    log_store = LogStore(tmp_path / "logs")
+    log_store.put("inspection-0", _log(0))
+
+    handles = log_store.prefetch(inspection_store, ["inspection-0", "inspection-2", "inspection-9", "inspection-2"])
+
+    assert [h.document_id for h in handles] == ["inspection-0", "inspection-2"]
+    assert handles[1].text == _log(2)
+    assert "'inspection-9' has NO build log" in caplog.text
+
+    size = log_store.stats()["size"]
+    log_store.prefetch(inspection_store, ["inspection-0", "inspection-2"])
+    assert log_store.stats()["size"] == size
+
+
+def test_failed_inspection_ids():
+    df = pd.DataFrame(
+        {
+            "inspection_id": ["inspection-0", "inspection-1", "inspection-2", "inspection-3"],
+            "status__build__exit_code": [0, 1, 0, None],
+            "status__job__exit_code": [0, None, 137, None],
+        }
+    )
+
+    assert failed_inspection_ids(df) == ["inspection-1", "inspection-2"]
+
+    with pytest.raises(KeyError):
+        failed_inspection_ids(df[["inspection_id"]])
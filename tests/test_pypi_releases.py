@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the streaming aggregation of package info gathered from PyPI."""
+
+import pandas as pd
+import pytest
+import yaml
+
+from thoth_notebooks import pypi_releases
+from thoth_notebooks.pypi_releases import aggregate_releases
+from thoth_notebooks.pypi_releases import read_releases
+
+
+def _artifact(upload_time: str) -> dict:
+    return {"filename": "artifact.whl", "packagetype": "bdist_wheel", "upload_time_iso_8601": upload_time}
+
+
+PACKAGES_INFO = [
+    {
+        "info": {"name": "Flask_SQLAlchemy", "summary": "SQLAlchemy support", "classifiers": ["Framework :: Flask"]},
+        "last_serial": 1,
+        "releases": {
+            "2.4.0": [_artifact("2019-04-24T21:49:20.141245Z"), _artifact("2019-04-25T10:00:00Z")],
+            "2.4.1": [_artifact("2019-09-24T15:12:08Z")],
+            "3.0.0a1": [],
+        },
+    },
+    {
+        "info": {"name": "six", "requires_dist": None},
+        "releases": {
+            "1.14.0": [_artifact("2020-01-15T18:49:43.153052Z")],
+            "1.15.0": [_artifact("2020-05-21T07:32:16Z")],
+        },
+        "urls": [{"upload_time_iso_8601": "2020-05-21T07:32:16Z"}],
+    },
+]
+
+
+def _write(path, packages_info):
+    path.write_text(yaml.safe_dump({"packages_info": packages_info, "date": "2020-06-01"}, default_flow_style=False))
+    return path
+
+
+def _expected(packages_info) -> list:
+    return [
+        (info["info"]["name"], version, artifacts[0]["upload_time_iso_8601"])
+        for info in packages_info
+        for version, artifacts in info["releases"].items()
+        if artifacts
+    ]
+
+
+def test_iter_first_uploads(tmp_path):
+    path = _write(tmp_path / "0_gathered_pypi_package_info.yaml", PACKAGES_INFO)
+
+    with open(path, "rb") as f:
+        uploads = list(pypi_releases._iter_first_uploads(f))
+
+    # the same as loading the whole document
+    assert uploads == _expected(yaml.safe_load(path.read_text())["packages_info"])
+    assert uploads[0] == ("Flask_SQLAlchemy", "2.4.0", "2019-04-24T21:49:20.141245Z")
+
+
+def test_read_releases(tmp_path):
+    releases = read_releases(_write(tmp_path / "0_gathered_pypi_package_info.yaml", PACKAGES_INFO))
+
+    assert releases["package_name"].tolist() == ["flask-sqlalchemy", "flask-sqlalchemy", "six", "six"]
+    assert releases["package_name"].dtype == "category"
+    assert releases["version"].tolist() == ["2.4.0", "2.4.1", "1.14.0", "1.15.0"]
+    # timestamps with and without fractions of seconds
+    assert releases["upload_time"].tolist() == [
+        pd.Timestamp("2019-04-24T21:49:20.141245", tz="UTC"),
+        pd.Timestamp("2019-09-24T15:12:08", tz="UTC"),
+        pd.Timestamp("2020-01-15T18:49:43.153052", tz="UTC"),
+        pd.Timestamp("2020-05-21T07:32:16", tz="UTC"),
+    ]
+
+
+def test_aggregate_releases(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    _write(data_dir / "0_gathered_pypi_package_info.yaml", PACKAGES_INFO[:1])
+    _write(data_dir / "1_gathered_pypi_package_info.yaml", PACKAGES_INFO)
+    (data_dir / "README.md").write_text("NOT a package info file")
+
+    histogram, releases = aggregate_releases(data_dir, max_workers=2, keep_releases=True)
+
+    assert histogram.index.name == "month"
+    assert histogram.index[0] == pd.Period("2019-04", freq="M")
+    assert histogram.index[-1] == pd.Period("2020-05", freq="M")
+    # months without releases are filled in
+    assert len(histogram) == 14
+    assert histogram[pd.Period("2019-04", freq="M")] == 2
+    assert histogram[pd.Period("2019-05", freq="M")] == 0
+    assert histogram.sum() == len(releases) == 6
+    assert releases["package_name"].dtype == "category"
+
+    assert aggregate_releases(data_dir, max_workers=1)[1] is None
+
+
+def test_cache(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    path = _write(data_dir / "0_gathered_pypi_package_info.yaml", PACKAGES_INFO)
+
+    aggregate_releases(data_dir, max_workers=1, cache_dir=tmp_path / "cache")
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+    expected = read_releases(path)
+
+    def fail(path):
+        raise AssertionError(f"File {path} parsed again")
+
+    monkeypatch.setattr(pypi_releases, "read_releases", fail)
+    pd.testing.assert_frame_equal(pypi_releases._read_releases_cached(path, tmp_path / "cache"), expected)
+
+    # a changed file is parsed again
+    _write(path, PACKAGES_INFO[1:])
+    with pytest.raises(AssertionError, match="parsed again"):
+        pypi_releases._read_releases_cached(path, tmp_path / "cache")
+
+
+def test_no_files(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        aggregate_releases(tmp_path)
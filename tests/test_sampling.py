@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of stratified sampling of inspection results."""
+
+import json
+
+import pytest
+
+from thoth_notebooks.fixtures import FixtureStore
+from thoth_notebooks.sampling import StratifiedSampler
+from thoth_notebooks.sampling import drop_build_log
+from thoth_notebooks.sampling import inspection_metadata
+
+
+class _CountingStore(FixtureStore):
+    """Fixture store counting retrieved documents."""
+
+    retrieved = 0
+
+    def retrieve_document(self, document_id):
+        self.retrieved += 1
+        return super().retrieve_document(document_id)
+
+
+@pytest.fixture
+def store(tmp_path):
+    for identifier, count in (("tf-dm", 30), ("pytorch", 10), ("small", 2)):
+        for i in range(count):
+            document = {"build_log": "log", "specification": {"identifier": identifier}, "index": i}
+            (tmp_path / f"inspection-{identifier}-{i:08x}.json").write_text(json.dumps(document))
+
+    store = _CountingStore(fixtures_dir=tmp_path)
+    store.connect()
+
+    return store
+
+
+def test_inspection_metadata():
+    assert inspection_metadata("inspection-tf-dm-0a1b2c3d") == {"identifier": "tf-dm"}
+    assert inspection_metadata("inspection-0a1b2c3d") == {"identifier": None}
+
+
+def test_sample_ids(store):
+    sampler = StratifiedSampler(per_stratum=5, seed=42)
+    sampler.update_ids(store.get_document_listing())
+
+    assert store.retrieved == 0
+    with pytest.raises(ValueError):
+        sampler.documents()
+
+    sampler.fetch(store, transform=drop_build_log)
+    assert store.retrieved == 5 + 5 + 2
+
+    documents = sampler.documents()
+    assert len(documents) == len(sampler.document_ids()) == len(sampler.labels()) == 12
+    assert all(document["build_log"] is None for document in documents)
+    for document_id, document in zip(sampler.document_ids(), documents):
+        assert inspection_metadata(document_id)["identifier"] == document["specification"]["identifier"]
+
+    strata = sampler.strata().set_index(sampler.strata()["values"].map(lambda v: v["identifier"]))
+    assert strata["seen"].to_dict() == {"pytorch": 10, "small": 2, "tf-dm": 30}
+    assert strata["sampled"].to_dict() == {"pytorch": 5, "small": 2, "tf-dm": 5}
+
+
+def test_sample_documents(store):
+    sampler = StratifiedSampler(per_stratum=3, groupby="identifier", exclude=(), seed=42)
+    sampler.update(store.iterate_results())
+
+    assert sampler.population().tolist() == [10, 2, 30]
+    assert len(sampler.documents()) == 3 + 2 + 3
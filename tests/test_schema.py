@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the catalog of key paths found in a corpus of JSON documents."""
+
+import json
+
+from pathlib import Path
+
+import pytest
+
+from thoth_notebooks.schema import HyperLogLog
+from thoth_notebooks.schema import SchemaCatalog
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures" / "InspectionResultsStore"
+
+DOCUMENTS = [
+    {"job_log": {"exit_code": 0, "hwinfo": {"platform": {"node": "node-0"}}, "stdout": {"@result": {"rate": 1.0}}}},
+    {"job_log": {"exit_code": 0, "hwinfo": {"platform": {"node": "node-1"}}, "stdout": {"@result": {"rate": 2.0}}}},
+    {"job_log": {"exit_code": 0, "hwinfo": {"platform": {"node": "node-1"}}, "stdout": None}},
+]
+
+
+def _catalog(documents=DOCUMENTS, **kwargs) -> SchemaCatalog:
+    return SchemaCatalog(**kwargs).update(documents)
+
+
+@pytest.mark.parametrize("p", [10, 12])
+@pytest.mark.parametrize("n", [10, 1000, 100000])
+def test_hyperloglog_error(p, n):
+    hll = HyperLogLog(p)
+    for i in range(n):
+        hll.add(f"inspection-{i}")
+        hll.add(f"inspection-{i}")  # duplicates are NOT counted
+
+    # 4 standard errors of the estimate
+    assert abs(hll.count() - n) <= max(4 * 1.04 / 2 ** (p / 2) * n, 1)
+
+
+def test_hyperloglog_merge():
+    first, second, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(3000):
+        (first if i < 2000 else second).add(i)
+        union.add(i)
+
+    first.merge(second)
+    assert first.count() == union.count()
+
+    # values of a different type are distinct values
+    assert HyperLogLog._hash(1) != HyperLogLog._hash("1")
+
+    with pytest.raises(ValueError):
+        first.merge(HyperLogLog(12))
+
+    with pytest.raises(ValueError):
+        HyperLogLog(20)
+
+
+def test_trie_lookups():
+    catalog = _catalog()
+
+    assert "job_log__hwinfo__platform__node" in catalog
+    assert ("job_log", "hwinfo", "platform", "node") in catalog
+    assert "__job_log__exit_code__" in catalog
+    assert "job_log__hwinfo__cpu" not in catalog
+    assert catalog.node("job_log__hwinfo__platform__node__name") is None
+    assert catalog.node(None) is catalog.root
+
+    node = catalog.node("job_log__stdout")
+    assert node.count == 3
+    assert dict(node.types) == {"dict": 2, "NoneType": 1}
+    assert catalog.node("job_log__stdout__@result__rate").count == 2
+
+    # the prefix itself is included
+    assert [path for path, _ in catalog.iter_paths("job_log__hwinfo")] == [
+        ("job_log", "hwinfo"),
+        ("job_log", "hwinfo", "platform"),
+        ("job_log", "hwinfo", "platform", "node"),
+    ]
+    assert [path for path, _ in catalog.iter_paths(depth=2)] == [
+        ("job_log", "exit_code"),
+        ("job_log", "hwinfo"),
+        ("job_log", "stdout"),
+    ]
+    assert list(catalog.iter_paths("job_log__status")) == []
+
+
+def test_query():
+    df = _catalog().query("job_log").set_index("path")
+
+    assert df.loc["job_log__stdout__@result__rate", "presence"] == pytest.approx(2 / 3)
+    assert df.loc["job_log__hwinfo__platform__node", "cardinality"] == 2
+    assert df.loc["job_log__hwinfo__platform__node", "depth"] == 4
+    assert df.loc["job_log__hwinfo", "children"] == 1
+    assert df.loc["job_log__exit_code", "types"] == {"int": 3}
+
+    columns = ["path", "depth", "key", "count", "presence", "types", "cardinality", "children"]
+    assert list(SchemaCatalog().query().columns) == columns
+
+
+def test_catalog_of_inspection_documents(tmp_path):
+    paths = sorted(FIXTURES_DIR.glob("*.json"))
+    catalog = _catalog(json.loads(path.read_text()) for path in paths)
+
+    assert catalog.n_documents == len(paths)
+    keys = ["build_log", "created", "inspection_id", "job_log", "specification", "status"]
+    assert catalog.query(depth=1)["key"].tolist() == keys
+
+    constant = catalog.constant_paths()
+    assert "specification__base" in constant
+    assert "job_log__hwinfo__platform__node" not in constant
+    assert "inspection_id" not in constant
+    assert catalog.query("inspection_id")["cardinality"].tolist() == [len(paths)]
+
+    # catalogs of parts of the corpus are merged to the catalog of the whole corpus
+    merged = _catalog(json.loads(path.read_text()) for path in paths[:2])
+    merged.merge(_catalog(json.loads(path.read_text()) for path in paths[2:]))
+    assert merged.query().equals(catalog.query())
+
+    catalog.save(tmp_path / "schema.pickle")
+    assert SchemaCatalog.load(tmp_path / "schema.pickle").query().equals(catalog.query())
+
+
+def test_diff():
+    other = _catalog(DOCUMENTS[:2] + [{"job_log": {"exit_code": "0", "hwinfo": {"platform": {"node": "node-1"}}}}])
+
+    diff = _catalog().diff(other)
+
+    # presence of the nested paths is the same, the types of the exit code differ
+    assert sorted(diff.index) == ["job_log__exit_code", "job_log__stdout"]
+    assert diff.loc["job_log__stdout", "presence_other"] == pytest.approx(2 / 3)
+
+    with pytest.raises(ValueError):
+        _catalog().merge(_catalog(precision=12))
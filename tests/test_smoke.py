@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the parallel notebook smoke-test executor."""
+
+from pathlib import Path
+
+import nbformat
+import pytest
+
+from nbformat.v4 import new_code_cell
+from nbformat.v4 import new_markdown_cell
+from nbformat.v4 import new_notebook
+
+from thoth_notebooks.smoke import cli
+from thoth_notebooks.smoke import format_report
+from thoth_notebooks.smoke import run_notebooks
+
+TESTS_DIR = Path(__file__).resolve().parent
+
+
+def _notebook(path: Path, *sources: str) -> Path:
+    nb = new_notebook(metadata={"kernelspec": {"name": "python3", "display_name": "Python 3", "language": "python"}})
+    nb.cells = [new_markdown_cell("# Smoke test")] + [new_code_cell(source) for source in sources]
+    nbformat.write(nb, str(path))
+
+    return path
+
+
+def test_parallel(tmp_path):
+    paths = [
+        _notebook(
+            tmp_path / f"notebook-{i}.ipynb",
+            "import time",
+            f"with open({str(tmp_path / f'times-{i}')!r}, 'w') as f:\n"
+            "    f.write(str(time.time()))\n"
+            "time.sleep(3)\n"
+            f"with open({str(tmp_path / f'times-{i}')!r}, 'a') as f:\n"
+            "    f.write(' ' + str(time.time()))",
+        )
+        for i in range(2)
+    ]
+
+    results = run_notebooks(paths, max_workers=2, timeout=120)
+
+    assert [r["notebook"] for r in results] == [str(p) for p in paths]
+    assert [r["status"] for r in results] == ["ok", "ok"]
+
+    times = [tuple(map(float, (tmp_path / f"times-{i}").read_text().split())) for i in range(2)]
+    # the notebooks were running at the same time
+    assert max(start for start, _ in times) < min(end for _, end in times)
+
+
+def test_timeout(tmp_path):
+    path = _notebook(tmp_path / "slow.ipynb", "x = 1", "import time\ntime.sleep(600)", "y = 2")
+
+    [result] = run_notebooks([path], timeout=10)
+
+    assert result["status"] == "timeout"
+    assert result["duration"] < 60
+
+    # the cell which did NOT finish is reported, the one after it never started
+    cells = sorted(result["cells"], key=lambda c: c["cell"])
+    assert [c["cell"] for c in cells] == [1, 2]
+    assert cells[0]["success"] is True
+    assert cells[1]["success"] is False
+    assert cells[1]["cpu_time"] is None
+    assert cells[1]["source"] == "import time"
+
+
+def test_cell_report(tmp_path):
+    path = _notebook(
+        tmp_path / "report.ipynb",
+        "import time\ntime.sleep(0.5)",
+        "",  # empty cells are NOT executed
+        "data = b'x' * (64 * 2 ** 20)",
+        "raise ValueError('broken cell')",
+    )
+
+    [result] = run_notebooks([path], timeout=120)
+
+    assert result["status"] == "failed"
+    assert result["error"].endswith("ValueError: broken cell")
+
+    cells = {c["cell"]: c for c in result["cells"]}
+    assert sorted(cells) == [1, 3, 4]
+
+    assert cells[1]["wall_time"] >= 0.5
+    assert cells[1]["source"] == "import time"
+    assert cells[3]["peak_rss_delta"] >= 32 * 2 ** 20
+    assert cells[3]["peak_rss"] >= cells[3]["peak_rss_delta"]
+    assert cells[4]["success"] is False
+
+    report = format_report([result], top=1).splitlines()
+    assert report[1].startswith("failed")
+    # only the slowest cell is reported
+    assert report[-1].endswith("report.ipynb:1  import time")
+    assert "Slowest cells:" in report[-3]
+
+
+def test_fixture_notebooks():
+    paths = sorted(TESTS_DIR.glob("*.ipynb"))
+    assert paths
+
+    results = run_notebooks(paths, timeout=300, fixtures_dir=TESTS_DIR / "fixtures")
+
+    assert [r["error"] for r in results] == [None] * len(paths)
+
+
+def test_cli_without_notebooks(tmp_path, caplog):
+    assert cli([str(tmp_path)]) == 0
+    assert "No notebooks found" in caplog.text
+
+
+@pytest.mark.parametrize("source, rc", [("x = 1", 0), ("raise ValueError", 1)])
+def test_cli(tmp_path, source, rc):
+    _notebook(tmp_path / "notebook.ipynb", source)
+
+    assert cli([str(tmp_path), "--timeout", "120", "--output", str(tmp_path / "results.json")]) == rc
+    assert (tmp_path / "results.json").exists()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of memory-mapped snapshots of inspection DataFrames."""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from thoth_notebooks.snapshot import load_snapshot
+from thoth_notebooks.snapshot import save_snapshot
+
+
+def _meta(path) -> dict:
+    with open(path / "meta.json") as f:
+        return json.load(f)
+
+
+def test_roundtrip(tmp_path):
+    df = pd.DataFrame(
+        {
+            "inspection_id": ["inspection-a", "inspection-b", None],
+            "job_duration": [1.5, 2.0, 3.25],
+            "ncpus": [1, 2, 4],
+            "started_at": pd.to_datetime(["2020-01-01", "2020-01-02", "2020-01-03"], utc=True),
+        }
+    )
+
+    save_snapshot(df, tmp_path / "snapshot")
+    loaded = load_snapshot(tmp_path / "snapshot", as_category=False)
+
+    assert list(loaded.columns) == list(df.columns)
+    assert loaded["inspection_id"].tolist()[:2] == ["inspection-a", "inspection-b"]
+    assert pd.isna(loaded["inspection_id"].iloc[2])
+    np.testing.assert_array_equal(loaded["job_duration"], df["job_duration"])
+    np.testing.assert_array_equal(loaded["ncpus"], df["ncpus"])
+    assert (loaded["started_at"] == df["started_at"]).all()
+
+
+def test_string_columns_are_memory_mapped(tmp_path):
+    df = pd.DataFrame({"inspection_id": pd.Series(["a", "b", "a"], dtype="string"), "plain": ["x", "y", "z"]})
+    df = df.set_index(pd.Index(["i", "j", "k"], dtype="string", name="id"))
+
+    save_snapshot(df, tmp_path / "snapshot")
+    meta = _meta(tmp_path / "snapshot")
+
+    assert [c["kind"] for c in meta["columns"]] == ["string", "string"]
+    assert meta["index"]["levels"][0]["kind"] == "string"
+
+    loaded = load_snapshot(tmp_path / "snapshot")
+    assert isinstance(loaded["inspection_id"].dtype, pd.CategoricalDtype)
+    assert loaded["inspection_id"].tolist() == ["a", "b", "a"]
+    assert loaded.index.tolist() == ["i", "j", "k"]
+
+
+def test_tuple_labels(tmp_path):
+    columns = pd.MultiIndex.from_tuples([("job", "duration"), ("job", "ncpus")], names=["group", "field"])
+    df = pd.DataFrame([[1.0, 2], [3.0, 4]], columns=columns)
+
+    save_snapshot(df, tmp_path / "snapshot")
+    loaded = load_snapshot(tmp_path / "snapshot")
+
+    assert loaded.columns.equals(columns)
+    assert list(loaded.columns.names) == ["group", "field"]
+
+    selected = load_snapshot(tmp_path / "snapshot", columns=[("job", "ncpus")])
+    assert selected[("job", "ncpus")].tolist() == [2, 4]
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of concurrent retrieval of solver documents from a fixture store."""
+
+import json
+import threading
+
+import pytest
+
+from thoth_notebooks.fixtures import FixtureStore
+from thoth_notebooks.solver import DocumentCache
+from thoth_notebooks.solver import has_single_provided_package_version_error
+from thoth_notebooks.solver import iter_documents
+from thoth_notebooks.solver import retrieve_documents
+
+
+class _CountingStore(FixtureStore):
+    """Fixture store counting retrieved documents."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retrieved = 0
+        self._lock = threading.Lock()
+
+    def retrieve_document(self, document_id):
+        with self._lock:
+            self.retrieved += 1
+
+        return super().retrieve_document(document_id)
+
+
+def _document(index: int) -> dict:
+    errors = [{"is_provided_package_version": True, "details": {"message": f"error {index}"}}]
+    if index % 3 == 0:
+        errors = []
+
+    return {"index": index, "result": {"errors": errors}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    fixtures_dir = tmp_path / "SolverResultsStore"
+    fixtures_dir.mkdir()
+    for i in range(200):
+        (fixtures_dir / f"solver-{i:04d}.json").write_text(json.dumps(_document(i)))
+
+    store = _CountingStore(fixtures_dir=fixtures_dir)
+    store.connect()
+
+    return store
+
+
+def test_predicate(store):
+    rejected = set()
+    documents = list(iter_documents(store, has_single_provided_package_version_error, max_workers=4, rejected=rejected))
+
+    # documents are yielded in the order of the listing
+    assert [d["index"] for _, d in documents] == [i for i in range(200) if i % 3]
+    assert rejected == {f"solver-{i:04d}" for i in range(200) if i % 3 == 0}
+
+
+def test_early_termination(store):
+    documents = retrieve_documents(store, has_single_provided_package_version_error, count=10, max_workers=4)
+
+    assert [d["index"] for d in documents] == [i for i in range(200) if i % 3][:10]
+    # only retrievals in flight (at most 2 * max_workers) are done on top of the ones needed
+    assert store.retrieved <= 15 + 2 * 4
+
+
+def test_cache(store, tmp_path):
+    cache = DocumentCache(tmp_path / "cache")
+    document_ids = [f"solver-{i:04d}" for i in range(20)]
+
+    first = retrieve_documents(store, document_ids=document_ids, cache=cache)
+    assert store.retrieved == 20
+
+    second = retrieve_documents(store, document_ids=document_ids, cache=cache)
+    assert store.retrieved == 20
+    assert first == second
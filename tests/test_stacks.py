@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the sparse representation of software stacks of inspections."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scipy import stats
+
+from thoth_notebooks.stacks import PackageMatrix
+from thoth_notebooks.stacks import stack_groups
+
+STACKS = {
+    "inspection-a": [("tensorflow", "2.1.0"), ("numpy", "1.18.1"), ("six", "1.14.0")],
+    "inspection-b": [("numpy", "1.18.1"), ("six", "1.14.0"), ("tensorflow", "2.1.0")],
+    "inspection-c": [("tensorflow", "2.0.0"), ("numpy", "1.18.1"), ("six", "1.14.0"), ("absl-py", "0.9.0")],
+    "inspection-d": [("torch", "1.4.0"), ("numpy", "1.17.4")],
+    "inspection-e": [("torch", "1.4.0"), ("numpy", "1.18.1")],
+}
+
+
+def _matrix(stacks=STACKS) -> PackageMatrix:
+    triples = [(i, name, version) for i, packages in stacks.items() for name, version in packages]
+    return PackageMatrix.from_pairs(*zip(*triples))
+
+
+def _jaccard(first, second) -> float:
+    return len(set(first) & set(second)) / len(set(first) | set(second))
+
+
+def test_from_pairs_canonicalizes_and_deduplicates():
+    stacks = PackageMatrix.from_pairs(
+        ["inspection-a", "inspection-a", "inspection-a", "inspection-b"],
+        ["TensorFlow", "tensorflow", "absl_py", "Absl.Py"],
+        ["2.1.0", "2.1.0", "0.9.0", "0.9.0"],
+    )
+
+    assert stacks.shape == (2, 2)
+    assert sorted(stacks.features["package_name"]) == ["absl-py", "tensorflow"]
+    # the same package version listed twice in a stack is counted once
+    assert stacks.matrix.nnz == 3
+    assert (stacks.matrix.data == 1).all()
+    assert stacks.has("Absl_Py", "0.9.0").tolist() == [True, True]
+
+
+def test_from_documents():
+    locked = {"tensorflow": {"version": "==2.1.0"}, "numpy": "==1.18.1", "six": {"index": "pypi"}}
+    documents = [
+        ("inspection-a", {"specification": {"python": {"requirements_locked": {"default": locked}}}}),
+        ("inspection-b", {"specification": {}}),
+    ]
+
+    stacks = PackageMatrix.from_documents(documents)
+
+    assert stacks.stack("inspection-a").to_dict("records") == [
+        {"package_name": "numpy", "package_version": "1.18.1"},
+        {"package_name": "tensorflow", "package_version": "2.1.0"},
+    ]
+
+
+def test_stack_hashes():
+    hashes = _matrix().stack_hashes()
+
+    # the same packages in a different order
+    assert hashes["inspection-a"] == hashes["inspection-b"]
+    assert hashes.nunique() == 4
+
+    # the hash does NOT depend on other inspections
+    other = _matrix({"inspection-b": STACKS["inspection-b"], "inspection-x": [("scipy", "1.4.1")]}).stack_hashes()
+    assert other["inspection-b"] == hashes["inspection-b"]
+
+    groups = stack_groups(_matrix())
+    assert groups["inspections"].tolist() == [2, 1, 1, 1]
+    assert groups.loc[hashes["inspection-a"], "packages"] == 3
+
+
+def test_similarity():
+    stacks = _matrix()
+
+    similarity = stacks.similarity(["inspection-c", "inspection-d"])
+
+    assert similarity.shape == (2, len(STACKS))
+    for row, inspection_id in enumerate(["inspection-c", "inspection-d"]):
+        expected = [_jaccard(STACKS[inspection_id], packages) for packages in STACKS.values()]
+        np.testing.assert_allclose(similarity[row], expected)
+
+    with pytest.raises(TypeError):
+        stacks.similarity()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 1024])
+def test_most_similar(chunk_size):
+    stacks = _matrix()
+
+    result = stacks.most_similar(top=2, chunk_size=chunk_size)
+
+    expected = []
+    for inspection_id, packages in STACKS.items():
+        similar = pd.Series(
+            {other: _jaccard(packages, others) for other, others in STACKS.items() if other != inspection_id}
+        )
+        similar = similar[similar > 0].sort_values(ascending=False, kind="stable").head(2)
+        expected.extend((inspection_id, other, value) for other, value in similar.items())
+
+    assert [(i, s) for i, s, _ in expected] == list(zip(result["inspection_id"], result["similar_id"]))
+    np.testing.assert_allclose(result["similarity"], [value for _, _, value in expected])
+
+    similar = stacks.similar("inspection-a", top=1)
+    assert similar.to_dict() == {"inspection-b": 1.0}
+
+
+def test_feature_effects():
+    rng = np.random.default_rng(42)
+    stacks, durations = {}, {}
+    for i in range(200):
+        slow = i % 4 == 0
+        stacks[f"inspection-{i}"] = [("numpy", "1.18.1"), ("tensorflow", "2.1.0" if slow else "2.0.0")]
+        if i % 10 == 0:
+            stacks[f"inspection-{i}"].append(("absl-py", "0.9.0"))
+        durations[f"inspection-{i}"] = rng.normal(100, 5) + (20 if slow else 0)
+
+    durations = pd.Series(durations)
+    effects = _matrix(stacks).feature_effects(durations, min_count=21).set_index(["package_name", "package_version"])
+
+    # installed in all the inspections, or in fewer than `min_count` inspections
+    assert ("numpy", "1.18.1") not in effects.index
+    assert ("absl-py", "0.9.0") not in effects.index
+
+    slow = effects.loc[("tensorflow", "2.1.0")]
+    assert slow["count"] == 50
+    assert slow["difference"] == pytest.approx(20, abs=3)
+    assert slow["coefficient"] > 0
+
+    with_package = durations.iloc[::4]
+    without_package = durations.drop(with_package.index)
+    expected = stats.ttest_ind(with_package, without_package, equal_var=False)
+    assert slow["t"] == pytest.approx(expected.statistic)
+    assert slow["p_value"] == pytest.approx(expected.pvalue, abs=1e-12)
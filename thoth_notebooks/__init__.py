@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+"""Library functions supporting Thoth's notebooks.
+
+Modules are NOT imported here on purpose, import the one you need directly, e.g.:
+
+    from thoth_notebooks import snapshot
+"""
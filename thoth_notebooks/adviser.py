@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+"""Columnar aggregation of adviser results.
+
+Adviser documents are retrieved concurrently (see `thoth_notebooks.solver.iter_documents`) and
+justifications are exploded into a table with a row per justification:
+
+    justifications = aggregate_adviser_results(adviser_store, adviser_version="0.7.3", cache=DocumentCache(".cache/adviser"))
+    histogram, heatmap = justification_counts(justifications)
+
+Columns `message`, `type` and `package_name` are categorical, so the table stays small even for
+all the adviser documents of a version.
+"""
+
+import logging
+import time
+
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+import pandas as pd
+
+from .solver import DocumentCache
+from .solver import iter_documents
+
+logger = logging.getLogger(__name__)
+
+JUSTIFICATION_COLUMNS = ["document_id", "message", "type", "package_name"]
+
+
+def get_adviser_version(document: Dict[str, Any]) -> str:
+    """Get version of adviser which produced the document."""
+    return document["metadata"]["analyzer_version"]
+
+
+def _iter_report_justifications(report: Any) -> Iterator[Dict[str, Any]]:
+    """Iterate over justifications of the adviser report, older and newer report formats are supported."""
+    if isinstance(report, dict):
+        # newer adviser: {"products": [{"justification": [...], ...}], "stack_info": [...]}
+        for product in report.get("products") or []:
+            yield from product.get("justification") or []
+
+        yield from report.get("stack_info") or []
+    elif isinstance(report, list):
+        # older adviser: [[justification, project], ...]
+        for item in report:
+            if isinstance(item, (list, tuple)) and item:
+                yield from item[0] or []
+
+
+def iter_justifications(document_id: str, document: Dict[str, Any]) -> Iterator[Tuple[str, str, str, str]]:
+    """Turn the adviser document into (document ID, message, type, package name) rows.
+
+    Adviser runs which ended up with an error produce a single row with the error message.
+    """
+    result = document.get("result") or {}
+
+    if result.get("error"):
+        yield document_id, result.get("error_msg"), "ERROR", None
+        return
+
+    for justification in _iter_report_justifications(result.get("report")):
+        yield (
+            document_id,
+            justification.get("message"),
+            justification.get("type"),
+            justification.get("package_name"),
+        )
+
+
+def justifications_dataframe(rows: Iterable[Tuple[str, str, str, str]]) -> pd.DataFrame:
+    """Create justifications table with categorical columns."""
+    df = pd.DataFrame.from_records(rows, columns=JUSTIFICATION_COLUMNS)
+
+    for column in ("message", "type", "package_name"):
+        # categories are always objects, chunks can be then concatenated using `union_categoricals`
+        categories = pd.Index(df[column].dropna().unique(), dtype=object)
+        df[column] = pd.Categorical(df[column], categories=categories)
+
+    return df
+
+
+def _concat(frames: list) -> pd.DataFrame:
+    """Concatenate justification tables keeping categorical columns categorical."""
+    from pandas.api.types import union_categoricals
+
+    if not frames:
+        return justifications_dataframe([])
+
+    df = pd.concat(frames, ignore_index=True)
+    for column in ("message", "type", "package_name"):
+        df[column] = pd.Series(union_categoricals([f[column] for f in frames]), index=df.index)
+
+    return df
+
+
+def aggregate_adviser_results(
+    store,
+    adviser_version: str = None,
+    document_ids: Iterable[str] = None,
+    *,
+    limit: int = None,
+    max_workers: int = 16,
+    cache: DocumentCache = None,
+    chunk_size: int = 100000,
+) -> pd.DataFrame:
+    """Retrieve adviser documents concurrently and explode their justifications into a table.
+
+    :param store: connected `AdvisersResultsStore` (or a fixture store)
+    :param adviser_version: consider only documents produced by the given version of adviser
+    :param document_ids: IDs of the documents to consider, all the documents by default
+    :param limit: maximum number of documents considered, all the documents by default
+    :param max_workers: number of concurrent retrievals
+    :param cache: local cache of the retrieved documents
+    :param chunk_size: number of justifications kept as Python objects before turned into a columnar chunk
+    """
+    predicate = None
+    if adviser_version is not None:
+        def predicate(document: Dict[str, Any]) -> bool:
+            return get_adviser_version(document) == adviser_version
+
+    rows = []
+    chunks = []
+    n_documents = 0
+    start = time.monotonic()
+
+    for document_id, document in iter_documents(
+        store, predicate, document_ids=document_ids, max_workers=max_workers, cache=cache
+    ):
+        rows.extend(iter_justifications(document_id, document))
+        n_documents += 1
+
+        if len(rows) >= chunk_size:
+            chunks.append(justifications_dataframe(rows))
+            rows = []
+
+        if limit is not None and n_documents >= limit:
+            break
+
+    chunks.append(justifications_dataframe(rows))
+    df = _concat(chunks)
+
+    logger.info(
+        f"Aggregated {len(df)} justifications of {n_documents} adviser documents in {time.monotonic() - start:.2f}s"
+    )
+
+    return df
+
+
+def justification_counts(justifications: pd.DataFrame) -> Tuple[pd.Series, pd.DataFrame]:
+    """Count justifications per message (histogram) and per message and type (heatmap) using one groupby."""
+    counts = justifications.groupby(["message", "type"], observed=True).size()
+
+    heatmap = counts.unstack("type", fill_value=0)
+    histogram = heatmap.sum(axis=1).sort_values(ascending=False).rename("count")
+
+    return histogram, heatmap
+
+
+def create_heatmap(heatmap: pd.DataFrame, title: str = "Adviser justifications"):
+    """Create heatmap of justification counts as returned by `justification_counts`."""
+    from plotly import graph_objs as go
+
+    return go.Figure(
+        data=[go.Heatmap(z=heatmap.values, x=heatmap.columns.astype(str), y=heatmap.index.astype(str))],
+        layout=go.Layout(title=title, margin=dict(l=400)),
+    )
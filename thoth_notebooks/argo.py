@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+
+"""Submission and monitoring of batches of Argo workflows.
+
+Workflows are parameterized from a single workflow specification, submitted with a limit
+on the number of workflows running at once and their status is followed over a single watch
+stream of the namespace (workflows of the batch are labeled):
+
+    workflow = yaml.safe_load(Path("examples/inspection-batch.yaml").read_text())
+    parameters = [{"batch_size": "1", "identifier": f"test-{i}"} for i in range(100)]
+
+    latencies = await submit_batch(v1alpha1, "argo", workflow, parameters, max_concurrent=10)
+
+Outside of a running event loop, use `run_batch` with the same arguments.
+
+`FakeArgoApi` (together with `FakeWatch`) runs workflows in-process, it stands in for the cluster
+in tests and to benchmark the scheduling throughput offline:
+
+    $ python -m thoth_notebooks.argo -n 1000 --max-concurrent 50 --duration 0.05
+"""
+
+import argparse
+import asyncio
+import copy
+import logging
+import queue
+import random
+import threading
+import time
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+BATCH_LABEL = "thoth-station.ninja/batch"
+
+FINISHED_PHASES = frozenset({"Succeeded", "Failed", "Error"})
+
+_RECORD_COLUMNS = ("name", "parameters", "phase", "error", "submitted", "created", "started", "finished")
+
+
+def parameterize(workflow: Dict[str, Any], parameters: Dict[str, Any], name: str = None) -> Dict[str, Any]:
+    """Create a copy of the workflow with the given values of workflow arguments."""
+    workflow = copy.deepcopy(workflow)
+
+    arguments = workflow.setdefault("spec", {}).setdefault("arguments", {}).setdefault("parameters", [])
+    known = {p["name"]: p for p in arguments}
+
+    for key, value in parameters.items():
+        if key in known:
+            known[key]["value"] = str(value)
+        else:
+            arguments.append({"name": key, "value": str(value)})
+
+    if name is not None:
+        metadata = workflow.setdefault("metadata", {})
+        metadata.pop("generateName", None)
+        metadata["name"] = name
+
+    return workflow
+
+
+def _workflow_base_name(workflow: Dict[str, Any]) -> str:
+    metadata = workflow.get("metadata", {})
+    return (metadata.get("name") or metadata.get("generateName") or "workflow").rstrip("-")
+
+
+async def submit_batch(
+    api,
+    namespace: str,
+    workflow: Dict[str, Any],
+    parameters: List[Dict[str, Any]],
+    *,
+    max_concurrent: int = 10,
+    timeout: float = None,
+    watch_cls: Callable = None,
+):
+    """Submit a workflow per parameter set and wait until all of them finish.
+
+    Returns a DataFrame with a row per workflow with its final phase and latencies (in seconds)
+    relative to the submission: `create_latency` (API call), `start_latency` (first seen running)
+    and `completion_latency` (finished). `queued` is the time the workflow waited for
+    the concurrency limit since the batch started.
+
+    :param api: `argo.workflows.client.V1alpha1Api` (or `FakeArgoApi`)
+    :param namespace: namespace to run workflows in
+    :param workflow: workflow specification
+    :param parameters: values of workflow arguments, a workflow is submitted for each item
+    :param max_concurrent: maximum number of workflows submitted and NOT finished at once
+    :param timeout: maximum time to wait for a single workflow to finish
+    :param watch_cls: watch implementation, `argo.workflows.watch.Watch` by default
+    :raises RuntimeError: if the watch stream fails, workflows can NOT be followed then
+    """
+    import pandas as pd
+
+    if watch_cls is None:
+        from argo.workflows.watch import Watch as watch_cls
+
+    # the running loop, asyncio.get_running_loop is NOT available on Python 3.6
+    loop = asyncio.get_event_loop()
+
+    batch_id = uuid.uuid4().hex[:8]
+    base_name = _workflow_base_name(workflow)
+
+    records: Dict[str, Dict[str, Any]] = {}
+    finished: Dict[str, asyncio.Future] = {}
+
+    events: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    # API calls are blocking, one thread is reserved for the watch stream
+    executor = ThreadPoolExecutor(max_workers=max_concurrent + 1)
+    watcher = watch_cls()
+    stopped = threading.Event()
+
+    def pump_events() -> None:
+        # the watch is restarted if the server closes the stream
+        while not stopped.is_set():
+            for event in watcher.stream(
+                api.list_namespaced_workflows, namespace=namespace, label_selector=f"{BATCH_LABEL}={batch_id}"
+            ):
+                try:
+                    loop.call_soon_threadsafe(events.put_nowait, event)
+                except RuntimeError:
+                    # the event loop has been closed
+                    return
+
+    async def dispatch_events() -> None:
+        while True:
+            event = await events.get()
+            obj = event["object"]
+
+            name = obj["metadata"]["name"]
+            record = records.get(name)
+            if record is None:
+                continue
+
+            phase = (obj.get("status") or {}).get("phase")
+            now = time.monotonic()
+
+            if phase == "Running" and record["started"] is None:
+                record["started"] = now
+
+            if phase in FINISHED_PHASES and not finished[name].done():
+                record["finished"] = now
+                record["phase"] = phase
+                finished[name].set_result(phase)
+
+    async def run_workflow(index: int, workflow_parameters: Dict[str, Any]) -> None:
+        async with semaphore:
+            if pump.done():
+                # the watch failed, workflows submitted now could NOT be followed
+                return
+
+            name = f"{base_name}-{batch_id}-{index}"
+
+            spec = parameterize(workflow, workflow_parameters, name=name)
+            spec["metadata"].setdefault("labels", {})[BATCH_LABEL] = batch_id
+
+            record = records[name] = {
+                "name": name,
+                "parameters": workflow_parameters,
+                "phase": None,
+                "error": None,
+                "submitted": time.monotonic(),
+                "created": None,
+                "started": None,
+                "finished": None,
+            }
+            finished[name] = loop.create_future()
+
+            try:
+                await loop.run_in_executor(executor, api.create_namespaced_workflow, namespace, spec)
+            except Exception as exc:
+                record.update(phase="SubmitError", error=str(exc))
+                return
+
+            record["created"] = time.monotonic()
+
+            # a failure of the watch would leave the workflow waiting forever
+            await asyncio.wait([finished[name], pump], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not finished[name].done():
+                record["phase"] = "WatchError" if pump.done() else "Timeout"
+
+    start = time.monotonic()
+
+    pump = loop.run_in_executor(executor, pump_events)
+    dispatcher = asyncio.ensure_future(dispatch_events())
+
+    try:
+        await asyncio.gather(*(run_workflow(i, p) for i, p in enumerate(parameters)))
+
+        if pump.done() and pump.exception() is not None:
+            raise RuntimeError(f"Watch of workflows of batch {batch_id} failed") from pump.exception()
+    finally:
+        stopped.set()
+        watcher.stop()
+        dispatcher.cancel()
+        executor.shutdown(wait=False)
+
+    elapsed = time.monotonic() - start
+
+    # columns are given explicitly, so that an empty batch results in an empty table with the same columns
+    df = pd.DataFrame(list(records.values()), columns=_RECORD_COLUMNS)
+    df["queued"] = df["submitted"] - start
+    df["create_latency"] = df["created"] - df["submitted"]
+    df["start_latency"] = df["started"] - df["submitted"]
+    df["completion_latency"] = df["finished"] - df["submitted"]
+
+    df = df.drop(columns=["submitted", "created", "started", "finished"]).set_index("name")
+
+    logger.info(f"Batch {batch_id}: {len(df)} workflows in {elapsed:.2f}s ({len(df) / elapsed:.1f} workflows/s)")
+
+    return df
+
+
+def run_batch(*args, **kwargs):
+    """Run `submit_batch` outside of a running event loop, see `submit_batch` for arguments."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(submit_batch(*args, **kwargs))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+class FakeArgoApi:
+    """In-process stand-in of `V1alpha1Api`, workflows run for a time given by `duration`."""
+
+    def __init__(
+        self,
+        duration: Callable[[Dict[str, Any]], float] = None,
+        failure_rate: float = 0.0,
+        create_latency: float = 0.0,
+        seed: int = None,
+    ):
+        """Initialize the API.
+
+        :param duration: function computing run time (in seconds) of the workflow given its specification
+        :param failure_rate: probability that the workflow fails
+        :param create_latency: time the create call takes
+        :param seed: seed of the random failures
+        """
+        self.duration = duration or (lambda workflow: 0.0)
+        self.failure_rate = failure_rate
+        self.create_latency = create_latency
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._workflows: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: List[queue.Queue] = []
+
+    def _publish(self, event_type: str, workflow: Dict[str, Any]) -> None:
+        event = {"type": event_type, "object": copy.deepcopy(workflow)}
+        for subscriber in list(self._subscribers):
+            subscriber.put(event)
+
+    def _set_phase(self, name: str, phase: str) -> None:
+        with self._lock:
+            workflow = self._workflows.get(name)
+            if workflow is None:
+                return
+
+            workflow["status"] = {"phase": phase}
+            self._publish("MODIFIED", workflow)
+
+    def create_namespaced_workflow(self, namespace: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Create the workflow and start running it."""
+        if self.create_latency:
+            time.sleep(self.create_latency)
+
+        workflow = copy.deepcopy(body)
+        metadata = workflow.setdefault("metadata", {})
+        metadata["namespace"] = namespace
+        if "name" not in metadata:
+            metadata["name"] = f"{metadata.get('generateName', 'workflow-')}{uuid.uuid4().hex[:5]}"
+
+        name = metadata["name"]
+
+        with self._lock:
+            if name in self._workflows:
+                raise ValueError(f"Workflow {name!r} already exists")
+
+            workflow["status"] = {"phase": "Running"}
+            self._workflows[name] = workflow
+            self._publish("ADDED", workflow)
+            phase = "Failed" if self._random.random() < self.failure_rate else "Succeeded"
+
+        timer = threading.Timer(self.duration(workflow), self._set_phase, args=(name, phase))
+        timer.daemon = True
+        timer.start()
+
+        return copy.deepcopy(workflow)
+
+    def get_namespaced_workflow(self, namespace: str, name: str) -> Dict[str, Any]:
+        """Get the workflow."""
+        with self._lock:
+            return copy.deepcopy(self._workflows[name])
+
+    def list_namespaced_workflows(self, namespace: str, label_selector: str = None, **kwargs) -> Dict[str, Any]:
+        """List workflows matching the (equality based) label selector."""
+        with self._lock:
+            return {"items": [copy.deepcopy(w) for w in self._workflows.values() if _matches(w, label_selector)]}
+
+    def delete_namespaced_workflow(self, namespace: str, name: str) -> None:
+        """Delete the workflow."""
+        with self._lock:
+            workflow = self._workflows.pop(name)
+            self._publish("DELETED", workflow)
+
+
+def _matches(workflow: Dict[str, Any], label_selector: str = None) -> bool:
+    if not label_selector:
+        return True
+
+    labels = workflow.get("metadata", {}).get("labels", {})
+    return all(labels.get(k) == v for k, v in (item.split("=", 1) for item in label_selector.split(",")))
+
+
+class FakeWatch:
+    """Watch of `FakeArgoApi` workflows, interface of `argo.workflows.watch.Watch`."""
+
+    def __init__(self):
+        """Initialize the watch."""
+        self._stopped = threading.Event()
+
+    def stop(self) -> None:
+        """Stop the stream."""
+        self._stopped.set()
+
+    def stream(self, func: Callable, namespace: str, label_selector: str = None, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Stream events of workflows listed by `func`, existing workflows are reported first."""
+        api: FakeArgoApi = func.__self__
+        events: queue.Queue = queue.Queue()
+
+        with api._lock:
+            api._subscribers.append(events)
+            for workflow in api._workflows.values():
+                if _matches(workflow, label_selector):
+                    events.put({"type": "ADDED", "object": copy.deepcopy(workflow)})
+
+        try:
+            while not self._stopped.is_set():
+                try:
+                    event = events.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+
+                if _matches(event["object"], label_selector):
+                    yield event
+        finally:
+            with api._lock:
+                api._subscribers.remove(events)
+
+
+def cli(argv: List[str] = None) -> int:
+    """Benchmark scheduling throughput of a batch of workflows run by `FakeArgoApi`."""
+    parser = argparse.ArgumentParser(prog="python -m thoth_notebooks.argo", description=cli.__doc__)
+    parser.add_argument("-n", "--workflows", type=int, default=100, help="Number of workflows submitted.")
+    parser.add_argument("--max-concurrent", type=int, default=10, help="Maximum number of workflows running at once.")
+    parser.add_argument("--duration", type=float, default=0.1, help="Mean run time of a workflow in seconds.")
+    parser.add_argument("--create-latency", type=float, default=0.0, help="Time the create call takes in seconds.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability that a workflow fails.")
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    rng = random.Random(42)
+    api = FakeArgoApi(
+        duration=lambda workflow: rng.expovariate(1 / args.duration) if args.duration else 0.0,
+        failure_rate=args.failure_rate,
+        create_latency=args.create_latency,
+        seed=42,
+    )
+    workflow = {"metadata": {"generateName": "inspection-batch-"}, "spec": {"arguments": {"parameters": []}}}
+
+    start = time.monotonic()
+    df = run_batch(
+        api,
+        "argo",
+        workflow,
+        [{"identifier": i} for i in range(args.workflows)],
+        max_concurrent=args.max_concurrent,
+        watch_cls=FakeWatch,
+    )
+    elapsed = time.monotonic() - start
+
+    print(df.groupby("phase").size().to_string())
+    print()
+    print(df[["queued", "create_latency", "start_latency", "completion_latency"]].describe().to_string())
+    print(f"\n{len(df)} workflows in {elapsed:.2f}s, {len(df) / elapsed:.1f} workflows/s")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(cli())
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+
+"""Run notebook templates for many identifiers in parallel using papermill.
+
+The template parameters (see `notebooks/templates/README.rst`) are split by identifier,
+each identifier is executed in a separate kernel and the results are merged into a report:
+
+    $ pipenv run python -m thoth_notebooks.batch \\
+        notebooks/templates/Inspection_jobs_analysis_TEMPLATE.ipynb output/ \\
+        -f input_notebook.yaml -j 4
+
+Besides status and duration of each execution, the report states per-cell durations recorded by
+papermill and values the notebooks glued using scrapbook (`sb.glue("elapsed_mean", value)`), the glued
+values are also merged into a single table keyed by the scrap name and the identifier.
+"""
+
+import argparse
+import copy
+import logging
+import os
+import re
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDENTIFIERS_PARAMETER = "identifiers_inspection"
+
+# mime type scrapbook stores JSON-encoded glued values with
+_SCRAP_MIME_TYPE = "application/scrapbook.scrap.json+json"
+
+
+def _slugify(identifier: str) -> str:
+    """Create file name friendly representation of the identifier."""
+    return re.sub(r"[^\w.-]+", "_", identifier).strip("_") or "identifier"
+
+
+def split_parameters(
+    parameters: Dict[str, Any], identifiers_parameter: str = DEFAULT_IDENTIFIERS_PARAMETER
+) -> List[Dict[str, Any]]:
+    """Split template parameters into one set of parameters per identifier.
+
+    The identifiers parameter is matched case-insensitively, so both `identifiers_inspection`
+    and `IDENTIFIERS_INSPECTION` are recognized.
+    """
+    keys = [k for k in parameters if k.lower() == identifiers_parameter.lower()]
+    if not keys:
+        raise KeyError(f"Parameter {identifiers_parameter!r} NOT found in the parameters provided.")
+
+    key, = keys
+    identifiers = parameters[key]
+    if isinstance(identifiers, str):
+        identifiers = [identifiers]
+
+    split = []
+    for identifier in dict.fromkeys(identifiers):  # keep order, drop duplicates
+        params = copy.deepcopy(parameters)
+        params[key] = [identifier]
+
+        split.append(params)
+
+    return split
+
+
+def notebook_outputs(path: Union[str, Path], top: int = 5) -> Dict[str, Any]:
+    """Read values glued by scrapbook and per-cell statistics recorded by papermill from the executed notebook.
+
+    :param path: path to the notebook executed by papermill
+    :param top: number of the slowest cells reported
+    """
+    import nbformat
+
+    nb = nbformat.read(str(path), as_version=4)
+
+    scraps = {}
+    cells = []
+    for index, cell in enumerate(nb.cells):
+        if cell.cell_type != "code":
+            continue
+
+        for output in cell.get("outputs", []):
+            scrap = output.get("data", {}).get(_SCRAP_MIME_TYPE)
+            if scrap is not None:
+                scraps[scrap["name"]] = scrap["data"]
+
+        papermill = cell.metadata.get("papermill", {})
+        if papermill.get("duration") is not None:
+            source = cell.source.strip().splitlines()
+            cells.append(
+                {
+                    "cell": index,
+                    "duration": papermill["duration"],
+                    "exception": bool(papermill.get("exception")),
+                    "source": source[0][:80] if source else "",
+                }
+            )
+
+    return {
+        "scraps": scraps,
+        "cells_executed": len(cells),
+        "cells_duration": sum(c["duration"] for c in cells),
+        "failed_cell": next((c["cell"] for c in cells if c["exception"]), None),
+        "slowest_cells": sorted(cells, key=lambda c: c["duration"], reverse=True)[:top],
+    }
+
+
+def _execute(
+    input_path: str, output_path: str, identifier: str, parameters: Dict[str, Any], **kwargs
+) -> Dict[str, Any]:
+    """Execute a single parameterized notebook, runs in a worker process."""
+    import papermill as pm
+
+    result = {
+        "identifier": identifier,
+        "output_path": output_path,
+        "status": "ok",
+        "error": None,
+        "duration": None,
+        "pid": os.getpid(),
+    }
+
+    start = time.monotonic()
+    try:
+        pm.execute_notebook(input_path, output_path, parameters=parameters, progress_bar=False, **kwargs)
+    except Exception as exc:
+        result.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+    finally:
+        result["duration"] = time.monotonic() - start
+
+    if Path(output_path).exists():
+        # failed notebooks are stored as well, outputs of the cells executed before the failure are kept
+        result.update(notebook_outputs(output_path))
+
+    return result
+
+
+def run_batch(
+    input_path: Union[str, Path],
+    output_dir: Union[str, Path],
+    parameters: Dict[str, Any],
+    *,
+    identifiers_parameter: str = DEFAULT_IDENTIFIERS_PARAMETER,
+    max_workers: int = None,
+    merge: bool = True,
+    **papermill_kwargs,
+) -> Dict[str, Any]:
+    """Run the notebook template once per identifier on a local process pool.
+
+    :param input_path: path to the notebook template
+    :param output_dir: directory to store the executed notebooks and the report into
+    :param parameters: template parameters as they would be passed to papermill
+    :param identifiers_parameter: name of the parameter holding the list of identifiers
+    :param max_workers: maximum number of notebooks executed concurrently, defaults to the number of CPUs
+    :param merge: whether to merge the executed notebooks into a single notebook
+    :param papermill_kwargs: additional parameters passed to `papermill.execute_notebook`
+    """
+    input_path = Path(input_path)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    split = split_parameters(parameters, identifiers_parameter)
+    identifier_key = next(k for k in split[0] if k.lower() == identifiers_parameter.lower())
+
+    max_workers = max_workers or os.cpu_count() or 1
+    logger.info(f"Executing {len(split)} notebooks using {min(max_workers, len(split))} workers.")
+
+    results = []
+    start = time.monotonic()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for params in split:
+            identifier, = params[identifier_key]
+            output_path = output_dir / f"{input_path.stem}-{_slugify(identifier)}.ipynb"
+
+            futures.append(
+                executor.submit(
+                    _execute, str(input_path), str(output_path), identifier, params, **papermill_kwargs
+                )
+            )
+
+        for future in as_completed(futures):
+            result = future.result()
+            logger.info(
+                f"Identifier {result['identifier']!r} finished with status '{result['status']}'"
+                f" in {result['duration']:.2f}s"
+            )
+            results.append(result)
+
+    order = [params[identifier_key][0] for params in split]
+    results.sort(key=lambda r: order.index(r["identifier"]))
+
+    report = {
+        "input_path": str(input_path),
+        "wall_time": time.monotonic() - start,
+        "total_duration": sum(r["duration"] for r in results),
+        "max_workers": max_workers,
+        "succeeded": sum(r["status"] == "ok" for r in results),
+        "failed": sum(r["status"] != "ok" for r in results),
+        "scraps": merge_scraps(results),
+        "results": results,
+    }
+
+    if merge:
+        report["merged_path"] = str(
+            merge_notebooks(
+                [r["output_path"] for r in results if Path(r["output_path"]).exists()],
+                output_dir / f"{input_path.stem}-merged.ipynb",
+                titles=[r["identifier"] for r in results if Path(r["output_path"]).exists()],
+            )
+        )
+
+    with open(output_dir / "report.yaml", "w") as f:
+        yaml.safe_dump(report, f, sort_keys=False)
+
+    return report
+
+
+def merge_scraps(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Merge values glued by the notebooks into a mapping of scrap name to values per identifier."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        for name, value in result.get("scraps", {}).items():
+            merged.setdefault(name, {})[result["identifier"]] = value
+
+    return merged
+
+
+def merge_notebooks(
+    paths: List[Union[str, Path]], output_path: Union[str, Path], titles: List[str] = None
+) -> Path:
+    """Merge executed notebooks into a single notebook, one section per notebook."""
+    import nbformat
+
+    titles = titles or [Path(p).stem for p in paths]
+
+    merged = None
+    for n, (path, title) in enumerate(zip(paths, titles)):
+        nb = nbformat.read(str(path), as_version=4)
+
+        if merged is None:
+            merged = nbformat.v4.new_notebook(metadata=copy.deepcopy(nb.metadata))
+            merged.metadata.pop("papermill", None)
+
+        merged.cells.append(nbformat.v4.new_markdown_cell(f"# {title}"))
+        for i, cell in enumerate(nb.cells):
+            if "id" in cell:
+                # cell IDs have to be unique within the merged notebook
+                cell["id"] = f"{n}-{i}"
+
+            merged.cells.append(cell)
+
+    if merged is None:
+        merged = nbformat.v4.new_notebook()
+
+    output_path = Path(output_path)
+    nbformat.write(merged, str(output_path))
+
+    return output_path
+
+
+def cli(argv: List[str] = None) -> int:
+    """Run the batch from the command line."""
+    parser = argparse.ArgumentParser(prog="python -m thoth_notebooks.batch", description=__doc__.splitlines()[0])
+    parser.add_argument("input_path", help="Notebook template to be executed.")
+    parser.add_argument("output_dir", help="Directory to store executed notebooks and the report.")
+    parser.add_argument("-f", "--parameters-file", required=True, help="YAML file with template parameters.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of notebooks executed concurrently.")
+    parser.add_argument(
+        "--identifiers-parameter",
+        default=DEFAULT_IDENTIFIERS_PARAMETER,
+        help="Name of the parameter holding the identifiers.",
+    )
+    parser.add_argument("-k", "--kernel", default=None, help="Name of the kernel to execute notebooks with.")
+    parser.add_argument("--no-merge", action="store_true", help="Do NOT merge executed notebooks.")
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    with open(args.parameters_file) as f:
+        parameters = yaml.safe_load(f)
+
+    report = run_batch(
+        args.input_path,
+        args.output_dir,
+        parameters,
+        identifiers_parameter=args.identifiers_parameter,
+        max_workers=args.jobs,
+        merge=not args.no_merge,
+        kernel_name=args.kernel,
+    )
+
+    print(f"{'identifier':30} {'status':8} {'duration [s]':>12}")
+    for result in report["results"]:
+        print(f"{result['identifier']:30} {result['status']:8} {result['duration']:12.2f}")
+
+    print(f"\nWall time: {report['wall_time']:.2f}s, sum of notebook durations: {report['total_duration']:.2f}s")
+
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(cli())
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+
+"""Vectorized bootstrap comparison of duration distributions across groups.
+
+Mean and median differences of the selected columns are estimated for all pairs of groups of
+the frame indexed by `query_inspection_dataframe` (or `group_inspection_dataframe`), together
+with bootstrap percentile confidence intervals:
+
+    d = query_inspection_dataframe(df, groupby=["platform", "ncpus"], exclude="node")
+    d = d.join(create_duration_dataframe(d)[["job_duration"]])
+
+    result = compare_groups(d, n_resamples=5000, seed=42)
+    result[result.significant]
+
+Resampling is done for all the groups at once - rows are sorted by group, so that each group is a
+contiguous segment, and a 2-D matrix of indexes (resamples x rows) is drawn, where indexes of each
+row fall into the segment of its group. Group means are then segment sums (`np.add.reduceat`) and,
+as values are sorted within segments, group medians are read at the middle positions of segments of
+the row-wise sorted index matrix. Resamples are processed in chunks to bound memory and can be spread
+over a process pool.
+"""
+
+import logging
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .inspection import get_group_codes
+from .inspection import get_numeric_columns
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLUMNS = [
+    "job_duration",
+    "job_log__stdout__@result__elapsed",
+    "job_log__stdout__@result__rate",
+]
+
+STATISTICS = ("mean", "median")
+
+
+def _segment_statistics(
+    sorted_values: np.ndarray, offsets: np.ndarray, sizes: np.ndarray, indexes: np.ndarray, statistic: str
+) -> np.ndarray:
+    """Compute statistic of each group (segment) for each resample (row of the index matrix)."""
+    if statistic == "mean":
+        return np.add.reduceat(sorted_values[indexes], offsets, axis=1) / sizes
+
+    # indexes of a segment stay in the segment after sorting, values are sorted within segments
+    indexes = np.sort(indexes, axis=1)
+    lower = sorted_values[indexes[:, offsets + (sizes - 1) // 2]]
+    upper = sorted_values[indexes[:, offsets + sizes // 2]]
+
+    return (lower + upper) / 2
+
+
+def _bootstrap_chunk(
+    sorted_values: np.ndarray,
+    offsets: np.ndarray,
+    sizes: np.ndarray,
+    n_resamples: int,
+    statistics: Tuple[str, ...],
+    seed,
+    chunk_size: int,
+) -> np.ndarray:
+    """Draw `n_resamples` resamples of all the groups, return array (statistic, resample, group)."""
+    rng = np.random.default_rng(seed)
+
+    n_rows = len(sorted_values)
+    row_offsets = np.repeat(offsets, sizes)
+    row_sizes = np.repeat(sizes, sizes)
+
+    result = np.empty((len(statistics), n_resamples, len(sizes)), dtype=np.float64)
+    for start in range(0, n_resamples, chunk_size):
+        stop = min(start + chunk_size, n_resamples)
+
+        # each row is replaced by a random row of the same group
+        indexes = row_offsets + (rng.random((stop - start, n_rows)) * row_sizes).astype(np.intp)
+
+        for i, statistic in enumerate(statistics):
+            result[i, start:stop] = _segment_statistics(sorted_values, offsets, sizes, indexes, statistic)
+
+    return result
+
+
+def bootstrap_groups(
+    values: np.ndarray,
+    codes: np.ndarray,
+    n_groups: int,
+    *,
+    statistics: Tuple[str, ...] = STATISTICS,
+    n_resamples: int = 2000,
+    seed: int = None,
+    max_workers: int = None,
+    chunk_size: int = None,
+) -> np.ndarray:
+    """Compute bootstrap distribution of statistics of all the groups at once.
+
+    :param values: 1-D array of values, NaNs are NOT allowed
+    :param codes: group of each value, integers in [0, n_groups)
+    :param n_groups: number of groups, each group has to have at least one value
+    :param statistics: statistics computed, see `STATISTICS`
+    :param n_resamples: number of bootstrap resamples
+    :param seed: seed of the random number generator
+    :param max_workers: spread resamples over a process pool of the given size, computed in-process if not set
+    :param chunk_size: number of resamples drawn at once, by default chosen to keep the index matrix around 64 MiB
+    :return: array of shape (len(statistics), n_resamples, n_groups)
+    """
+    unknown = set(statistics) - set(STATISTICS)
+    if unknown:
+        raise ValueError(f"Unknown statistics {sorted(unknown)}, available statistics: {STATISTICS}")
+
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    sizes = np.bincount(codes, minlength=n_groups)
+    if (sizes == 0).any():
+        raise ValueError("Each group has to have at least one value.")
+
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    if chunk_size is None:
+        chunk_size = max(1, (64 * 2 ** 20) // (8 * max(1, len(values))))
+
+    seed_sequence = np.random.SeedSequence(seed)
+
+    if not max_workers or max_workers <= 1:
+        return _bootstrap_chunk(sorted_values, offsets, sizes, n_resamples, tuple(statistics), seed_sequence, chunk_size)
+
+    # independent streams for workers, the result depends on the number of workers but NOT on scheduling
+    counts = [len(part) for part in np.array_split(np.arange(n_resamples), max_workers)]
+    seeds = seed_sequence.spawn(max_workers)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                _bootstrap_chunk, sorted_values, offsets, sizes, count, tuple(statistics), worker_seed, chunk_size
+            )
+            for count, worker_seed in zip(counts, seeds)
+            if count
+        ]
+        return np.concatenate([future.result() for future in futures], axis=1)
+
+
+def _observed_statistics(values: np.ndarray, codes: np.ndarray, n_groups: int) -> pd.DataFrame:
+    grouped = pd.Series(values).groupby(codes)
+
+    return pd.DataFrame({"mean": grouped.mean(), "median": grouped.median(), "n": grouped.size()}).reindex(
+        range(n_groups)
+    )
+
+
+def compare_groups(
+    inspection_df: pd.DataFrame,
+    columns: Union[str, List[str]] = None,
+    groupby: Union[str, List[str]] = None,
+    *,
+    statistics: Tuple[str, ...] = STATISTICS,
+    n_resamples: int = 2000,
+    confidence: float = 0.95,
+    min_size: int = 2,
+    seed: int = None,
+    max_workers: int = None,
+) -> pd.DataFrame:
+    """Compare distributions of the columns between all pairs of groups.
+
+    The difference (group A - group B) of each statistic is reported with the bootstrap percentile
+    confidence interval, the difference is significant if the interval does NOT contain zero.
+
+    :param inspection_df: grouped inspection DataFrame, durations can be joined from `create_duration_dataframe`
+    :param columns: columns (or regular expression matching columns), `DEFAULT_COLUMNS` found in the frame by default
+    :param groupby: index levels forming the groups, all named index levels by default
+    :param statistics: statistics compared, see `STATISTICS`
+    :param n_resamples: number of bootstrap resamples
+    :param confidence: confidence level of the intervals
+    :param min_size: groups with fewer values are NOT compared
+    :param seed: seed of the random number generator
+    :param max_workers: spread resamples over a process pool of the given size
+    :return: DataFrame indexed by (column, statistic, group_a, group_b)
+    """
+    if columns is None:
+        columns = [c for c in DEFAULT_COLUMNS if c in inspection_df.columns]
+    columns = get_numeric_columns(inspection_df, columns)
+    if not columns:
+        raise ValueError("No numeric columns to compare.")
+
+    codes, groups = get_group_codes(inspection_df, groupby)
+    if groups is None:
+        raise ValueError("The DataFrame is NOT grouped, provide `groupby` or group it using `query_inspection_dataframe`.")
+
+    alpha = (1 - confidence) / 2
+    results = []
+
+    for column in columns:
+        values = inspection_df[column].to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+
+        # keep only groups large enough, renumber them densely
+        sizes = np.bincount(codes[present], minlength=len(groups))
+        kept = np.flatnonzero(sizes >= min_size)
+        if len(kept) < 2:
+            logger.warning(f"Column {column!r} has fewer than 2 groups with at least {min_size} values, skipped")
+            continue
+
+        remap = np.full(len(groups), -1, dtype=np.intp)
+        remap[kept] = np.arange(len(kept))
+
+        column_codes = remap[codes[present]]
+        mask = column_codes >= 0
+        column_values, column_codes = values[present][mask], column_codes[mask]
+
+        distribution = bootstrap_groups(
+            column_values,
+            column_codes,
+            len(kept),
+            statistics=statistics,
+            n_resamples=n_resamples,
+            seed=seed,
+            max_workers=max_workers,
+        )
+        observed = _observed_statistics(column_values, column_codes, len(kept))
+
+        pairs = np.array(list(combinations(range(len(kept)), 2)), dtype=np.intp)
+        a, b = pairs[:, 0], pairs[:, 1]
+
+        # (resample, pair) differences are computed for chunks of pairs to bound memory
+        pair_chunk = max(1, (8 * 2 ** 20) // n_resamples)
+
+        for i, statistic in enumerate(statistics):
+            ci_low, ci_high = np.empty(len(pairs)), np.empty(len(pairs))
+            for start in range(0, len(pairs), pair_chunk):
+                chunk = slice(start, start + pair_chunk)
+                differences = distribution[i][:, a[chunk]] - distribution[i][:, b[chunk]]
+                ci_low[chunk], ci_high[chunk] = np.quantile(differences, [alpha, 1 - alpha], axis=0)
+
+            results.append(
+                pd.DataFrame(
+                    {
+                        "column": column,
+                        "statistic": statistic,
+                        "group_a": groups[kept[a]],
+                        "group_b": groups[kept[b]],
+                        "n_a": observed["n"].to_numpy()[a],
+                        "n_b": observed["n"].to_numpy()[b],
+                        "difference": observed[statistic].to_numpy()[a] - observed[statistic].to_numpy()[b],
+                        "ci_low": ci_low,
+                        "ci_high": ci_high,
+                    }
+                )
+            )
+
+    if not results:
+        raise ValueError("Not enough groups to compare.")
+
+    result = pd.concat(results, ignore_index=True)
+    result["significant"] = (result["ci_low"] > 0) | (result["ci_high"] < 0)
+
+    return result.set_index(["column", "statistic", "group_a", "group_b"])
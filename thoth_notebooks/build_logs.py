@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+
+"""Bulk analysis of build logs using `thoth.build_analysers`.
+
+Logs are analyzed on a process pool, each worker holds a single log at a time and is restarted
+after a number of analyzed logs, so that memory per worker stays bounded. Logs are streamed line by line
+and only the last `max_size` characters (32 MiB by default) are kept, so build logs are analyzed whole
+while a runaway log can NOT exhaust the worker memory (the failure is usually reported at the end of a
+build log). `max_lines` additionally keeps only the given number of last lines:
+
+    $ python -m thoth_notebooks.build_logs /path/to/logs/ output/ -j 8
+
+The output directory contains one JSON report per log (named after the log and a hash of its path) and `summary.parquet` (`summary.csv` if no
+parquet engine is installed) with the handler and scalar fields of the report (the breaker identified)
+for each log.
+
+Build logs repeat the same failures many times, each worker keeps an LRU cache of analyses keyed by
+a fingerprint of the normalized log tail (timestamps, hashes and temporary paths stripped), so
+identical failures are analyzed only once:
+
+    cache = AnalysisCache(max_entries=10000)
+    result = analyze_log(log, cache=cache)
+    cache.stats
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import time
+
+from collections import OrderedDict
+from collections import deque
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAIL_LINES = 200
+
+# maximum number of characters of a log kept in memory, larger logs are truncated from the beginning
+DEFAULT_MAX_SIZE = 32 * 2 ** 20
+
+_FINGERPRINT_MASKS = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<timestamp>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<time>"),
+    (re.compile(r"(?:/private)?(?:/var)?/tmp/[^\s'\"]*|/var/folders/[^\s'\"]*"), "<tmp>"),
+    (re.compile(r"\b[0-9a-f]{7,}\b", re.IGNORECASE), "<hash>"),
+]
+
+
+def read_log(path: Union[str, Path], max_lines: int = None, max_size: Optional[int] = DEFAULT_MAX_SIZE) -> str:
+    """Read the log line by line, only the last lines within `max_lines` and `max_size` are kept in memory.
+
+    :param path: path to the log
+    :param max_lines: maximum number of the last lines kept, all lines by default
+    :param max_size: maximum number of characters kept, None to read the whole log regardless of its size
+    """
+    lines: deque = deque()
+    size = 0
+    truncated = False
+
+    with open(path, errors="replace") as f:
+        for line in f:
+            if max_size is not None and len(line) > max_size:
+                line = line[-max_size:]
+
+            lines.append(line)
+            size += len(line)
+
+            if max_lines is not None and len(lines) > max_lines:
+                size -= len(lines.popleft())
+
+            while max_size is not None and size > max_size:
+                size -= len(lines.popleft())
+                truncated = True
+
+    if truncated:
+        logger.warning(f"Log {str(path)!r} exceeds {max_size} characters, only its end is analyzed")
+
+    return "".join(lines)
+
+
+def report_name(path: Union[str, Path]) -> str:
+    """Name the report of the log, logs of the same name in different directories get different reports."""
+    path = Path(path)
+    digest = hashlib.sha256(str(path.resolve()).encode("utf-8", errors="surrogateescape")).hexdigest()[:12]
+
+    return f"{path.name}-{digest}.json"
+
+
+def fingerprint_log(log: str, tail_lines: int = DEFAULT_TAIL_LINES) -> str:
+    """Compute fingerprint of the last `tail_lines` lines with timestamps, hashes and temporary paths stripped."""
+    tail = "\n".join(log.splitlines()[-tail_lines:])
+
+    for pattern, mask in _FINGERPRINT_MASKS:
+        tail = pattern.sub(mask, tail)
+
+    return hashlib.sha256(tail.encode("utf-8", errors="replace")).hexdigest()
+
+
+class AnalysisCache:
+    """In-memory LRU cache of log analyses keyed by the log fingerprint, bounded by number of entries and size."""
+
+    def __init__(
+        self, max_entries: int = 10000, max_size: int = 256 * 2 ** 20, tail_lines: int = DEFAULT_TAIL_LINES
+    ):
+        """Initialize the cache.
+
+        :param max_entries: maximum number of analyses kept
+        :param max_size: maximum size (in bytes, pickled) of analyses kept
+        :param tail_lines: number of last lines of a log the fingerprint is computed from
+        """
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.tail_lines = tail_lines
+
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, log: str) -> str:
+        """Compute key of the log."""
+        return fingerprint_log(log, tail_lines=self.tail_lines)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get the cached analysis, None if NOT cached."""
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """Store the analysis, least recently used analyses are evicted to keep the cache within limits."""
+        size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_size:
+            return
+
+        if key in self._entries:
+            self.size -= self._sizes.pop(key)
+            del self._entries[key]
+
+        self._entries[key] = value
+        self._sizes[key] = size
+        self.size += size
+
+        while len(self._entries) > self.max_entries or self.size > self.max_size:
+            evicted, _ = self._entries.popitem(last=False)
+            self.size -= self._sizes.pop(evicted)
+            self.evictions += 1
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        requests = self.hits + self.misses
+
+        return {
+            "entries": len(self._entries),
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / requests if requests else float("nan"),
+        }
+
+
+def analyze_log(log: str, cache: AnalysisCache = None) -> Dict[str, Any]:
+    """Analyze the build log and create a report, identical failures are analyzed only once if cache is provided."""
+    from thoth.build_analysers.analysis import build_breaker_analyze
+    from thoth.build_analysers.analysis import build_breaker_report
+
+    key = None
+    if cache is not None:
+        key = cache.key(log)
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+    handler, analysis = build_breaker_analyze(log)
+    report = build_breaker_report(analysis, handler=handler)
+
+    result = {"handler": str(handler), "analysis": analysis, "report": report}
+
+    if cache is not None:
+        cache.put(key, result)
+
+    return result
+
+
+def _flatten_report(report: Any, prefix: str = "report") -> Dict[str, Any]:
+    """Keep scalar fields of the (nested) report as `report__<key>__<key>` columns of the summary."""
+    if isinstance(report, dict):
+        result = {}
+        for key, value in report.items():
+            result.update(_flatten_report(value, f"{prefix}__{key}"))
+
+        return result
+
+    if report is None or isinstance(report, (str, int, float, bool)):
+        return {prefix: report}
+
+    return {}
+
+
+# cache of the worker process, the cache is dropped once the worker is recycled
+_WORKER_CACHE: Optional[AnalysisCache] = None
+
+
+def _init_worker(cache_entries: int) -> None:
+    global _WORKER_CACHE
+
+    _WORKER_CACHE = AnalysisCache(max_entries=cache_entries) if cache_entries else None
+
+
+def _analyze_file(args) -> Dict[str, Any]:
+    """Analyze a single log file, runs in a worker process."""
+    path, reports_dir, max_lines, max_size = args
+
+    result = {"log": str(path), "handler": None, "status": "ok", "error": None, "cache_hit": False}
+
+    hits = _WORKER_CACHE.hits if _WORKER_CACHE is not None else 0
+    start = time.monotonic()
+    try:
+        analysis = analyze_log(read_log(path, max_lines=max_lines, max_size=max_size), cache=_WORKER_CACHE)
+    except Exception as exc:
+        result.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+    else:
+        result["handler"] = analysis["handler"]
+        result["cache_hit"] = _WORKER_CACHE is not None and _WORKER_CACHE.hits > hits
+        result.update(_flatten_report(analysis["report"]))
+
+        report_path = Path(reports_dir) / report_name(path)
+        with open(report_path, "w") as f:
+            json.dump({"handler": analysis["handler"], "report": analysis["report"]}, f, default=str)
+
+        result["report_path"] = str(report_path)
+    finally:
+        result["duration"] = time.monotonic() - start
+
+    return result
+
+
+def _write_summary(summary, output_dir: Path) -> Path:
+    """Write the summary DataFrame in a columnar format if possible."""
+    try:
+        path = output_dir / "summary.parquet"
+        summary.to_parquet(path, index=False)
+    except ImportError:
+        logger.warning("No parquet engine installed (pyarrow or fastparquet), storing summary as CSV.")
+
+        path = output_dir / "summary.csv"
+        summary.to_csv(path, index=False)
+
+    return path
+
+
+def analyze_logs(
+    paths: Iterable[Union[str, Path]],
+    output_dir: Union[str, Path],
+    *,
+    max_workers: int = None,
+    max_lines: int = None,
+    max_size: Optional[int] = DEFAULT_MAX_SIZE,
+    max_tasks_per_worker: int = 1000,
+    chunksize: int = 16,
+    cache_entries: int = 10000,
+):
+    """Analyze build logs in parallel, write per-log reports and the summary into `output_dir`.
+
+    :param paths: paths to build logs
+    :param output_dir: directory to store reports and the summary into
+    :param max_workers: number of worker processes, defaults to the number of CPUs
+    :param max_lines: analyze only the given number of last lines of each log, whole logs are analyzed by default
+    :param max_size: maximum number of characters of a log held in memory, only the end of larger logs is analyzed
+    :param max_tasks_per_worker: number of logs analyzed by a worker before it is replaced by a fresh one
+    :param chunksize: number of logs sent to a worker at once
+    :param cache_entries: maximum number of analyses cached per worker, 0 disables the cache
+    """
+    import pandas as pd
+
+    output_dir = Path(output_dir)
+    reports_dir = output_dir / "reports"
+    reports_dir.mkdir(parents=True, exist_ok=True)
+
+    tasks = ((path, reports_dir, max_lines, max_size) for path in paths)
+
+    results: List[Dict[str, Any]] = []
+    start = time.monotonic()
+
+    with Pool(
+        processes=max_workers or os.cpu_count(),
+        initializer=_init_worker,
+        initargs=(cache_entries,),
+        maxtasksperchild=max_tasks_per_worker,
+    ) as pool:
+        for result in pool.imap_unordered(_analyze_file, tasks, chunksize=chunksize):
+            results.append(result)
+
+            if len(results) % 1000 == 0:
+                elapsed = time.monotonic() - start
+                logger.info(f"Analyzed {len(results)} logs, {len(results) / elapsed:.1f} logs/s")
+
+    elapsed = time.monotonic() - start
+
+    columns = ["log", "handler", "status", "error", "cache_hit", "duration", "report_path"]
+    summary = pd.DataFrame(results)
+    summary = summary.reindex(columns=columns + sorted(set(summary.columns) - set(columns)))
+    summary["handler"] = summary["handler"].astype("category")
+    summary["status"] = summary["status"].astype("category")
+
+    summary_path = _write_summary(summary, output_dir)
+
+    stats = {
+        "logs": len(results),
+        "failed": int((summary.status != "ok").sum()),
+        "elapsed": elapsed,
+        "throughput": len(results) / elapsed if elapsed else float("nan"),
+        "cache_hit_rate": float(summary.cache_hit.mean()) if len(summary) else float("nan"),
+        "analysis_time": float(summary.duration.sum()),
+        "analysis_time_cached": float(summary.duration[summary.cache_hit.astype(bool)].sum()),
+        "summary_path": str(summary_path),
+        "handlers": summary.groupby("handler", observed=True).size().to_dict(),
+    }
+
+    logger.info(f"Analyzed {stats['logs']} logs in {elapsed:.2f}s ({stats['throughput']:.1f} logs/s)")
+
+    return summary, stats
+
+
+def cli(argv: List[str] = None) -> int:
+    """Analyze build logs from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python -m thoth_notebooks.build_logs", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("paths", nargs="+", help="Build logs or directories with build logs.")
+    parser.add_argument("output_dir", help="Directory to store reports and the summary into.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument(
+        "--max-lines",
+        type=int,
+        default=None,
+        help="Analyze only the given number of last lines of each log (whole logs are analyzed by default).",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        default=DEFAULT_MAX_SIZE,
+        help="Maximum number of characters of a log held in memory, only the end of larger logs is analyzed.",
+    )
+    parser.add_argument(
+        "--cache-entries", type=int, default=10000, help="Analyses cached per worker, 0 disables the cache."
+    )
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    def iter_paths():
+        for p in map(Path, args.paths):
+            if p.is_dir():
+                yield from (f for f in sorted(p.iterdir()) if f.is_file())
+            else:
+                yield p
+
+    _, stats = analyze_logs(
+        iter_paths(),
+        args.output_dir,
+        max_workers=args.jobs,
+        max_lines=args.max_lines,
+        max_size=args.max_size,
+        cache_entries=args.cache_entries,
+    )
+
+    for handler, count in stats["handlers"].items():
+        print(f"{handler:40} {count:8}")
+
+    print(f"\n{stats['logs']} logs ({stats['failed']} failed) in {stats['elapsed']:.2f}s, {stats['throughput']:.1f} logs/s")
+    print(f"Cache hit rate {stats['cache_hit_rate']:.1%}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(cli())
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""Content-addressed cache for expensive stages of the notebook templates.
+
+A stage result is stored under a key computed from:
+
+    - the stage name
+    - the template parameters the stage depends on
+    - a fingerprint of the input document IDs
+    - the keys of the upstream stages the stage consumes
+
+Arguments of the stage function are NOT part of the key, hashing DataFrames and results of upstream
+stages on each run would cost as much as loading them. Describe everything the stage depends on
+using `parameters`, `inputs` and `depends_on` instead. If a parameter changes, only the stages which
+depend on it (directly or through an upstream stage) are recomputed, all the others are loaded from the cache:
+
+    cache = StageCache()
+
+    inspection_batch_info, INSPECTION_BATCH_IDS = cache.run(
+        "aggregate_dm_results",
+        dependency_monkey.aggregate_dm_results_per_identifier,
+        IDENTIFIERS_INSPECTION,
+        limit_results=LIMIT_RESULTS,
+        max_batch_identifiers_ids=5,
+        parameters={"IDENTIFIERS_INSPECTION": IDENTIFIERS_INSPECTION, "LIMIT_RESULTS": LIMIT_RESULTS},
+    )
+
+    inspection_results_dict = cache.run(
+        "aggregate_inspection_results",
+        inspection.aggregate_inspection_results_per_identifier,
+        filtered_inspection_ids,
+        REDUCED_INSPECTION_BATCH_IDS,
+        inspection_batch_info,
+        inputs=filtered_inspection_ids,
+        depends_on=["aggregate_dm_results"],
+    )
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(os.getenv("THOTH_NOTEBOOKS_CACHE_DIR", ".cache/stages"))
+
+
+def fingerprint(document_ids: Union[Iterable[str], Mapping[str, Iterable[str]]]) -> str:
+    """Compute order-independent fingerprint of the document IDs, optionally grouped by identifier."""
+    if isinstance(document_ids, Mapping):
+        document_ids = (f"{group}/{document_id}" for group, ids in document_ids.items() for document_id in ids)
+
+    digest = hashlib.sha256()
+    for document_id in sorted(set(map(str, document_ids))):
+        digest.update(document_id.encode())
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+def stage_key(
+    stage: str,
+    parameters: Dict[str, Any] = None,
+    inputs: str = None,
+    upstream: List[str] = None,
+) -> str:
+    """Compute the key of the stage result."""
+    payload = json.dumps(
+        {
+            "stage": stage,
+            "parameters": parameters or {},
+            "inputs": inputs,
+            "upstream": list(upstream or []),
+        },
+        sort_keys=True,
+        default=repr,
+    )
+
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class StageCache:
+    """Cache results of template stages on the local disk."""
+
+    def __init__(self, cache_dir: Union[str, Path] = None, enabled: bool = True):
+        """Initialize the cache, results are stored in `cache_dir`."""
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+        self.enabled = enabled
+
+        # keys of the stages run within this cache, used to resolve `depends_on`
+        self.keys: Dict[str, str] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.cache_dir / stage / f"{key}.pickle"
+
+    def run(
+        self,
+        stage: str,
+        func: Callable,
+        *args,
+        parameters: Dict[str, Any] = None,
+        inputs: Iterable[str] = None,
+        depends_on: List[str] = None,
+        **kwargs,
+    ) -> Any:
+        """Run the stage or load its result from the cache.
+
+        :param stage: name of the stage
+        :param func: function computing the stage result, called as `func(*args, **kwargs)`, the arguments
+            are NOT part of the key
+        :param parameters: template parameters the stage depends on
+        :param inputs: IDs of the input documents the stage consumes (or a mapping of identifiers to IDs)
+        :param depends_on: names of the upstream stages (run previously) the stage consumes results of
+        :raises ValueError: if the stage takes arguments but its key would consist of the stage name only
+        """
+        if (args or kwargs) and not (parameters or inputs is not None or depends_on):
+            raise ValueError(
+                f"Stage {stage!r} takes arguments, but NO parameters, inputs or upstream stages are given, "
+                "the result would be loaded from the cache regardless of the arguments."
+            )
+
+        upstream = []
+        for name in depends_on or []:
+            try:
+                upstream.append(self.keys[name])
+            except KeyError:
+                raise KeyError(f"Upstream stage {name!r} has NOT been run yet.")
+
+        key = stage_key(
+            stage,
+            parameters=parameters,
+            inputs=fingerprint(inputs) if inputs is not None else None,
+            upstream=upstream,
+        )
+
+        path = self._path(stage, key)
+        start = time.monotonic()
+
+        if self.enabled and path.exists():
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+
+            # downstream stages resolve only stages which produced a result
+            self.keys[stage] = key
+            self.stats[stage] = {"key": key, "hit": True, "duration": time.monotonic() - start}
+            logger.info(f"Stage {stage!r} loaded from cache in {self.stats[stage]['duration']:.3f}s")
+
+            return result
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            # a result of a previous run of the stage does NOT correspond to the current arguments
+            self.keys.pop(stage, None)
+            raise
+
+        duration = time.monotonic() - start
+        self.keys[stage] = key
+
+        if self.enabled:
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            # write atomically, concurrent runs must never see a partial result
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+
+        self.stats[stage] = {"key": key, "hit": False, "duration": duration}
+        logger.info(f"Stage {stage!r} computed in {duration:.3f}s")
+
+        return result
+
+    def clear(self, stage: str = None) -> None:
+        """Remove cached results of the given stage or of all stages."""
+        path = self.cache_dir / stage if stage else self.cache_dir
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+
+"""Online detection of duration regressions in the stream of inspections.
+
+Inspections are consumed in the order of their start (`status__job__started_at`), a detector
+with O(1) state is kept for each group (e.g. a hardware platform and a software stack). Each
+group first collects `warmup` durations which establish the baseline, subsequent durations are
+standardized by the baseline and fed into a one-sided CUSUM (or Page-Hinkley) statistic which
+accumulates evidence that jobs got slower:
+
+    detector = RegressionDetector(groupby=["platform", "ncpus", "base"], column="job_duration", exclude="node")
+    detector.update(df.join(create_duration_dataframe(df)[["job_duration"]]))
+    detector.events()
+
+    detector.save("regressions.pickle")
+
+The detector can be loaded and updated with new batches of inspections, or reset and run over the
+full history (`backfill`). Documents of inspections appear only once jobs finish, so a job started
+earlier can arrive in a later batch than jobs started after it. Inspections are therefore processed
+only once they started at least `lag` before the latest finish seen, the rest is kept pending for the
+next batch. If no job runs longer than `lag`, updating in batches gives the same events as a backfill,
+inspections arriving even later are still processed (out of order) and reported in the log. Each
+regression event reports the first inspections of the slower run.
+"""
+
+import logging
+import math
+import os
+import pickle
+import tempfile
+
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Set, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STARTED_AT = "status__job__started_at"
+FINISHED_AT = "status__job__finished_at"
+ID_COLUMN = "inspection_id"
+
+METHODS = ("cusum", "page_hinkley")
+
+
+class _GroupState:
+    """Detector state of a single group, its size does NOT depend on the number of inspections."""
+
+    __slots__ = (
+        "n",
+        "mean",
+        "m2",
+        "baseline_mean",
+        "baseline_std",
+        "statistic",
+        "minimum",
+        "offending",
+        "offending_since",
+        "offending_sum",
+        "offending_count",
+    )
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.baseline_mean: Optional[float] = None
+        self.baseline_std: Optional[float] = None
+        self.statistic = 0.0
+        self.minimum = 0.0
+        self.offending: List[str] = []
+        self.offending_since = None
+        self.offending_sum = 0.0
+        self.offending_count = 0
+
+    def reset_offending(self) -> None:
+        self.offending = []
+        self.offending_since = None
+        self.offending_sum = 0.0
+        self.offending_count = 0
+
+
+class RegressionDetector:
+    """Detect increases of duration per group using CUSUM or Page-Hinkley statistic."""
+
+    def __init__(
+        self,
+        groupby: Union[str, List[str]],
+        column: str = "job_duration",
+        *,
+        exclude: Union[str, List[str]] = None,
+        method: str = "cusum",
+        warmup: int = 30,
+        drift: float = 0.5,
+        threshold: float = 8.0,
+        max_ids: int = 10,
+        lag: str = "6h",
+        started_at: str = STARTED_AT,
+        finished_at: str = FINISHED_AT,
+        id_column: str = ID_COLUMN,
+    ):
+        """Initialize the detector.
+
+        :param groupby: patterns of columns forming the group key, matched as in `group_inspection_dataframe`
+        :param column: duration column monitored
+        :param exclude: patterns of columns which should NOT be part of the group key even if matched by `groupby`
+        :param method: cusum or page_hinkley
+        :param warmup: number of durations establishing the baseline of a group
+        :param drift: allowed slowdown, in baseline standard deviations, which is NOT reported
+        :param threshold: evidence (in baseline standard deviations) needed to report a regression
+        :param max_ids: number of first offending inspection IDs reported with the event
+        :param lag: inspections are processed once they started at least `lag` before the latest finish seen,
+            it should be longer than the longest job so that no inspection arrives after later ones were processed
+        :param started_at: column with job start timestamps, inspections are processed in this order
+        :param finished_at: column with job finish timestamps
+        :param id_column: column with inspection IDs
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown detection method {method!r}, available methods: {METHODS}")
+
+        if warmup < 2:
+            raise ValueError(f"At least 2 durations are needed to establish the baseline, got {warmup}")
+
+        self.groupby = [groupby] if isinstance(groupby, str) else list(groupby)
+        self.column = column
+        self.exclude = [exclude] if isinstance(exclude, str) else list(exclude or [])
+        self.method = method
+        self.warmup = warmup
+        self.drift = drift
+        self.threshold = threshold
+        self.max_ids = max_ids
+        self.lag = pd.Timedelta(lag)
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.id_column = id_column
+
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget states of all the groups, all the events and inspections processed."""
+        self._groups: Dict[Hashable, _GroupState] = {}
+        self._events: List[Dict[str, Any]] = []
+        self._group_columns: Optional[List[str]] = None
+        self._processed: Set[str] = set()
+        self._pending: Optional[pd.DataFrame] = None
+        self._latest_started: Optional[pd.Timestamp] = None
+        self._latest_finished: Optional[pd.Timestamp] = None
+
+    def _resolve_group_columns(self, df: pd.DataFrame) -> List[str]:
+        """Get columns forming the group key, resolved on the first batch and kept for the next ones."""
+        if self._group_columns is not None:
+            missing = [c for c in self._group_columns if c not in df.columns]
+            if missing:
+                raise KeyError(f"Could NOT find group columns {missing} in the inspection DataFrame")
+
+            return self._group_columns
+
+        columns = [
+            c
+            for c in df.columns
+            if any(key in c for key in self.groupby)
+            and not any(e in c for e in self.exclude)
+            and c not in (self.column, self.started_at, self.finished_at, self.id_column)
+        ]
+        if not columns:
+            raise KeyError(f"Could NOT find columns to group by given the keys: {self.groupby}")
+
+        self._group_columns = sorted(columns)
+
+        return self._group_columns
+
+    def _observe(self, key: Hashable, state: _GroupState, inspection_id: str, started_at, value: float) -> None:
+        if state.baseline_mean is None:
+            # Welford's algorithm for the baseline
+            state.n += 1
+            delta = value - state.mean
+            state.mean += delta / state.n
+            state.m2 += delta * (value - state.mean)
+
+            if state.n >= self.warmup:
+                state.baseline_mean = state.mean
+                # a constant baseline would make any change infinitely significant
+                state.baseline_std = max(math.sqrt(state.m2 / (state.n - 1)), 1e-3 * abs(state.mean), 1e-9)
+
+            return
+
+        z = (value - state.baseline_mean) / state.baseline_std
+
+        if self.method == "cusum":
+            state.statistic = max(0.0, state.statistic + z - self.drift)
+            starts_run = state.statistic > 0 and state.offending_since is None
+            ends_run = state.statistic == 0
+            evidence = state.statistic
+        else:
+            # Page-Hinkley on the running mean of the group
+            state.n += 1
+            state.mean += (value - state.mean) / state.n
+            state.statistic += (value - state.mean) / state.baseline_std - self.drift
+
+            ends_run = state.statistic <= state.minimum
+            if ends_run:
+                state.minimum = state.statistic
+            starts_run = not ends_run and state.offending_since is None
+            evidence = state.statistic - state.minimum
+
+        if ends_run:
+            state.reset_offending()
+            return
+
+        if starts_run:
+            state.offending_since = started_at
+
+        if len(state.offending) < self.max_ids:
+            state.offending.append(inspection_id)
+        state.offending_sum += value
+        state.offending_count += 1
+
+        if evidence > self.threshold:
+            self._events.append(
+                {
+                    "group": key,
+                    "detected_id": inspection_id,
+                    "detected_at": started_at,
+                    "since": state.offending_since,
+                    "first_offending_ids": list(state.offending),
+                    "offending": state.offending_count,
+                    "baseline_mean": state.baseline_mean,
+                    "baseline_std": state.baseline_std,
+                    "offending_mean": state.offending_sum / state.offending_count,
+                    "statistic": evidence,
+                }
+            )
+            logger.info(f"Regression of {self.column!r} detected in group {key!r} at inspection {inspection_id!r}")
+
+            # the slower level becomes the new baseline once enough durations are collected
+            self._groups[key] = _GroupState()
+
+    def update(self, inspection_df: pd.DataFrame, flush: bool = False) -> List[Dict[str, Any]]:
+        """Process a batch of inspections, return regression events detected in the batch.
+
+        Inspections already processed are skipped, inspections which started less than `lag` before
+        the latest finish seen are kept pending until the next batch.
+
+        :param inspection_df: inspection DataFrame with the duration column
+        :param flush: process also pending inspections, e.g. when no more inspections are expected
+        """
+        group_columns = self._resolve_group_columns(inspection_df)
+        for column in (self.column, self.started_at, self.finished_at, self.id_column):
+            if column not in inspection_df.columns:
+                raise KeyError(f"Could NOT find column {column!r} in the inspection DataFrame")
+
+        df = inspection_df[[self.id_column, self.started_at, self.finished_at, self.column] + group_columns].copy()
+        df[self.started_at] = pd.to_datetime(df[self.started_at], utc=True)
+        df[self.finished_at] = pd.to_datetime(df[self.finished_at], utc=True)
+        df = df.dropna(subset=[self.started_at, self.column])
+
+        if self._pending is not None:
+            df = pd.concat([self._pending, df], ignore_index=True)
+
+        df = df[~df[self.id_column].isin(self._processed)].drop_duplicates(subset=[self.id_column])
+
+        latest_finished = df[self.finished_at].max()
+        if pd.notna(latest_finished) and (self._latest_finished is None or latest_finished > self._latest_finished):
+            self._latest_finished = latest_finished
+
+        if flush:
+            ready = pd.Series(True, index=df.index)
+        elif self._latest_finished is None:
+            ready = pd.Series(False, index=df.index)
+        else:
+            ready = df[self.started_at] <= self._latest_finished - self.lag
+
+        self._pending = df[~ready]
+        df = df[ready].sort_values([self.started_at, self.id_column], kind="mergesort")
+
+        n_events = len(self._events)
+
+        if self._latest_started is not None:
+            n_late = int((df[self.started_at] < self._latest_started).sum())
+            if n_late:
+                logger.warning(
+                    f"Processing {n_late} inspections which started before the last inspection processed, "
+                    f"consider increasing lag (currently {self.lag})"
+                )
+
+        for row in df.itertuples(index=False, name=None):
+            inspection_id, started_at, _, value = row[:4]
+
+            key = tuple(_hashable(v) for v in row[4:])
+            state = self._groups.get(key)
+            if state is None:
+                state = self._groups[key] = _GroupState()
+
+            self._observe(key, state, inspection_id, started_at, float(value))
+            self._processed.add(inspection_id)
+
+            if self._latest_started is None or started_at > self._latest_started:
+                self._latest_started = started_at
+
+        return self._events[n_events:]
+
+    @property
+    def pending(self) -> int:
+        """Number of inspections waiting to be processed."""
+        return 0 if self._pending is None else len(self._pending)
+
+    def backfill(self, inspection_df: pd.DataFrame, flush: bool = False) -> List[Dict[str, Any]]:
+        """Reset the detector and process the full history of inspections, see `update` for the parameters."""
+        self.reset()
+
+        return self.update(inspection_df, flush=flush)
+
+    def events(self) -> pd.DataFrame:
+        """Get all the regression events detected."""
+        columns = [
+            "group",
+            "detected_id",
+            "detected_at",
+            "since",
+            "first_offending_ids",
+            "offending",
+            "baseline_mean",
+            "baseline_std",
+            "offending_mean",
+            "statistic",
+        ]
+
+        return pd.DataFrame(self._events, columns=columns)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Persist the detector, so that it can be updated with new batches later."""
+        path = Path(path)
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "RegressionDetector":
+        """Load persisted detector."""
+        with open(path, "rb") as f:
+            detector = pickle.load(f)
+
+        if not isinstance(detector, cls):
+            raise TypeError(f"File {str(path)!r} does NOT contain {cls.__name__}")
+
+        return detector
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+
+    if isinstance(value, dict):
+        return repr(value)
+
+    if isinstance(value, float) and np.isnan(value):
+        return None
+
+    return value
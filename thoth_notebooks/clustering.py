@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+
+"""Incremental classification of solver errors.
+
+The classifier uses a stateless hashing vectorizer and mini-batch k-means, so the model
+is updated batch by batch and can cover the whole solver corpus instead of a sample held in memory:
+
+    classifier = SolverErrorClassifier(n_clusters=20)
+
+    for batch in batched(iter_error_messages(iter_documents(solvers, predicate)), 1024):
+        classifier.partial_fit([message for _, message in batch])
+
+    classifier.save("solver-error-classifier.pickle")
+
+New documents are folded in by `fold_in` (documents already seen are skipped) on a loaded classifier
+and scored in bulk using `predict_stream`.
+
+Error messages are normalized before vectorization: versions, paths, hashes and package names
+are masked, so messages which differ only in these are turned into the same template. Large batches
+are classified using `classify_messages`, which predicts each distinct template only once and keeps
+template assignments in a persistent cache:
+
+    cache = TemplateCache.load("solver-error-templates.pickle", classifier)
+    assignments = dict(classify_messages(classifier, messages, cache=cache))
+    cache.save()
+"""
+
+import hashlib
+import itertools
+import logging
+import os
+import pickle
+import re
+import tempfile
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+_MASKS = [
+    # URLs and paths first, they can contain versions and package names
+    (re.compile(r"\b[a-z][a-z0-9+.-]*://\S+", re.IGNORECASE), "<url>"),
+    (re.compile(r"(?:[a-z]:)?(?:[\\/][\w.@+~-]+){2,}[\\/]?", re.IGNORECASE), "<path>"),
+    (re.compile(r"\b(?:sha256:)?[0-9a-f]{7,}\b", re.IGNORECASE), "<hash>"),
+    # package names in requirement specifications, e.g. "tensorflow==1.13.1" or "numpy>=1.0"
+    (re.compile(r"[\w.-]+(?=\s*(?:===|==|>=|<=|~=|!=|<|>)\s*v?\d)"), "<package>"),
+    (re.compile(r"\bv?\d+(?:\.\d+)+(?:[.-]?(?:a|b|rc|post|dev)\d*|\+[\w.]+)*\b", re.IGNORECASE), "<version>"),
+    (re.compile(r"\b\d+\b"), "<number>"),
+]
+
+
+def normalize_message(message: str, package_names: Iterable[str] = None) -> str:
+    """Turn the error message into a template by masking versions, paths, hashes and package names.
+
+    :param message: error message to be normalized
+    :param package_names: names of packages to be masked in addition to those found in requirement specifications
+    """
+    template = message.lower()
+
+    for pattern, mask in _MASKS:
+        template = pattern.sub(mask, template)
+
+    for package_name in package_names or ():
+        template = re.sub(rf"(?<![\w.-]){re.escape(package_name.lower())}(?![\w-])", "<package>", template)
+
+    return " ".join(template.split())
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """Split the iterable into lists of (at most) `size` items."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+
+        yield batch
+
+
+def error_message(document: Dict[str, Any]) -> str:
+    """Get message of the (first) error reported in the solver document."""
+    return document["result"]["errors"][0]["details"]["message"]
+
+
+def iter_error_messages(documents: Iterable[Tuple[str, Dict[str, Any]]]) -> Iterator[Tuple[str, str]]:
+    """Turn (document ID, document) pairs into (document ID, error message) pairs."""
+    for document_id, document in documents:
+        yield document_id, error_message(document)
+
+
+class SolverErrorClassifier:
+    """Cluster solver error messages using hashing vectorizer and mini-batch k-means."""
+
+    def __init__(
+        self,
+        n_clusters: int = 20,
+        n_features: int = 2 ** 18,
+        batch_size: int = 1024,
+        max_terms: int = 2 ** 16,
+        random_state: int = 42,
+        normalize: bool = True,
+    ):
+        """Initialize the classifier.
+
+        :param n_clusters: number of clusters
+        :param n_features: number of features of the hashing vectorizer
+        :param batch_size: batch size of the mini-batch k-means
+        :param max_terms: maximum number of terms remembered to describe cluster centers
+        :param random_state: seed for reproducible runs
+        :param normalize: turn messages into templates using `normalize_message` before vectorization
+        """
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.n_clusters = n_clusters
+        self.max_terms = max_terms
+        self.normalize = normalize
+
+        # messages are turned into templates by `template`, NOT by the vectorizer, so that callers
+        # predicting already normalized templates (see `classify_messages`) do NOT normalize them twice
+        self.vectorizer = HashingVectorizer(
+            stop_words="english",
+            n_features=n_features,
+            alternate_sign=False,
+            norm="l2",
+        )
+        self.model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=random_state)
+
+        self.n_samples_seen = 0
+        # IDs of documents the model has been updated with, see `fold_in`
+        self.document_ids: Set[str] = set()
+        # IDs of documents NOT matching the predicate of the training set, so that they are NOT retrieved again
+        self.rejected_ids: Set[str] = set()
+        self._fingerprint: Optional[str] = None
+
+        # hashing vectorizer is stateless, terms are kept to be able to describe cluster centers
+        self._terms: Dict[int, str] = {}
+        # model needs at least `n_clusters` samples for initialization
+        self._pending: List[str] = []
+
+    @property
+    def is_fitted(self) -> bool:
+        """Check whether the model has been initialized."""
+        return hasattr(self.model, "cluster_centers_")
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        """Fingerprint of the model, predictions of models with the same fingerprint are the same.
+
+        The fingerprint is computed from cluster centers and the vectorizer configuration, None if NOT fitted.
+        """
+        if not self.is_fitted:
+            return None
+
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+
+            vectorizer = sorted(self.vectorizer.get_params().items(), key=lambda item: item[0])
+            digest.update(repr((self.normalize, vectorizer)).encode("utf-8"))
+
+            centers = np.ascontiguousarray(self.model.cluster_centers_)
+            digest.update(str((centers.dtype, centers.shape)).encode("utf-8"))
+            digest.update(centers.tobytes())
+
+            self._fingerprint = digest.hexdigest()
+
+        return self._fingerprint
+
+    def template(self, message: str) -> str:
+        """Turn the error message into the text the model is trained on and predicts."""
+        return normalize_message(message) if self.normalize else message
+
+    def _remember_terms(self, texts: List[str]) -> None:
+        if len(self._terms) >= self.max_terms:
+            return
+
+        analyzer = self.vectorizer.build_analyzer()
+        known = set(self._terms.values())
+        terms = sorted(set(itertools.chain.from_iterable(map(analyzer, texts))) - known)
+        if not terms:
+            return
+
+        # one row per term, each row has (at most) one non-zero feature
+        X = self.vectorizer.transform(terms)
+        for row, term in enumerate(terms):
+            index = X.indices[X.indptr[row]:X.indptr[row + 1]]
+            if len(index):
+                self._terms.setdefault(int(index[0]), term)
+
+            if len(self._terms) >= self.max_terms:
+                break
+
+    def partial_fit(self, texts: List[str]) -> "SolverErrorClassifier":
+        """Update the model with a batch of error messages."""
+        texts = self._pending + [self.template(text) for text in texts]
+        if not self.is_fitted and len(texts) < self.n_clusters:
+            self._pending = texts
+            return self
+
+        self._pending = []
+
+        self._remember_terms(texts)
+        self.model.partial_fit(self.vectorizer.transform(texts))
+        self.n_samples_seen += len(texts)
+        self._fingerprint = None
+
+        return self
+
+    def fit_stream(self, texts: Iterable[str], batch_size: int = 1024) -> "SolverErrorClassifier":
+        """Update the model batch by batch from the (possibly unbounded) stream of messages."""
+        for batch in batched(texts, batch_size):
+            self.partial_fit(batch)
+            logger.debug(f"Classifier updated, {self.n_samples_seen} samples seen so far")
+
+        return self
+
+    def fold_in(self, messages: Iterable[Tuple[str, str]], batch_size: int = 1024) -> int:
+        """Update the model with (document ID, message) pairs of documents NOT seen so far.
+
+        Returns the number of documents the model has been updated with.
+        """
+        new_messages = ((i, m) for i, m in messages if i not in self.document_ids)
+
+        count = 0
+        for batch in batched(new_messages, batch_size):
+            document_ids, texts = zip(*batch)
+
+            self.partial_fit(texts)
+            self.document_ids.update(document_ids)
+            count += len(batch)
+
+        return count
+
+    def predict(self, texts: List[str]) -> np.ndarray:
+        """Assign clusters to the error messages."""
+        return self.predict_templates([self.template(text) for text in texts])
+
+    def predict_templates(self, templates: List[str]) -> np.ndarray:
+        """Assign clusters to messages already turned into templates by `template`."""
+        if not self.is_fitted:
+            raise ValueError("Classifier is NOT fitted yet.")
+
+        return self.model.predict(self.vectorizer.transform(list(templates)))
+
+    def predict_stream(
+        self, messages: Iterable[Tuple[str, str]], batch_size: int = 1024
+    ) -> Iterator[Tuple[str, int]]:
+        """Assign clusters to the stream of (document ID, message) pairs, scored in batches."""
+        for batch in batched(messages, batch_size):
+            document_ids, texts = zip(*batch)
+            yield from zip(document_ids, self.predict(texts).tolist())
+
+    def top_terms(self, n_terms: int = 20) -> Dict[int, List[str]]:
+        """Get the most significant terms for each cluster."""
+        if not self.is_fitted:
+            raise ValueError("Classifier is NOT fitted yet.")
+
+        centroids = self.model.cluster_centers_.argsort()[:, ::-1]
+
+        result = {}
+        for cluster in range(self.n_clusters):
+            terms = (self._terms.get(int(idx)) for idx in centroids[cluster])
+            result[cluster] = list(itertools.islice(filter(None, terms), n_terms))
+
+        return result
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Persist the classifier state."""
+        path = Path(path)
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "SolverErrorClassifier":
+        """Load persisted classifier."""
+        with open(path, "rb") as f:
+            classifier = pickle.load(f)
+
+        if not isinstance(classifier, cls):
+            raise TypeError(f"File {str(path)!r} does NOT contain {cls.__name__}")
+
+        return classifier
+
+
+class TemplateCache:
+    """Persistent mapping of message templates to clusters assigned by the classifier.
+
+    Assignments are bound to the model (see `SolverErrorClassifier.fingerprint`), the cache is invalidated
+    once the classifier is updated with new documents or a different classifier is used.
+    """
+
+    def __init__(self, path: Union[str, Path] = None, model_state: str = None):
+        """Initialize empty cache persisted to `path`."""
+        self.path = Path(path) if path else None
+        self.model_state = model_state
+        self.assignments: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: Union[str, Path], classifier: SolverErrorClassifier) -> "TemplateCache":
+        """Load the cache, an empty cache is returned if the classifier has been updated since the cache was saved."""
+        cache = cls(path, model_state=classifier.fingerprint)
+
+        try:
+            with open(path, "rb") as f:
+                model_state, assignments = pickle.load(f)
+        except FileNotFoundError:
+            return cache
+
+        if model_state == cache.model_state:
+            cache.assignments = assignments
+        else:
+            logger.info("Classifier has changed since the template cache was saved, cache invalidated.")
+
+        return cache
+
+    def save(self, path: Union[str, Path] = None) -> None:
+        """Persist the cache."""
+        path = Path(path or self.path)
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((self.model_state, self.assignments), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+def classify_messages(
+    classifier: SolverErrorClassifier,
+    messages: Iterable[Tuple[str, str]],
+    cache: TemplateCache = None,
+    batch_size: int = 10000,
+) -> Iterator[Tuple[str, int]]:
+    """Assign clusters to (document ID, message) pairs, each distinct template is predicted only once.
+
+    :param classifier: fitted classifier
+    :param messages: (document ID, error message) pairs
+    :param cache: template assignments cache, assignments are kept only for this call if not provided
+    :param batch_size: number of messages normalized and deduplicated at once
+    """
+    cache = cache if cache is not None else TemplateCache(model_state=classifier.fingerprint)
+    if cache.model_state != classifier.fingerprint:
+        raise ValueError("Template cache does NOT correspond to the classifier state.")
+
+    for batch in batched(messages, batch_size):
+        templates = [classifier.template(message) for _, message in batch]
+
+        missing = list(dict.fromkeys(t for t in templates if t not in cache.assignments))
+        if missing:
+            cache.assignments.update(zip(missing, classifier.predict_templates(missing).tolist()))
+
+        cache.misses += len(missing)
+        cache.hits += len(templates) - len(missing)
+
+        for (document_id, _), template in zip(batch, templates):
+            yield document_id, cache.assignments[template]
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""Contention of inspection jobs computed from their start and finish timestamps.
+
+For each job, the number of other jobs running at its start and the average number of other
+jobs running during its run are computed overall and per node:
+
+    df = add_contention_columns(df)
+    query_inspection_dataframe(df, groupby=["platform", "ncpus"], like="contention")
+
+Both are computed by a sweep over sorted start and finish timestamps - the number of jobs running
+at time `t` is the number of starts minus the number of finishes before `t` (binary search in the
+sorted timestamps) and the integral of the number of running jobs up to `t` is computed from prefix
+sums of the sorted timestamps, so the whole computation is O(n log n) instead of comparing all pairs
+of jobs.
+"""
+
+import logging
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STARTED_AT = "status__job__started_at"
+FINISHED_AT = "status__job__finished_at"
+NODE_COLUMN = "job_log__hwinfo__platform__node"
+
+PREFIX = "contention__"
+
+
+def _seconds(values: pd.Series) -> np.ndarray:
+    """Convert timestamps to float seconds, NaN for missing timestamps."""
+    timestamps = pd.to_datetime(values, utc=True)
+    seconds = (timestamps - pd.Timestamp(0, tz="UTC")).dt.total_seconds()
+
+    return seconds.to_numpy(dtype=np.float64)
+
+
+def _integral(t: np.ndarray, sorted_starts: np.ndarray, sorted_ends: np.ndarray, start_sums, end_sums) -> np.ndarray:
+    """Integral of the number of running jobs from the beginning up to each time in `t`.
+
+    Each job contributes clip(t - start, 0, end - start) = max(t - start, 0) - max(t - end, 0).
+    """
+    k_starts = np.searchsorted(sorted_starts, t, side="left")
+    k_ends = np.searchsorted(sorted_ends, t, side="left")
+
+    return (k_starts * t - start_sums[k_starts]) - (k_ends * t - end_sums[k_ends])
+
+
+def sweep_contention(started: np.ndarray, finished: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute the number of other jobs running at the start of each job and the average during its run.
+
+    :param started: start times (seconds), NaN for unknown
+    :param finished: finish times (seconds), NaN for unknown
+    :return: tuple (running at start, mean overlap), NaN for jobs with unknown times
+    """
+    valid = ~(np.isnan(started) | np.isnan(finished)) & (finished >= started)
+
+    running_at_start = np.full(len(started), np.nan)
+    mean_overlap = np.full(len(started), np.nan)
+    if not valid.any():
+        return running_at_start, mean_overlap
+
+    # relative times keep prefix sums precise
+    origin = started[valid].min()
+    starts = started[valid] - origin
+    ends = finished[valid] - origin
+
+    sorted_starts = np.sort(starts)
+    sorted_ends = np.sort(ends)
+    start_sums = np.concatenate(([0.0], np.cumsum(sorted_starts)))
+    end_sums = np.concatenate(([0.0], np.cumsum(sorted_ends)))
+
+    durations = ends - starts
+
+    # jobs started at or before the start, minus jobs finished at or before it, minus the job itself
+    # (a job which finished at its start is NOT running)
+    running = np.searchsorted(sorted_starts, starts, side="right") - np.searchsorted(sorted_ends, starts, side="right")
+    running = running - (durations > 0)
+    running_at_start[valid] = running
+
+    overlap = _integral(ends, sorted_starts, sorted_ends, start_sums, end_sums) - _integral(
+        starts, sorted_starts, sorted_ends, start_sums, end_sums
+    )
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(durations > 0, (overlap - durations) / durations, running)
+
+    # rounding errors of prefix sums
+    mean_overlap[valid] = np.clip(mean, 0, None)
+
+    return running_at_start, mean_overlap
+
+
+def contention(
+    inspection_df: pd.DataFrame,
+    started_at: str = STARTED_AT,
+    finished_at: str = FINISHED_AT,
+    node: Optional[str] = NODE_COLUMN,
+) -> pd.DataFrame:
+    """Compute contention of each job overall and per node, the result has the index of the inspection DataFrame.
+
+    :param inspection_df: flattened inspection DataFrame
+    :param started_at: column with start timestamps of jobs
+    :param finished_at: column with finish timestamps of jobs
+    :param node: column with the node the job ran on, per node contention is NOT computed if None
+    """
+    for column in (started_at, finished_at):
+        if column not in inspection_df.columns:
+            raise KeyError(f"Could NOT find column {column!r} in the inspection DataFrame")
+
+    started = _seconds(inspection_df[started_at])
+    finished = _seconds(inspection_df[finished_at])
+
+    running_at_start, mean_overlap = sweep_contention(started, finished)
+    result = {f"{PREFIX}running_at_start": running_at_start, f"{PREFIX}mean_overlap": mean_overlap}
+
+    if node is not None:
+        if node not in inspection_df.columns:
+            raise KeyError(f"Could NOT find node column {node!r} in the inspection DataFrame")
+
+        node_running = np.full(len(started), np.nan)
+        node_overlap = np.full(len(started), np.nan)
+
+        codes, _ = pd.factorize(inspection_df[node])
+        # jobs with unknown node (code -1) are NOT assigned per node contention
+        for code in np.unique(codes[codes >= 0]):
+            rows = np.flatnonzero(codes == code)
+            node_running[rows], node_overlap[rows] = sweep_contention(started[rows], finished[rows])
+
+        result[f"{PREFIX}node__running_at_start"] = node_running
+        result[f"{PREFIX}node__mean_overlap"] = node_overlap
+
+    return pd.DataFrame(result, index=inspection_df.index)
+
+
+def add_contention_columns(inspection_df: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """Add `contention__*` columns to the inspection DataFrame, see `contention` for the parameters."""
+    columns = contention(inspection_df, **kwargs)
+
+    return inspection_df.drop(columns=[c for c in columns if c in inspection_df.columns]).join(columns)
+
+
+def running_jobs(
+    inspection_df: pd.DataFrame, started_at: str = STARTED_AT, finished_at: str = FINISHED_AT
+) -> pd.Series:
+    """Compute timeline of the number of running jobs, a value for each start or finish of a job."""
+    started = pd.to_datetime(inspection_df[started_at], utc=True).dropna()
+    finished = pd.to_datetime(inspection_df[finished_at], utc=True).dropna()
+
+    events = pd.concat([pd.Series(1, index=started.values), pd.Series(-1, index=finished.values)])
+    # starts and finishes at the same time are merged
+    events = events.groupby(level=0).sum().sort_index()
+
+    return events.cumsum().rename("running_jobs")
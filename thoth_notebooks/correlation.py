@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""Vectorized correlation of inspection resource counters with durations.
+
+Pearson and Spearman correlation coefficients together with p-values are computed for all
+pairs of columns at once, optionally for each group of the frame indexed by `group_inspection_dataframe`:
+
+    df_grouped = group_inspection_dataframe(df, groupby=["ncpus", "platform"], exclude="node")
+    result = correlate(df_grouped, y=["job_duration", "job_log__stdout__@result__elapsed"], method="spearman")
+
+    to_matrix(result.xs(group, level=["ncpus", "platform"]))
+
+The result is a long-form DataFrame indexed by (group levels..., x, y) with columns `r`, `p_value` and `n`.
+Only rows with all the selected columns present are considered (complete cases of the group).
+"""
+
+import logging
+
+from typing import List, Union
+
+import numpy as np
+import pandas as pd
+
+from .inspection import get_group_codes
+from .inspection import get_numeric_columns
+
+logger = logging.getLogger(__name__)
+
+# resource usage counters reported by the inspection job, see getrusage(2)
+DEFAULT_COUNTERS = r"^job_log__usage__ru_"
+
+DEFAULT_TARGETS = [
+    "job_duration",
+    "build_duration",
+    "job_log__stdout__@result__elapsed",
+    "job_log__stdout__@result__rate",
+]
+
+METHODS = ("pearson", "spearman")
+
+
+def _group_sums(values: np.ndarray, codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """Sum rows of the (2-D) array per group."""
+    result = np.zeros((n_groups,) + values.shape[1:], dtype=np.float64)
+    np.add.at(result, codes, values)
+
+    return result
+
+
+def correlate(
+    inspection_df: pd.DataFrame,
+    x: Union[str, List[str]] = DEFAULT_COUNTERS,
+    y: Union[str, List[str]] = None,
+    method: str = "pearson",
+    groupby: Union[str, List[str]] = None,
+) -> pd.DataFrame:
+    """Compute correlation coefficients and p-values between columns `x` and `y` for each group.
+
+    :param inspection_df: flattened inspection DataFrame, durations can be joined from `create_duration_dataframe`
+    :param x: columns (or regular expression matching columns), resource usage counters by default
+    :param y: columns (or regular expression matching columns), `DEFAULT_TARGETS` found in the frame by default
+    :param method: pearson or spearman
+    :param groupby: index levels to compute correlations for, all named index levels by default
+    """
+    from scipy.special import stdtr
+
+    if method not in METHODS:
+        raise ValueError(f"Unknown correlation method {method!r}, available methods: {METHODS}")
+
+    x_columns = get_numeric_columns(inspection_df, x)
+    if y is None:
+        y = [c for c in DEFAULT_TARGETS if c in inspection_df.columns]
+    y_columns = get_numeric_columns(inspection_df, y)
+
+    if not x_columns or not y_columns:
+        raise ValueError("No numeric columns to correlate.")
+
+    codes, groups = get_group_codes(inspection_df, groupby)
+
+    columns = list(dict.fromkeys(x_columns + y_columns))
+    data = inspection_df[columns].astype(np.float64)
+
+    # complete cases only, all the pairs are computed from the same rows
+    complete = data.notna().all(axis=1).to_numpy()
+    data, codes = data[complete], codes[complete]
+
+    if method == "spearman":
+        data = data.groupby(codes).rank()
+
+    values = data.to_numpy()
+    n_groups = len(groups) if groups is not None else 1
+
+    n = np.bincount(codes, minlength=n_groups).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = _group_sums(values, codes, n_groups) / n[:, None]
+        centered = values - means[codes]
+
+        X = centered[:, [columns.index(c) for c in x_columns]]
+        Y = centered[:, [columns.index(c) for c in y_columns]]
+
+        # (groups, x, y) sums of cross products, a single pass over the rows
+        sxy = _group_sums(X[:, :, None] * Y[:, None, :], codes, n_groups)
+        sxx = _group_sums(X ** 2, codes, n_groups)
+        syy = _group_sums(Y ** 2, codes, n_groups)
+
+        r = sxy / np.sqrt(sxx[:, :, None] * syy[:, None, :])
+        r = np.clip(r, -1.0, 1.0)
+
+        dof = (n - 2)[:, None, None]
+        t = r * np.sqrt(dof / (1.0 - r ** 2))
+        p_value = np.where(dof > 0, 2 * stdtr(dof, -np.abs(t)), np.nan)
+
+    if groups is None:
+        index = pd.MultiIndex.from_product([x_columns, y_columns], names=["x", "y"])
+    else:
+        group_frame = groups.to_frame(index=False)
+        index = pd.MultiIndex.from_arrays(
+            [group_frame[c].repeat(len(x_columns) * len(y_columns)).to_numpy() for c in group_frame.columns]
+            + [np.tile(np.repeat(x_columns, len(y_columns)), n_groups), np.tile(y_columns, n_groups * len(x_columns))],
+            names=[*group_frame.columns, "x", "y"],
+        )
+
+    return pd.DataFrame(
+        {
+            "r": r.ravel(),
+            "p_value": p_value.ravel(),
+            "n": np.repeat(n, len(x_columns) * len(y_columns)).astype(int),
+        },
+        index=index,
+    )
+
+
+def to_matrix(result: pd.DataFrame, value: str = "r") -> pd.DataFrame:
+    """Turn the (single group) result of `correlate` into x × y matrix."""
+    return result[value].unstack("y")
+
+
+def style_matrix(matrix: pd.DataFrame, threshold: float = 0.88):
+    """Highlight strong correlations of the matrix in red."""
+
+    def _color(df: pd.DataFrame) -> pd.DataFrame:
+        strong = df.abs() > threshold
+        return pd.DataFrame(np.where(strong, "color: red", "color: black"), index=df.index, columns=df.columns)
+
+    return matrix.style.apply(_color, axis=None)
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+"""Compact encoding of CPU flags into fixed-width bitset columns.
+
+CPU flags reported by hwinfo (`job_log__hwinfo__cpu_features__flags`) are lists of strings per
+inspection. The flags are encoded into `uint64` columns using a vocabulary of flags (bit `i` of
+the bitset is set if the `i`-th flag of the vocabulary is reported), so queries on flags become
+vectorized bitwise operations:
+
+    df, vocabulary = encode_flag_columns(df)
+
+    df[vocabulary.has(flag_bitsets(df), "avx512f")]
+    query_inspection_dataframe(df, groupby="isa_level", exclude="node")
+
+The x86-64 ISA level (microarchitecture levels x86-64-v1 to v4 as defined by the x86-64 psABI)
+of each CPU is stored in the `job_log__hwinfo__cpu_features__isa_level` column.
+"""
+
+import logging
+
+from typing import Any, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLUMN = "job_log__hwinfo__cpu_features__flags"
+ISA_LEVEL_COLUMN = "job_log__hwinfo__cpu_features__isa_level"
+
+WORD_SIZE = 64
+
+# flags required by x86-64 microarchitecture levels, named as reported in /proc/cpuinfo
+ISA_LEVELS = {
+    1: ("cmov", "cx8", "fpu", "fxsr", "mmx", "sse", "sse2"),
+    2: ("cx16", "lahf_lm", "popcnt", "sse4_1", "sse4_2", "ssse3"),
+    3: ("avx", "avx2", "bmi1", "bmi2", "f16c", "fma", "abm", "movbe", "xsave"),
+    4: ("avx512f", "avx512bw", "avx512cd", "avx512dq", "avx512vl"),
+}
+
+
+def _parse_flags(value: Any) -> Tuple[str, ...]:
+    """Turn reported flags (a list or a whitespace separated string) into a tuple of flags."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ()
+
+    if isinstance(value, str):
+        value = value.split()
+
+    return tuple(str(flag).lower() for flag in value)
+
+
+class FlagVocabulary:
+    """Mapping of CPU flags to bit positions in the bitset."""
+
+    def __init__(self, flags: Iterable[str]):
+        """Initialize the vocabulary, flags of ISA levels are always included so levels can be computed."""
+        known = {flag for level_flags in ISA_LEVELS.values() for flag in level_flags}
+        self.flags: Tuple[str, ...] = tuple(sorted(set(flags) | known))
+        self.index = {flag: i for i, flag in enumerate(self.flags)}
+
+    @classmethod
+    def from_values(cls, values: Iterable[Any]) -> "FlagVocabulary":
+        """Create vocabulary of all the flags reported."""
+        flags = set()
+        for value in values:
+            flags.update(_parse_flags(value))
+
+        return cls(flags)
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    def __contains__(self, flag: str) -> bool:
+        return flag in self.index
+
+    def __repr__(self) -> str:
+        return f"<FlagVocabulary of {len(self.flags)} flags in {self.n_words} words>"
+
+    @property
+    def n_words(self) -> int:
+        """Number of 64-bit words of a bitset."""
+        return (len(self.flags) + WORD_SIZE - 1) // WORD_SIZE
+
+    def mask(self, flags: Iterable[str]) -> np.ndarray:
+        """Create bitset with the given flags set, flags NOT in the vocabulary are ignored."""
+        mask = np.zeros(self.n_words, dtype=np.uint64)
+        for flag in flags:
+            i = self.index.get(flag.lower())
+            if i is None:
+                logger.debug(f"Flag {flag!r} NOT in the vocabulary, ignored")
+                continue
+
+            mask[i // WORD_SIZE] |= np.uint64(1) << np.uint64(i % WORD_SIZE)
+
+        return mask
+
+    def encode(self, values: Sequence[Any]) -> np.ndarray:
+        """Encode reported flags of each row into a bitset, returns array of shape (rows, words).
+
+        Distinct flag sets (usually a handful of CPU models) are encoded once.
+        """
+        parsed = [_parse_flags(value) for value in values]
+        codes, uniques = pd.factorize(pd.Series(parsed, dtype=object))
+
+        encoded = np.zeros((len(uniques) + 1, self.n_words), dtype=np.uint64)  # the last row for missing values
+        for i, flags in enumerate(uniques):
+            unknown = [flag for flag in flags if flag not in self.index]
+            if unknown:
+                logger.warning(f"Flags NOT in the vocabulary are dropped: {unknown}")
+            encoded[i] = self.mask(flag for flag in flags if flag in self.index)
+
+        return encoded[codes]
+
+    def decode(self, bitsets: np.ndarray) -> List[List[str]]:
+        """Turn bitsets back into lists of flags."""
+        # bitsets taken from DataFrame columns are NOT C-contiguous, which the byte view requires
+        bitsets = np.ascontiguousarray(np.atleast_2d(bitsets), dtype="<u8")
+        bits = np.unpackbits(bitsets.view(np.uint8), axis=1, bitorder="little")[:, : len(self.flags)]
+
+        return [[self.flags[i] for i in np.flatnonzero(row)] for row in bits]
+
+    def has(self, bitsets: np.ndarray, *flags: str, any_of: bool = False) -> np.ndarray:
+        """Check whether all (or any of, if `any_of` is set) the flags are set in the bitsets.
+
+        Flags NOT in the vocabulary are NOT set in any of the bitsets.
+        """
+        if not any_of and any(flag.lower() not in self.index for flag in flags):
+            return np.zeros(len(bitsets), dtype=bool)
+
+        mask = self.mask(flags)
+        masked = bitsets & mask
+
+        if any_of:
+            return (masked != 0).any(axis=1)
+
+        return (masked == mask).all(axis=1)
+
+    def isa_level(self, bitsets: np.ndarray) -> np.ndarray:
+        """Compute x86-64 microarchitecture level (0 - 4) of each bitset."""
+        level = np.zeros(len(bitsets), dtype=np.int8)
+        satisfied = np.ones(len(bitsets), dtype=bool)
+
+        for isa_level in sorted(ISA_LEVELS):
+            satisfied &= self.has(bitsets, *ISA_LEVELS[isa_level])
+            level[satisfied] = isa_level
+
+        return level
+
+
+def flag_columns(inspection_df: pd.DataFrame, column: str = DEFAULT_COLUMN) -> List[str]:
+    """Get names of bitset columns created by `encode_flag_columns`."""
+    columns = [c for c in inspection_df.columns if c.startswith(f"{column}_") and c[len(column) + 1:].isdigit()]
+
+    return sorted(columns, key=lambda c: int(c[len(column) + 1:]))
+
+
+def flag_bitsets(inspection_df: pd.DataFrame, column: str = DEFAULT_COLUMN) -> np.ndarray:
+    """Get bitsets of the DataFrame as a 2-D array (rows, words)."""
+    columns = flag_columns(inspection_df, column)
+    if not columns:
+        raise KeyError(f"No bitset columns of {column!r} found, encode flags using `encode_flag_columns`")
+
+    return inspection_df[columns].to_numpy(dtype=np.uint64)
+
+
+def encode_flag_columns(
+    inspection_df: pd.DataFrame, column: str = DEFAULT_COLUMN, vocabulary: FlagVocabulary = None, drop: bool = True
+) -> Tuple[pd.DataFrame, FlagVocabulary]:
+    """Replace the column of CPU flags with bitset columns `{column}_0`, `{column}_1`, ... and the ISA level column.
+
+    :param inspection_df: flattened inspection DataFrame
+    :param column: column of CPU flags
+    :param vocabulary: vocabulary to encode flags with (e.g. to compare with another frame), created from the data if NOT given
+    :param drop: drop the original column of flags
+    """
+    if column not in inspection_df.columns:
+        raise KeyError(f"Could NOT find column {column!r} in the inspection DataFrame")
+
+    values = inspection_df[column].tolist()
+    if vocabulary is None:
+        vocabulary = FlagVocabulary.from_values(values)
+
+    bitsets = vocabulary.encode(values)
+
+    encoded = pd.DataFrame(
+        bitsets, index=inspection_df.index, columns=[f"{column}_{i}" for i in range(vocabulary.n_words)]
+    )
+    encoded[ISA_LEVEL_COLUMN] = vocabulary.isa_level(bitsets)
+
+    df = inspection_df.drop(columns=[column]) if drop else inspection_df.copy()
+    df = df.drop(columns=[c for c in encoded.columns if c in df.columns]).join(encoded)
+
+    return df, vocabulary
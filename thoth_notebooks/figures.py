@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+
+"""Batched static export of plotly figures.
+
+Figures produced by the `create_*` plot builders are queued and rendered on a pool of
+long-lived worker processes, each worker starts the image renderer (kaleido or orca) once
+and reuses it for all the figures it renders:
+
+    with FigureExporter(PROJECT_DIR_NAME, max_workers=4) as exporter:
+        exporter.add(create_duration_box(df_duration), "duration_box", folder_name="BoxPlots")
+        exporter.add(create_duration_histogram(df_duration), "duration_histogram", folder_name="Histograms")
+
+    exporter.stats
+
+Figures saved by plot builders which write images themselves (e.g. the ones of thoth.lab called with
+`save_result=True`) are queued by intercepting `plotly.io.write_image` until the exporter is closed:
+
+    exporter = FigureExporter(PROJECT_DIR_NAME, max_workers=4).intercept()
+    ...
+    exporter.close()
+
+Each written image is recorded in a manifest (`.figures.json` in the output directory) together
+with a hash of the figure specification and export options, figures which did NOT change since
+the previous run are NOT rendered again.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".figures.json"
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize numpy and pandas values found in figure specifications."""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+
+    return str(obj)
+
+
+def figure_to_json(figure: Any) -> str:
+    """Serialize the figure (plotly figure or its dict representation) into canonical JSON."""
+    try:
+        from plotly.utils import PlotlyJSONEncoder
+    except ImportError:
+        encoder = None
+    else:
+        encoder = PlotlyJSONEncoder
+
+    if hasattr(figure, "to_plotly_json"):
+        figure = figure.to_plotly_json()
+    elif not isinstance(figure, dict):
+        raise TypeError(f"Could NOT export figure of type {type(figure).__name__!r}")
+
+    if encoder is not None:
+        # PlotlyJSONEncoder does not accept `default`, sort keys on the decoded value
+        figure = json.loads(json.dumps(figure, cls=encoder))
+
+    return json.dumps(figure, sort_keys=True, separators=(",", ":"), default=_json_default)
+
+
+def render_plotly(spec: str, path: str, fmt: str, **options: Any) -> None:
+    """Render figure JSON into the image file, the file is replaced atomically."""
+    import plotly.io as pio
+
+    # workers forked while `FigureExporter.intercept` is active have to write the image themselves
+    write_image = getattr(pio.write_image, "__wrapped__", pio.write_image)
+
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=f".{fmt}.tmp")
+    os.close(fd)
+    try:
+        write_image(json.loads(spec), tmp_path, format=fmt, **options)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def warmup_plotly() -> None:
+    """Start the image renderer of the worker process by rendering an empty figure."""
+    import plotly.io as pio
+
+    pio.to_image({"data": [], "layout": {}}, format="png")
+
+
+_RENDERER: Optional[Callable[..., None]] = None
+
+
+def _init_worker(renderer: Callable[..., None], warmup: Optional[Callable[[], None]]) -> None:
+    """Initialize the renderer of the worker process, the renderer is kept for the lifetime of the worker."""
+    global _RENDERER
+
+    _RENDERER = renderer
+    if warmup is not None:
+        warmup()
+
+
+def _render(spec: str, path: str, fmt: str, options: Dict[str, Any]) -> float:
+    start = time.monotonic()
+    _RENDERER(spec, path, fmt, **options)
+
+    return time.monotonic() - start
+
+
+class FigureExporter:
+    """Queue figures and render them on a persistent process pool, unchanged figures are skipped."""
+
+    def __init__(
+        self,
+        output_dir: Union[str, Path],
+        *,
+        fmt: str = "png",
+        max_workers: int = None,
+        renderer: Callable[..., None] = render_plotly,
+        warmup: Optional[Callable[[], None]] = warmup_plotly,
+        **options: Any,
+    ):
+        """Initialize the exporter.
+
+        :param output_dir: directory the images are written to (e.g. `PROJECT_DIR_NAME`)
+        :param fmt: default image format
+        :param max_workers: number of renderer processes, defaults to the number of CPUs
+        :param renderer: function rendering (figure JSON, path, format, **options) in a worker process
+        :param warmup: function starting the renderer when a worker process starts
+        :param options: default export options passed to the renderer (width, height, scale)
+        """
+        self.output_dir = Path(output_dir)
+        self.fmt = fmt
+        self.max_workers = max_workers
+        self.renderer = renderer
+        self.warmup = warmup
+        self.options = options
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._write_image: Optional[Callable[..., Any]] = None
+        self._pending: Dict[str, Future] = {}
+        self._pending_hashes: Dict[str, str] = {}
+
+        self.manifest_path = self.output_dir / MANIFEST_NAME
+        self.manifest: Dict[str, str] = {}
+        if self.manifest_path.exists():
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+
+        self.stats = {"queued": 0, "rendered": 0, "skipped": 0, "failed": 0, "render_time": 0.0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=_init_worker, initargs=(self.renderer, self.warmup)
+            )
+
+        return self._executor
+
+    @staticmethod
+    def _hash(spec: str, fmt: str, options: Dict[str, Any]) -> str:
+        digest = hashlib.sha256(spec.encode("utf-8"))
+        digest.update(json.dumps({"format": fmt, **options}, sort_keys=True, default=str).encode("utf-8"))
+
+        return digest.hexdigest()
+
+    def add(self, figure: Any, name: str, folder_name: str = None, fmt: str = None, **options: Any) -> bool:
+        """Queue the figure for export into `output_dir/folder_name/name.fmt`.
+
+        Rendering starts right away in the background, call `flush` to wait for all the queued figures.
+
+        :return: False if the figure did NOT change since it was last written and is skipped
+        """
+        fmt = fmt or self.fmt
+        directory = self.output_dir / folder_name if folder_name else self.output_dir
+
+        return self._queue(figure, directory / f"{name}.{fmt}", fmt, options)
+
+    def _queue(self, figure: Any, path: Path, fmt: str, options: Dict[str, Any]) -> bool:
+        options = {**self.options, **options}
+        key = path.relative_to(self.output_dir).as_posix()
+
+        spec = figure_to_json(figure)
+        figure_hash = self._hash(spec, fmt, options)
+
+        self.stats["queued"] += 1
+
+        if key in self._pending:
+            if self._pending_hashes[key] == figure_hash:
+                self.stats["skipped"] += 1
+                return False
+
+            # the same file is written again, keep the order of writes
+            self._wait(key)
+
+        if self.manifest.get(key) == figure_hash and path.exists():
+            self.stats["skipped"] += 1
+            return False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._pending[key] = self._get_executor().submit(_render, spec, str(path), fmt, options)
+        self._pending_hashes[key] = figure_hash
+
+        return True
+
+    def intercept(self) -> "FigureExporter":
+        """Queue images written by `plotly.io.write_image` under `output_dir` until the exporter is closed.
+
+        Images written elsewhere (or into file objects) are written right away as before.
+        """
+        import plotly.io as pio
+
+        if self._write_image is not None:
+            return self
+
+        write_image = pio.write_image
+        output_dir = self.output_dir.resolve()
+
+        @functools.wraps(write_image)
+        def queue_image(fig, file, format=None, **options):
+            if not isinstance(file, (str, os.PathLike)):
+                return write_image(fig, file, format=format, **options)
+
+            path = Path(file)
+            try:
+                relative_path = path.resolve().relative_to(output_dir)
+            except ValueError:
+                return write_image(fig, file, format=format, **options)
+
+            options = {name: value for name, value in options.items() if value is not None}
+            self._queue(fig, self.output_dir / relative_path, format or path.suffix[1:] or self.fmt, options)
+
+        pio.write_image = queue_image
+        self._write_image = write_image
+
+        return self
+
+    def _restore(self) -> None:
+        if self._write_image is None:
+            return
+
+        import plotly.io as pio
+
+        pio.write_image = self._write_image
+        self._write_image = None
+
+    def _wait(self, key: str) -> None:
+        future = self._pending.pop(key)
+        figure_hash = self._pending_hashes.pop(key)
+
+        try:
+            self.stats["render_time"] += future.result()
+        except Exception as exc:
+            self.stats["failed"] += 1
+            self.manifest.pop(key, None)
+            logger.error(f"Could NOT export figure {key!r}: {exc}")
+        else:
+            self.stats["rendered"] += 1
+            self.manifest[key] = figure_hash
+
+    def flush(self) -> Dict[str, Any]:
+        """Wait for all the queued figures and persist the manifest."""
+        start = time.monotonic()
+        n_pending = len(self._pending)
+
+        for key in list(self._pending):
+            self._wait(key)
+
+        if n_pending:
+            self._save_manifest()
+            logger.info(f"Exported {n_pending} figures in {time.monotonic() - start:.2f}s")
+
+        return dict(self.stats)
+
+    def _save_manifest(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def close(self) -> None:
+        """Flush queued figures, stop intercepting `plotly.io.write_image` and shut down the renderer processes."""
+        self._restore()
+
+        try:
+            self.flush()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __enter__(self) -> "FigureExporter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""Recorded documents standing in for Thoth's Ceph result stores.
+
+Fixtures are stored in a directory per store, one JSON file per document:
+
+    fixtures/
+        InspectionResultsStore/
+            inspection-test-ms-0a1b2c3d.json
+        SolverResultsStore/
+            solver-fedora-31-py37-0a1b2c3d.json
+
+Documents can be recorded from the real (connected) store using `record_documents`.
+"""
+
+import json
+import logging
+import random
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# stores from thoth.storages which are used in the notebooks
+FIXTURE_STORE_NAMES = (
+    "InspectionResultsStore",
+    "SolverResultsStore",
+    "AdvisersResultsStore",
+    "DependencyMonkeyReportsStore",
+    "AnalysisResultsStore",
+    "PackageAnalysisResultsStore",
+    "ProvenanceResultsStore",
+)
+
+
+class FixtureStore:
+    """Read-only result store backed by a local directory of JSON documents.
+
+    The interface mimics result stores from `thoth.storages`, all the constructor arguments
+    except for `fixtures_dir` are accepted and ignored (credentials, hosts, ...).
+    """
+
+    def __init__(self, *args, fixtures_dir: Union[str, Path] = None, **kwargs):
+        """Initialize the store reading documents from `fixtures_dir`."""
+        if fixtures_dir is None:
+            raise ValueError("Fixtures directory has to be provided.")
+
+        self.fixtures_dir = Path(fixtures_dir)
+        self._connected = False
+
+    def connect(self) -> None:
+        """Connect to the store, checks that the fixtures directory exists."""
+        if not self.fixtures_dir.is_dir():
+            raise FileNotFoundError(f"Fixtures directory does NOT exist: {str(self.fixtures_dir)!r}")
+
+        self._connected = True
+
+    def is_connected(self) -> bool:
+        """Check whether the store is connected."""
+        return self._connected
+
+    def _path(self, document_id: str) -> Path:
+        return self.fixtures_dir / f"{document_id}.json"
+
+    def get_document_listing(self) -> Iterator[str]:
+        """List IDs of all the documents available in the store."""
+        for path in sorted(self.fixtures_dir.glob("*.json")):
+            yield path.stem
+
+    def document_exists(self, document_id: str) -> bool:
+        """Check whether the document exists in the store."""
+        return self._path(document_id).exists()
+
+    def retrieve_document(self, document_id: str) -> Dict[str, Any]:
+        """Retrieve the document by its ID."""
+        try:
+            with open(self._path(document_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Document {document_id!r} NOT found in {str(self.fixtures_dir)!r}")
+
+    def iterate_results(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Iterate over all the documents, yields tuples (document ID, document)."""
+        for document_id in self.get_document_listing():
+            yield document_id, self.retrieve_document(document_id)
+
+
+def make_fixture_store(name: str, fixtures_root: Union[str, Path]) -> type:
+    """Create a store class named after the store from `thoth.storages` reading from `fixtures_root/name`."""
+    fixtures_dir = Path(fixtures_root) / name
+
+    def __init__(self, *args, **kwargs):
+        FixtureStore.__init__(self, fixtures_dir=fixtures_dir)
+
+    return type(name, (FixtureStore,), {"__init__": __init__, "__doc__": f"Fixtures standing in for {name}."})
+
+
+def record_documents(
+    store,
+    output_dir: Union[str, Path],
+    document_ids: Iterable[str] = None,
+    limit: int = None,
+    seed: int = None,
+) -> int:
+    """Record documents from the (connected) store into the fixtures directory.
+
+    :param store: connected store from `thoth.storages`
+    :param output_dir: directory to store documents into, usually `fixtures/<store class name>`
+    :param document_ids: IDs of documents to record, a random sample of all documents if not provided
+    :param limit: maximum number of documents recorded
+    :param seed: seed of the random sample
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if document_ids is None:
+        document_ids = list(store.get_document_listing())
+        random.Random(seed).shuffle(document_ids)
+
+    count = 0
+    for document_id in document_ids:
+        if limit is not None and count >= limit:
+            break
+
+        document = store.retrieve_document(document_id)
+        with open(output_dir / f"{document_id}.json", "w") as f:
+            json.dump(document, f)
+
+        count += 1
+
+    logger.info(f"Recorded {count} documents into {str(output_dir)!r}")
+
+    return count
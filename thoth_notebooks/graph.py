@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+
+"""Bulk access to package version aggregates of Thoth's knowledge graph.
+
+Vertices of package versions are counted per (package name, package version) on the graph database
+server in a single traversal, so only the aggregate is transferred. The aggregate is cached locally
+for a configurable time and joined to the processed inspection DataFrame on package name and version:
+
+    adapter = GraphDatabase()
+    adapter.connect()
+
+    versions = fetch_package_versions(GremlinSource(adapter), cache=GraphCache(".cache/graph", ttl=3600))
+    inspection_packages = join_inspection_packages(inspection_df, versions)
+
+Use `record_package_versions` to record the aggregate into a JSON file and `RecordedSource`
+to stand in for the graph database (tests, offline runs).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+
+from pathlib import Path
+from typing import Iterator, Tuple, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_VERSION_LABEL = "python_package_version"
+PACKAGE_VERSION_PROPERTIES = ("package_name", "package_version")
+
+_REQUIREMENTS_LOCKED_VERSION = re.compile(r"^specification__python__requirements_locked__default__(.+)__version$")
+
+
+def canonicalize_name(names: pd.Series) -> pd.Series:
+    """Normalize package names as described in PEP 503, vectorized."""
+    return names.astype(str).str.replace(r"[-_.]+", "-", regex=True).str.lower()
+
+
+class GremlinSource:
+    """Count package version vertices of the graph database on the server."""
+
+    def __init__(
+        self, adapter, label: str = PACKAGE_VERSION_LABEL, properties: Tuple[str, ...] = PACKAGE_VERSION_PROPERTIES
+    ):
+        """Initialize the source.
+
+        :param adapter: connected `thoth.storages.GraphDatabase`
+        :param label: label of the vertices
+        :param properties: properties of the vertices holding the package name and the package version
+        """
+        if len(properties) != 2:
+            raise ValueError(f"Expected properties holding package name and package version, got {properties}")
+
+        self.adapter = adapter
+        self.label = label
+        self.properties = tuple(properties)
+
+    @property
+    def key(self) -> str:
+        """Identify the data provided by the source, used as the cache key."""
+        return f"{self.label}-{'-'.join(self.properties)}"
+
+    def fetch_counts(self) -> Iterator[Tuple[str, str, int]]:
+        """Count vertices per (package name, package version), yields tuples (package name, package version, count).
+
+        Vertices are grouped by the package name and counted by the package version on the server,
+        keys of both levels are plain strings.
+        """
+        from gremlin_python.process.graph_traversal import __
+
+        name, version = self.properties
+        counts = self.adapter.g.V().has("__label__", self.label).group().by(name).by(__.groupCount().by(version)).next()
+
+        for package_name, versions in counts.items():
+            for package_version, count in versions.items():
+                yield package_name, package_version, count
+
+
+class RecordedSource:
+    """Package version counts recorded into a JSON file standing in for the graph database."""
+
+    def __init__(self, path: Union[str, Path]):
+        """Initialize the source reading recorded counts from `path`."""
+        self.path = Path(path)
+
+        with open(self.path) as f:
+            recorded = json.load(f)
+
+        self.label = recorded["label"]
+        self.properties = tuple(recorded["properties"])
+        self._counts = recorded["counts"]
+
+    @property
+    def key(self) -> str:
+        """Identify the data provided by the source, used as the cache key."""
+        return f"{self.label}-{'-'.join(self.properties)}"
+
+    def fetch_counts(self) -> Iterator[Tuple[str, str, int]]:
+        """Yield recorded tuples (package name, package version, count)."""
+        for package_name, package_version, count in self._counts:
+            yield package_name, package_version, count
+
+
+def record_package_versions(source: GremlinSource, path: Union[str, Path]) -> None:
+    """Record package version counts of the source into a JSON file usable by `RecordedSource`."""
+    counts = [list(row) for row in source.fetch_counts()]
+
+    with open(path, "w") as f:
+        json.dump({"label": source.label, "properties": list(source.properties), "counts": counts}, f)
+
+    logger.info(f"Recorded {len(counts)} package versions into {str(path)!r}")
+
+
+class GraphCache:
+    """Local cache of DataFrames pulled from the graph database, entries expire after `ttl` seconds."""
+
+    def __init__(self, cache_dir: Union[str, Path], ttl: float = 3600):
+        """Initialize the cache stored in `cache_dir`."""
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha256(key.encode()).hexdigest()}.pickle"
+
+    def get(self, key: str):
+        """Get the cached DataFrame, None if NOT cached or expired."""
+        path = self._path(key)
+
+        try:
+            age = time.time() - path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+        if age > self.ttl:
+            logger.debug(f"Cache entry {key!r} expired ({age:.0f}s old)")
+            return None
+
+        return pd.read_pickle(path)
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        """Store the DataFrame in the cache."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            df.to_pickle(tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+def fetch_package_versions(source, cache: GraphCache = None) -> pd.DataFrame:
+    """Pull package versions from the source, aggregated per (package name, package version).
+
+    The resulting DataFrame has columns `package_name` (canonicalized), `package_version`,
+    `count` (number of vertices of the package version, e.g. one per index) and `n_versions`
+    (number of versions of the package known to the graph).
+    """
+    if cache is not None:
+        cached = cache.get(source.key)
+        if cached is not None:
+            return cached
+
+    start = time.monotonic()
+    counts = pd.DataFrame.from_records(
+        list(source.fetch_counts()), columns=["package_name", "package_version", "count"]
+    )
+
+    counts["package_name"] = canonicalize_name(counts["package_name"])
+    counts["package_version"] = counts["package_version"].astype(str)
+
+    # names differing only in their form are the same package after canonicalization
+    versions = (
+        counts.groupby(["package_name", "package_version"], sort=False)["count"].sum().astype("int64").reset_index()
+    )
+    versions["n_versions"] = versions.groupby("package_name")["package_version"].transform("size")
+
+    versions["package_name"] = versions["package_name"].astype("category")
+    versions["package_version"] = versions["package_version"].astype("category")
+
+    logger.info(
+        f"Pulled {int(versions['count'].sum())} vertices ({len(versions)} package versions) from the graph "
+        f"in {time.monotonic() - start:.2f}s"
+    )
+
+    if cache is not None:
+        cache.put(source.key, versions)
+
+    return versions
+
+
+def inspection_packages(inspection_df: pd.DataFrame) -> pd.DataFrame:
+    """Turn locked requirements of the flattened inspection DataFrame into (package name, package version) rows.
+
+    The resulting DataFrame keeps the index of the inspection DataFrame, one row per package installed.
+    """
+    columns = {}
+    for column in inspection_df.columns:
+        match = _REQUIREMENTS_LOCKED_VERSION.match(column)
+        if match:
+            columns[column] = match.group(1)
+
+    if not columns:
+        raise KeyError("Could NOT find locked requirements in the inspection DataFrame.")
+
+    packages = inspection_df[list(columns)].rename(columns=columns)
+    packages.columns.name = "package_name"
+
+    packages = packages.stack().dropna().rename("package_version").reset_index(level="package_name")
+    packages["package_name"] = canonicalize_name(packages["package_name"])
+    packages["package_version"] = packages["package_version"].astype(str).str.lstrip("=")
+
+    return packages
+
+
+def join_inspection_packages(inspection_df: pd.DataFrame, versions: pd.DataFrame) -> pd.DataFrame:
+    """Join package versions known to the graph to packages installed in the inspections.
+
+    :param inspection_df: flattened inspection DataFrame as returned by `process_inspection_results`
+    :param versions: package versions as returned by `fetch_package_versions`
+    """
+    packages = inspection_packages(inspection_df)
+
+    original_names = packages.index.names
+    index_names = [name if name is not None else f"level_{i}" for i, name in enumerate(original_names)]
+    packages.index = packages.index.set_names(index_names)
+
+    versions = versions.astype({"package_name": str, "package_version": str})
+    n_versions = versions.drop_duplicates("package_name")[["package_name", "n_versions"]]
+
+    joined = (
+        packages.reset_index()
+        .merge(
+            versions.drop(columns="n_versions"), on=["package_name", "package_version"], how="left", indicator="in_graph"
+        )
+        .merge(n_versions, on="package_name", how="left")
+    )
+    joined["in_graph"] = joined["in_graph"] == "both"
+    joined["count"] = joined["count"].fillna(0).astype(int)
+    joined["n_versions"] = joined["n_versions"].fillna(0).astype(int)
+
+    joined = joined.set_index(index_names)
+    joined.index = joined.index.set_names(original_names)
+
+    return joined
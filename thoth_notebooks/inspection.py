@@ -0,0 +1,797 @@
+# -*- coding: utf-8 -*-
+
+"""Thoth InspectionRun dashboard app.
+
+Library functions of the "Amun InspectionRun Analysis" notebook, processing, grouping,
+querying and plotting of inspection results:
+
+    from thoth_notebooks.inspection import process_inspection_results, query_inspection_dataframe
+
+    df = process_inspection_results(inspection_results, exclude=["build_log", "created", "inspection_id"], drop=False)
+    query_inspection_dataframe(df, groupby=["platform", "ncpus"], like="duration", exclude="node")
+
+Plotting (plotly, cufflinks) and profiling (pandas_profiling) dependencies are imported
+on the first use of a function which needs them, so that runs which only query the inspection
+DataFrame do NOT pay for importing them. Check the import time using:
+
+    $ python -m thoth_notebooks.inspection
+"""
+
+import argparse
+import functools
+import json
+import logging
+import re
+import subprocess
+import sys
+
+from collections import namedtuple
+from typing import Any, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import instrument
+
+logger = logging.getLogger(__name__)
+
+# modules which must NOT be imported by importing this module
+HEAVY_MODULES = ("plotly", "cufflinks", "pandas_profiling", "seaborn", "prettyprinter", "matplotlib")
+
+
+@functools.lru_cache(maxsize=1)
+def _cufflinks():
+    """Import cufflinks on the first use, cufflinks provide `DataFrame.iplot`."""
+    import cufflinks as cf
+
+    cf.go_offline()
+
+    return cf
+
+
+def _json_normalize(*args, **kwargs) -> pd.DataFrame:
+    try:
+        json_normalize = pd.json_normalize
+    except AttributeError:  # pandas<1.0
+        from pandas.io.json import json_normalize
+
+    return json_normalize(*args, **kwargs)
+
+
+@instrument
+def process_inspection_results(
+    inspection_results: List[dict],
+    exclude: Union[list, set] = None,
+    apply: List[Tuple] = None,
+    drop: bool = True,
+    verbose: bool = False,
+) -> pd.DataFrame:
+    """Process inspection result into pd.DataFrame."""
+    if not inspection_results:
+        raise ValueError("Empty iterable provided.")
+
+    exclude = exclude or []
+    apply = apply or ()
+
+    df = _json_normalize(inspection_results, sep="__")  # each row resembles InspectionResult
+
+    if len(df) <= 1:
+        return df
+
+    for regex, func in apply:
+        for col in df.filter(regex=regex).columns:
+            df[col] = df[col].apply(func)
+
+    if drop:
+        from pandas_profiling import ProfileReport as profile
+
+        keys = [k for k in inspection_results[0] if k not in exclude]
+        for k in keys:
+            d = df.filter(regex=k)
+            p = profile(d)
+
+            rejected = (
+                p.description_set["variables"]
+                .query("distinct_count <= 1 & type != 'UNSUPPORTED'")
+                .filter(regex="^((?!version).)*$", axis=0)
+            )  # explicitly include versions
+
+            if verbose:
+                print("Rejected columns: ", rejected.index)
+
+            df.drop(rejected.index, axis=1, inplace=True)
+
+    df = df.eval(
+        "status__job__duration   = status__job__finished_at   - status__job__started_at", engine="python"
+    ).eval("status__build__duration = status__build__finished_at - status__build__started_at", engine="python")
+
+    return df
+
+
+@instrument
+def create_duration_dataframe(inspection_df: pd.DataFrame):
+    """Compute statistics and duration DataFrame."""
+    if len(inspection_df) <= 0:
+        raise ValueError("Empty DataFrame provided")
+
+    try:
+        inspection_df.drop("build_log", axis=1, inplace=True)
+    except KeyError:
+        pass
+
+    data = (
+        inspection_df.filter(like="duration")
+        .rename(columns=lambda s: s.replace("status__", "").replace("__", "_"))
+        .apply(lambda ts: pd.to_timedelta(ts).dt.total_seconds())
+    )
+
+    def compute_duration_stats(group):
+        return (
+            group.eval("job_duration_mean           = job_duration.mean()", engine="python")
+            .eval("job_duration_upper_bound    = job_duration + job_duration.std()", engine="python")
+            .eval("job_duration_lower_bound    = job_duration - job_duration.std()", engine="python")
+            .eval("build_duration_mean         = build_duration.mean()", engine="python")
+            .eval("build_duration_upper_bound  = build_duration + build_duration.std()", engine="python")
+            .eval("build_duration_lower_bound  = build_duration - build_duration.std()", engine="python")
+        )
+
+    if isinstance(inspection_df.index, pd.MultiIndex):
+        n_levels = len(inspection_df.index.levels)
+
+        # compute duration stats for each group separately
+        data = data.groupby(level=list(range(n_levels - 1)), sort=False).apply(compute_duration_stats)
+    else:
+        data = compute_duration_stats(data)
+
+    return data.round(4)
+
+
+def create_duration_box(data: pd.DataFrame, columns: Union[str, List[str]] = None, **kwargs):
+    """Create duration Box plot."""
+    _cufflinks()
+
+    columns = columns if columns is not None else data.filter(regex="duration$").columns
+
+    figure = data[columns].iplot(
+        kind="box", title=kwargs.pop("title", "InspectionRun duration"), yTitle="duration [s]", asFigure=True
+    )
+
+    return figure
+
+
+def create_duration_scatter(data: pd.DataFrame, columns: Union[str, List[str]] = None, **kwargs):
+    """Create duration Scatter plot."""
+    _cufflinks()
+
+    columns = columns if columns is not None else data.filter(regex="duration$").columns
+
+    figure = data[columns].iplot(
+        kind="scatter",
+        title=kwargs.pop("title", "InspectionRun duration"),
+        yTitle="duration [s]",
+        xTitle="inspection ID",
+        asFigure=True,
+    )
+
+    return figure
+
+
+def create_duration_scatter_with_bounds(
+    data: pd.DataFrame, col: str, index: Union[list, pd.Index, pd.RangeIndex] = None, **kwargs
+):
+    """Create duration Scatter plot with standard deviation bounds."""
+    from plotly import graph_objs as go
+
+    df_duration = (
+        data[[col]]
+        .eval(f"upper_bound = {col} + {col}.std()", engine="python")
+        .eval(f"lower_bound = {col} - {col}.std()", engine="python")
+    )
+
+    index = index if index is not None else df_duration.index
+
+    if isinstance(index, pd.MultiIndex):
+        index = index.levels[-1] if len(index.levels[-1]) == len(data) else np.arange(len(data))
+
+    upper_bound = go.Scatter(
+        name="Upper Bound",
+        x=index,
+        y=df_duration.upper_bound,
+        mode="lines",
+        marker=dict(color="lightgray"),
+        line=dict(width=0),
+        fillcolor="rgba(68, 68, 68, 0.3)",
+        fill="tonexty",
+    )
+
+    trace = go.Scatter(
+        name="Duration",
+        x=index,
+        y=df_duration[col],
+        mode="lines",
+        line=dict(color="rgb(31, 119, 180)"),
+        fillcolor="rgba(68, 68, 68, 0.3)",
+        fill="tonexty",
+    )
+
+    lower_bound = go.Scatter(
+        name="Lower Bound",
+        x=index,
+        y=df_duration.lower_bound,
+        marker=dict(color="lightgray"),
+        line=dict(width=0),
+        mode="lines",
+    )
+
+    data = [lower_bound, trace, upper_bound]
+    m = df_duration[col].mean()
+
+    layout = go.Layout(
+        yaxis=dict(title="duration [s]"),
+        xaxis=dict(title="inspection ID"),
+        shapes=[
+            {
+                "type": "line",
+                "x0": 0,
+                "x1": len(index),
+                "y0": m,
+                "y1": m,
+                "line": {"color": "red", "dash": "longdash"},
+            }
+        ],
+        title=kwargs.pop("title", "InspectionRun duration"),
+        showlegend=False,
+    )
+
+    fig = go.Figure(data=data, layout=layout)
+
+    return fig
+
+
+def create_duration_histogram(data: pd.DataFrame, columns: Union[str, List[str]] = None, bins: int = None, **kwargs):
+    """Create duration histogram."""
+    _cufflinks()
+
+    columns = columns if columns is not None else data.filter(regex="duration$").columns
+
+    if not bins:
+        bins = np.max([len(np.histogram_bin_edges(data[col].dropna().values, bins="auto")) - 1 for col in columns])
+
+    figure = data[columns].iplot(
+        title=kwargs.pop("title", "InspectionRun distribution"),
+        yTitle="count",
+        xTitle="durations [ms]",
+        kind="hist",
+        bins=int(np.ceil(bins)),
+        asFigure=True,
+    )
+
+    return figure
+
+
+def resolve_query(
+    query: str, context: pd.DataFrame = None, resolvers: tuple = None, engine: str = None, parser: str = "pandas"
+):
+    """Resolve query in the given context.
+
+    Operands of the query do NOT need to match the whole column name, e.g. `ncpus > 2` is evaluated
+    on `job_log__hwinfo__cpu__ncpus` if it is the only column matching.
+    """
+    if not query:
+        return context
+
+    from pandas.core.computation.expr import Expr
+    from pandas.core.computation.scope import ensure_scope
+
+    q = query
+    q = re.sub(r"\[\(", "", q)
+    q = re.sub(r"\b(\d)+\b", "", q)
+    q = re.sub(r"[+\-\*:!<>=~.|&%]", " ", q)
+
+    # get our (possibly passed-in) scope
+    resolvers = resolvers or ()
+    if isinstance(context, pd.DataFrame):
+        index_resolvers = context._get_index_resolvers()
+        resolvers = tuple(resolvers) + (dict(context.items()), index_resolvers)
+
+    repl = []
+    for idx, resolver in enumerate(resolvers):
+        keys = resolver.keys()
+
+        for op in set(q.split()):
+            matches = [(op, k) for k in keys if re.search(op, k)]
+
+            if len(matches) == 1:
+                op, key = matches[0]
+                repl.append((idx, op, resolver[key]))
+
+            elif len(matches) > 1:
+                raise KeyError(f"Ambiguous query operand provided: `{op}`")
+
+    for idx, op, val in repl:
+        resolvers[idx][op] = val
+
+    env = ensure_scope(level=1, resolvers=resolvers, target=context)
+    expr = Expr(query, engine=engine, parser=parser, env=env)
+
+    def _resolve_operands(operands) -> list:
+        for op in operands:
+            # complex query
+            if op.is_scalar:
+                continue
+
+            if hasattr(op, "operands"):
+                yield from _resolve_operands(op.operands)
+
+            yield str(op)
+
+    operands = set(_resolve_operands(expr.terms.operands))
+
+    for op in operands:
+        try:
+            query = query.replace(op, env.resolvers[op].name)
+        except KeyError:
+            pass
+
+    return context.query(query)
+
+
+def _is_valid_group(df: pd.DataFrame, groupby: Union[str, List[str]]):
+    """Check that the DataFrame can be grouped by the given column(s)."""
+    is_valid = False
+    try:
+        # check that grouping is possible
+        is_valid = len(df.groupby(groupby).indices) >= 1
+        if not is_valid:
+            logger.warning(f"Column '{groupby!s}' could NOT be used as index group. Dropped.")
+
+    except TypeError:
+        logger.warning(f"Column '{groupby!s}' dtype NOT understood. Dropped")
+
+    return is_valid
+
+
+def group_inspection_dataframe(
+    inspection_df: pd.DataFrame,
+    groupby: Union[str, list, set] = None,
+    exclude: Union[str, list, set] = None,
+    as_group: bool = False,
+    as_index: bool = False,
+):
+    """Group the inspection DataFrame by columns matching `groupby`, groups form the hierarchical index."""
+    groupby = groupby or []
+    exclude = exclude or []
+
+    if isinstance(groupby, str):
+        groupby = [groupby]
+
+    if isinstance(exclude, str):
+        exclude = [exclude]
+
+    groups = []
+
+    for key in groupby:
+        columns_idx = inspection_df.columns.str.contains(key)
+        columns = inspection_df.columns[columns_idx]
+
+        if not len(columns):
+            raise KeyError(f"Could NOT find suitable column given the keys: `{groupby}`")
+
+        groups.extend(columns)
+
+    index_groups = []
+
+    for col in inspection_df[groups].columns:
+        # check that the column name is not excluded
+        if any(re.search(e, col) for e in exclude):
+            continue
+
+        if _is_valid_group(inspection_df, col):
+            index_groups.append(col)
+
+    index_groups = pd.Series(index_groups).unique().tolist()
+
+    # construct multi-index if grouping is requested
+    group = inspection_df.groupby(index_groups)
+
+    if as_group:
+        return group
+
+    indices = group.indices
+
+    levels = []
+    positions = []
+    for level, values in indices.items():
+        if isinstance(level, tuple):
+            levels.extend([(*level, v) for v in values])
+        else:
+            levels.extend([(level, v) for v in values])
+        positions.extend(values)
+
+    index = pd.MultiIndex.from_tuples(levels, names=[*index_groups, None])
+
+    if as_index:
+        return index
+
+    # the index is constructed in the order of groups, rows have to follow it
+    return inspection_df.iloc[positions].set_index(index).drop(index_groups, axis=1).sort_index(level=-1)
+
+
+def filter_inspection_dataframe(
+    inspection_df: pd.DataFrame, like: str = None, regex: str = None, axis: int = None
+) -> pd.DataFrame:
+    """Filter columns of the inspection DataFrame, duration columns are always kept."""
+    if not any([like, regex]):
+        return inspection_df
+
+    filtered_df = inspection_df.filter(like=like, regex=regex, axis=axis)
+
+    if not any(filtered_df.columns.str.contains("duration")):
+        # duration columns must be present
+        filtered_df = filtered_df.join(inspection_df.filter(like="duration"))
+
+    inspection_df = filtered_df
+
+    return inspection_df
+
+
+@instrument
+def query_inspection_dataframe(
+    inspection_df: pd.DataFrame,
+    *,
+    query: str = None,
+    groupby: Union[str, list, set] = None,
+    exclude: Union[str, list, set] = None,
+    like: str = None,
+    regex: str = None,
+    axis: int = None,
+    sort_index: Union[bool, int, List[int]] = True,
+    engine: str = None,
+) -> pd.DataFrame:
+    """Query inspection DataFrame.
+
+    The order of operations is as follows:
+
+        query resolution -> grouping -> filtering
+
+    :param inspection_df: inspection DataFrame to be filtered as returned by `process_inspection_results`
+    :param groupby: column or list of columns to group the DataFrame by
+    :param exclude: patterns that should be excluded from grouping
+    :param query: pandas query to be evaluated on the filtered DataFrame
+    :param like, regex, axis: parameters passed to the `pd.DataFrame.filter` function
+    :param engine: engine to evaluate the query passed to `where` parameter, see `pd.eval` for more information
+
+        The string provided does NOT need to match the whole column name, the function tries to determine
+        the most suitable column name automatically.
+    """
+    # resolve query
+    inspection_df = resolve_query(query=query, context=inspection_df, engine=engine)
+
+    if groupby:
+        inspection_df = group_inspection_dataframe(inspection_df, groupby=groupby, exclude=exclude)
+
+    # filter
+    df = filter_inspection_dataframe(inspection_df, like=like, regex=regex, axis=axis)
+
+    if sort_index:
+        if isinstance(sort_index, bool):
+            levels = np.arange(df.index.nlevels - 1).tolist()
+        else:
+            levels = sort_index
+
+        return df.sort_index(level=levels)
+
+    return df
+
+
+def get_column_group(
+    df: pd.DataFrame, columns: Union[List[Union[str, int]], pd.Index] = None, label: str = None
+) -> pd.Series:
+    """Merge the columns into a single column of named tuples."""
+    columns = columns or df.columns
+
+    if all(isinstance(c, int) for c in columns):
+        columns = [df.columns[i] for i in columns]
+
+    if not label:
+        cols = [col.split("_") for col in columns]
+
+        common_words = set(functools.reduce(np.intersect1d, cols))
+        if common_words:
+            label = "_".join(w for w in cols[0] if w in common_words).strip("_")
+
+            if len(label) <= 0:
+                label = str(tuple(columns))
+        else:
+            label = str(tuple(columns))
+
+    Group = namedtuple("Group", columns)
+
+    groups = []
+    for i, row in df[columns].iterrows():
+        groups.append(Group(*row))
+
+    return pd.Series(groups, name=label)
+
+
+def get_index_group(df: pd.DataFrame, names: List[Union[str, int]] = None, label: str = None) -> pd.MultiIndex:
+    """Merge the index levels into a single level of named tuples."""
+    names = names or list(filter(bool, df.index.names[:-1]))
+
+    if all(isinstance(n, int) for n in names):
+        names = [df.index.names[i] for i in names]
+
+    index = df.index.to_frame(index=False)
+    group = get_column_group(index[names])
+
+    index = index.drop(columns=names)
+    group_indices = pd.DataFrame(group).join(index).values.tolist()
+
+    group_index = pd.MultiIndex.from_tuples(group_indices, names=[group.name, *index.columns[:-1], None])
+
+    return group_index
+
+
+def set_index_group(df: pd.DataFrame, names: List[Union[str, int]] = None, label: str = None) -> pd.DataFrame:
+    """Merge the index levels into a single level of named tuples."""
+    group_index = get_index_group(df, names, label)
+
+    return df.set_index(group_index)
+
+
+def get_numeric_columns(df: pd.DataFrame, columns: Union[str, List[str]]) -> List[str]:
+    """Resolve regular expression (or list of columns) to numeric (and boolean) columns of the DataFrame."""
+    if isinstance(columns, str):
+        columns = df.columns[df.columns.str.contains(columns, regex=True)].tolist()
+
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise KeyError(f"Could NOT find columns: {missing}")
+
+    return [c for c in columns if pd.api.types.is_numeric_dtype(df[c]) or pd.api.types.is_bool_dtype(df[c])]
+
+
+def get_group_codes(
+    df: pd.DataFrame, groupby: Union[str, List[str]] = None
+) -> Tuple[np.ndarray, Union[pd.Index, None]]:
+    """Get group code of each row and the index of groups of the frame grouped by `group_inspection_dataframe`.
+
+    :param df: DataFrame with groups in the index levels
+    :param groupby: index levels forming the groups, all named index levels by default
+    :return: group code of each row and the index of groups (None and all codes 0 if there are NO groups),
+        rows with missing group keys form groups of their own
+    """
+    if groupby is None:
+        groupby = [name for name in df.index.names if name is not None]
+    elif isinstance(groupby, str):
+        groupby = [groupby]
+
+    if not groupby:
+        return np.zeros(len(df), dtype=np.intp), None
+
+    keys = df.index.to_frame(index=False)[groupby]
+    codes, uniques = pd.MultiIndex.from_frame(keys).factorize()
+    uniques = uniques.set_names(groupby)
+
+    if len(groupby) == 1:
+        uniques = pd.Index(uniques.get_level_values(0), name=groupby[0])
+
+    return codes, uniques
+
+
+@instrument
+def make_subplots(data: pd.DataFrame, columns: List[str] = None, *, kind: str = "box", **kwargs):
+    """Create a grid of plots, one per group of the hierarchical index."""
+    from plotly import figure_factory as ff
+    from plotly import tools
+    from prettyprinter import pformat
+
+    if kind not in ("box", "histogram", "scatter", "scatter_with_bounds"):
+        raise ValueError(f"Can NOT handle plot of kind: {kind}.")
+
+    index = data.index.droplevel(-1).unique()
+
+    if len(index.names) > 2:
+        logger.warning(f"Can only handle hierarchical index of depth <= 2, got {len(index.names)}. Grouping index.")
+
+        return make_subplots(set_index_group(data, range(index.nlevels - 1)), columns, kind=kind, **kwargs)
+
+    grid = ff.create_facet_grid(
+        data.reset_index(),
+        facet_row=index.names[1] if index.nlevels > 1 else None,
+        facet_col=index.names[0],
+        trace_type="box",  # box does not need data specification
+        ggplot2=True,
+    )
+
+    shape = np.shape(grid._grid_ref)[:-1]
+
+    sub_plots = tools.make_subplots(
+        rows=shape[0],
+        cols=shape[1],
+        shared_yaxes=kwargs.pop("shared_yaxes", True),
+        shared_xaxes=kwargs.pop("shared_xaxes", False),
+        print_grid=kwargs.pop("print_grid", False),
+    )
+
+    if isinstance(index, pd.MultiIndex):
+        index_grid = zip(*index.codes)
+    else:
+        index_grid = iter(
+            np.transpose([np.tile(np.arange(shape[1]), shape[0]), np.repeat(np.arange(shape[0]), shape[1])])
+        )
+
+    create_figure = globals()[f"create_duration_{kind}"]
+
+    for idx, grp in data.groupby(level=np.arange(index.nlevels).tolist()):
+        if not isinstance(columns, str) and kind == "scatter_with_bounds":
+            if columns is None:
+                raise ValueError("`scatter_with_bounds` requires `col` argument, not provided.")
+            try:
+                (columns,) = columns
+            except ValueError:
+                raise ValueError("`scatter_with_bounds` does not allow for multiple columns.")
+
+        fig = create_figure(grp, columns, **kwargs)
+
+        col, row = map(int, next(index_grid))  # col-first plotting
+        for trace in fig.data:
+            sub_plots.append_trace(trace, row + 1, col + 1)
+
+    layout = sub_plots.layout
+    layout.update(
+        title=kwargs.get("title", fig.layout.title),
+        shapes=grid.layout.shapes,
+        annotations=grid.layout.annotations,
+        showlegend=False,
+    )
+
+    x_dom_vals = [k for k in layout.to_plotly_json().keys() if "xaxis" in k]
+    y_dom_vals = [k for k in layout.to_plotly_json().keys() if "yaxis" in k]
+
+    layout_shapes = pd.DataFrame(layout.to_plotly_json()["shapes"]).sort_values(["x0", "y0"])
+
+    h_shapes = layout_shapes[~layout_shapes.x0.duplicated(keep=False)]
+    v_shapes = layout_shapes[~layout_shapes.y0.duplicated(keep=False)]
+
+    # handle single-columns
+    h_shapes = h_shapes.query("y1 - y0 != 1")
+    v_shapes = v_shapes.query("x1 - x0 != 1")
+
+    # update axis domains and layout
+    for idx, x_axis in enumerate(x_dom_vals):
+        x0, x1 = h_shapes.iloc[idx % shape[1]][["x0", "x1"]]
+
+        layout[x_axis].domain = (x0 + 0.03, x1 - 0.03)
+        layout[x_axis].update(showticklabels=False, zeroline=False)
+
+    for idx, y_axis in enumerate(y_dom_vals):
+        y0, y1 = v_shapes.iloc[idx % shape[0]][["y0", "y1"]]
+
+        layout[y_axis].domain = (y0 + 0.03, y1 - 0.03)
+        layout[y_axis].update(zeroline=False)
+
+    # correct annotation to match the relevant group and width
+    annot_df = pd.DataFrame(layout.to_plotly_json()["annotations"]).sort_values(["x", "y"])
+    annot_df = annot_df[annot_df.text.str.len() > 0]
+
+    aw = min(  # annotation width magic
+        int(max(60 / shape[1] - (2 * shape[1]), 6)), int(max(30 / shape[0] - (2 * shape[0]), 6))
+    )
+
+    for i, annot_idx in enumerate(annot_df.index):
+        annot = layout.annotations[annot_idx]
+
+        index_label: Union[str, Any] = annot["text"]
+        if isinstance(index, pd.MultiIndex):
+            index_axis = i >= shape[1]
+            if shape[0] == 1:
+                pass  # no worries, the order and label are aight
+            elif shape[1] == 1:
+                index_label = index.levels[index_axis][max(0, i - 1)]
+            else:
+                index_label = index.levels[index_axis][i % shape[1]]
+
+        text: str = str(index_label)
+
+        annot["text"] = re.sub(r"^(.{%d}).*(.{%d})$" % (aw, aw), r"\g<1>...\g<2>", text)
+        annot["hovertext"] = "<br>".join(pformat(index_label).split("\n"))
+
+    # add axis titles as plot annotations
+    layout.annotations = (
+        *layout.annotations,
+        {
+            "x": 0.5,
+            "y": -0.05,
+            "xref": "paper",
+            "yref": "paper",
+            "text": fig.layout.xaxis["title"]["text"],
+            "showarrow": False,
+        },
+        {
+            "x": -0.05,
+            "y": 0.5,
+            "xref": "paper",
+            "yref": "paper",
+            "text": fig.layout.yaxis["title"]["text"],
+            "textangle": -90,
+            "showarrow": False,
+        },
+    )
+
+    # custom user layout updates
+    user_layout = kwargs.pop("layout", None)
+    if user_layout:
+        layout.update(user_layout)
+
+    return sub_plots
+
+
+def show_categories(inspection_df: pd.DataFrame) -> None:
+    """List categories of the grouped inspection DataFrame."""
+    index = inspection_df.index.droplevel(-1).unique()
+
+    for n, idx in enumerate(index.values):
+        print("\nCategory {}/{}".format(n + 1, len(index)))
+        if len(index.names) > 1:
+            for name, ind in zip(index.names, idx):
+                print(f"{name} :", ind)
+        else:
+            print(f"{index.names[0]} :", idx)
+
+        frame = inspection_df.loc[idx]
+        print("Number of rows (jobs) is:", frame.shape[0])
+
+
+_BENCHMARK_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def benchmark_import(module: str = __name__, repeat: int = 5) -> dict:
+    """Measure time to import the module in a fresh interpreter and check which heavy modules it loads."""
+    script = _BENCHMARK_SCRIPT.format(module=module, heavy=HEAVY_MODULES)
+
+    timings = []
+    loaded = set()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", script], check=True, stdout=subprocess.PIPE, universal_newlines=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+
+        timings.append(result["elapsed"])
+        loaded.update(result["loaded"])
+
+    return {
+        "module": module,
+        "min": min(timings),
+        "median": float(np.median(timings)),
+        "heavy_modules_loaded": sorted(loaded),
+    }
+
+
+def cli(argv: List[str] = None) -> int:
+    """Benchmark the import time of the module."""
+    parser = argparse.ArgumentParser(prog=f"python -m {__name__}", description=cli.__doc__)
+    parser.add_argument("--repeat", type=int, default=5, help="Number of imports measured.")
+    parser.add_argument("--threshold", type=float, default=1.0, help="Maximum median import time in seconds.")
+
+    args = parser.parse_args(argv)
+
+    # measured from the package, `python -m` imports this module as __main__
+    result = benchmark_import("thoth_notebooks.inspection", repeat=args.repeat)
+
+    print(f"import {result['module']}: min {result['min']:.3f}s, median {result['median']:.3f}s")
+    if result["heavy_modules_loaded"]:
+        print(f"Heavy modules loaded on import: {', '.join(result['heavy_modules_loaded'])}")
+
+    return int(bool(result["heavy_modules_loaded"]) or result["median"] > args.threshold)
+
+
+if __name__ == "__main__":
+    raise SystemExit(cli())
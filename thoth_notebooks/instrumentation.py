@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+
+"""Timing and memory instrumentation of notebook cells and library functions.
+
+Library functions are instrumented using the `instrument` decorator:
+
+    @instrument
+    def process_inspection_results(inspection_results, ...):
+        ...
+
+Notebook cells are instrumented by loading the IPython extension:
+
+    %load_ext thoth_notebooks.instrumentation
+
+Each call (or cell) appends a record with wall time, CPU time, peak RSS delta and
+input/output row counts to the log, which can be summarized at the end of the run:
+
+    from thoth_notebooks import instrumentation
+
+    instrumentation.summary()
+    instrumentation.create_flame_chart()
+"""
+
+import functools
+import json
+import logging
+import resource
+import sys
+import threading
+import time
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+_LOG: List[Dict[str, Any]] = []
+
+# stack of currently running instrumented calls, used to reconstruct the call tree
+_STACK = threading.local()
+
+
+def peak_rss() -> int:
+    """Get peak resident set size of the current process in bytes."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNIT
+
+
+def _count_rows(obj: Any) -> Optional[int]:
+    """Get number of rows of the DataFrame (or number of items of a collection)."""
+    if isinstance(obj, (str, bytes, dict)) or not hasattr(obj, "__len__"):
+        return None
+
+    if isinstance(obj, tuple) and obj:
+        # functions returning multiple values, e.g. (dataframe, info)
+        return _count_rows(obj[0])
+
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+def _stack() -> list:
+    if not hasattr(_STACK, "calls"):
+        _STACK.calls = []
+
+    return _STACK.calls
+
+
+class _Measurement:
+    """Measure resources consumed between `start` and `stop`."""
+
+    def __init__(self, name: str, kind: str):
+        self.record: Dict[str, Any] = {"name": name, "kind": kind}
+
+    def start(self, rows_in: int = None) -> None:
+        stack = _stack()
+
+        self.record.update(
+            parent=stack[-1]["name"] if stack else None,
+            depth=len(stack),
+            started_at=time.time(),
+            rows_in=rows_in,
+        )
+        stack.append(self.record)
+
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._rss = peak_rss()
+
+    def stop(self, rows_out: int = None, success: bool = True) -> Dict[str, Any]:
+        self.record.update(
+            wall_time=time.perf_counter() - self._wall,
+            cpu_time=time.process_time() - self._cpu,
+            peak_rss_delta=peak_rss() - self._rss,
+            rows_out=rows_out,
+            success=success,
+        )
+
+        stack = _stack()
+        if stack and stack[-1] is self.record:
+            stack.pop()
+
+        _LOG.append(self.record)
+
+        return self.record
+
+
+def instrument(func: Callable = None, *, name: str = None) -> Callable:
+    """Record wall time, CPU time, peak RSS delta and row counts of each call of the decorated function."""
+    if func is None:
+        return functools.partial(instrument, name=name)
+
+    name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        measurement = _Measurement(name, kind="function")
+        measurement.start(rows_in=_count_rows(args[0]) if args else None)
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            measurement.stop(success=False)
+            raise
+
+        measurement.stop(rows_out=_count_rows(result))
+
+        return result
+
+    return wrapper
+
+
+def get_log() -> List[Dict[str, Any]]:
+    """Get records collected so far."""
+    return list(_LOG)
+
+
+def clear_log() -> None:
+    """Remove all records collected so far."""
+    _LOG.clear()
+
+
+def export_log(path: Union[str, Path]) -> None:
+    """Export records collected so far as JSON lines."""
+    with open(path, "w") as f:
+        for record in _LOG:
+            f.write(json.dumps(record, default=str) + "\n")
+
+
+def summary(records: List[Dict[str, Any]] = None):
+    """Summarize the records per instrumented function (or cell), the slowest first."""
+    import pandas as pd
+
+    records = records if records is not None else _LOG
+
+    columns = ["name", "kind", "wall_time", "cpu_time", "peak_rss_delta", "rows_in", "rows_out"]
+    df = pd.DataFrame(records, columns=columns)
+
+    return (
+        df.groupby(["name", "kind"])
+        .agg(
+            calls=("wall_time", "size"),
+            wall_time=("wall_time", "sum"),
+            wall_time_mean=("wall_time", "mean"),
+            cpu_time=("cpu_time", "sum"),
+            peak_rss_delta=("peak_rss_delta", "max"),
+            rows_in=("rows_in", "max"),
+            rows_out=("rows_out", "max"),
+        )
+        .sort_values("wall_time", ascending=False)
+    )
+
+
+def create_flame_chart(records: List[Dict[str, Any]] = None, **kwargs):
+    """Create flame-style chart of the records, one bar per call placed by time and call depth."""
+    from plotly import graph_objs as go
+
+    records = records if records is not None else _LOG
+    if not records:
+        raise ValueError("No records collected.")
+
+    origin = min(r["started_at"] for r in records)
+
+    traces = []
+    for kind in sorted({r["kind"] for r in records}):
+        selected = [r for r in records if r["kind"] == kind]
+
+        traces.append(
+            go.Bar(
+                name=kind,
+                orientation="h",
+                base=[r["started_at"] - origin for r in selected],
+                x=[r["wall_time"] for r in selected],
+                y=[r["depth"] for r in selected],
+                text=[r["name"] for r in selected],
+                hovertext=[
+                    f"{r['name']}<br>wall: {r['wall_time']:.3f}s<br>cpu: {r['cpu_time']:.3f}s"
+                    f"<br>peak RSS Δ: {r['peak_rss_delta'] / 2 ** 20:.1f} MiB"
+                    f"<br>rows: {r['rows_in']} → {r['rows_out']}"
+                    for r in selected
+                ],
+                hoverinfo="text",
+            )
+        )
+
+    layout = go.Layout(
+        title=kwargs.pop("title", "Instrumented calls"),
+        barmode="overlay",
+        xaxis=dict(title="time [s]"),
+        yaxis=dict(title="call depth", autorange="reversed", dtick=1),
+    )
+
+    return go.Figure(data=traces, layout=layout)
+
+
+class _CellInstrumentation:
+    """IPython event handlers recording each executed cell."""
+
+    def __init__(self, ip):
+        self.ip = ip
+        self.measurement: Optional[_Measurement] = None
+
+    def pre_run_cell(self, info=None):
+        self.measurement = _Measurement(f"cell [{self.ip.execution_count}]", kind="cell")
+
+        raw_cell = getattr(info, "raw_cell", None) or ""
+        self.measurement.record["source"] = next(iter(raw_cell.strip().splitlines()), "")[:80]
+
+        self.measurement.start()
+
+    def post_run_cell(self, result):
+        if self.measurement is None:
+            return
+
+        self.measurement.stop(rows_out=_count_rows(result.result), success=bool(result.success))
+        self.measurement = None
+
+
+_CELL_INSTRUMENTATION: Optional[_CellInstrumentation] = None
+
+
+def load_ipython_extension(ip) -> None:
+    """Record each executed cell, called by `%load_ext thoth_notebooks.instrumentation`."""
+    global _CELL_INSTRUMENTATION
+
+    if _CELL_INSTRUMENTATION is not None:
+        return
+
+    _CELL_INSTRUMENTATION = _CellInstrumentation(ip)
+    ip.events.register("pre_run_cell", _CELL_INSTRUMENTATION.pre_run_cell)
+    ip.events.register("post_run_cell", _CELL_INSTRUMENTATION.post_run_cell)
+
+
+def unload_ipython_extension(ip) -> None:
+    """Stop recording executed cells."""
+    global _CELL_INSTRUMENTATION
+
+    if _CELL_INSTRUMENTATION is None:
+        return
+
+    ip.events.unregister("pre_run_cell", _CELL_INSTRUMENTATION.pre_run_cell)
+    ip.events.unregister("post_run_cell", _CELL_INSTRUMENTATION.post_run_cell)
+
+    _CELL_INSTRUMENTATION = None
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+"""Local compressed store of build logs with lazy handles.
+
+Instead of discarding build logs to save memory, logs are compressed into a local append-only
+store and the inspection document keeps only a handle - the document ID and the offset of the
+log in the store. The log is read and decompressed only when accessed:
+
+    log_store = LogStore("logs/")
+
+    for document_id, document in inspection_store.iterate_results():
+        document["build_log"] = log_store.put(document_id, document["build_log"])
+
+    df = process_inspection_results(inspection_results, ...)
+    print(df.build_log.iloc[0].text)
+
+Logs of inspections which were processed with logs discarded can be retrieved in bulk, e.g. for
+the failed ones only:
+
+    log_store.prefetch(inspection_store, failed_inspection_ids(df))
+"""
+
+import logging
+import os
+import zlib
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from .solver import iter_documents
+
+logger = logging.getLogger(__name__)
+
+DATA_FILE_NAME = "logs.zlib"
+INDEX_FILE_NAME = "index.tsv"
+
+
+class LogHandle:
+    """Reference to a build log in the `LogStore`, the log is loaded on access."""
+
+    __slots__ = ("store", "document_id", "offset", "length")
+
+    def __init__(self, store: "LogStore", document_id: str, offset: int, length: int):
+        self.store = store
+        self.document_id = document_id
+        self.offset = offset
+        self.length = length
+
+    @property
+    def text(self) -> str:
+        """Load and decompress the log."""
+        return self.store.read(self)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f"<LogHandle {self.document_id} @{self.offset}+{self.length}>"
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, LogHandle) and (self.store.path, self.offset) == (other.store.path, other.offset)
+
+    def __hash__(self) -> int:
+        return hash((self.document_id, self.offset))
+
+
+class LogStore:
+    """Append-only store of zlib-compressed logs, each log is compressed separately for random access."""
+
+    def __init__(self, path: Union[str, Path], level: int = 6):
+        """Open (or create) the store in the directory given.
+
+        :param path: directory of the store
+        :param level: zlib compression level
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.level = level
+
+        self._data_path = self.path / DATA_FILE_NAME
+        self._index_path = self.path / INDEX_FILE_NAME
+        self._index: Dict[str, Tuple[int, int]] = self._load_index()
+
+    def _load_index(self) -> Dict[str, Tuple[int, int]]:
+        index = {}
+        if not self._index_path.exists():
+            return index
+
+        size = self._data_path.stat().st_size if self._data_path.exists() else 0
+        with open(self._index_path) as f:
+            for line in f:
+                try:
+                    document_id, offset, length = line.rstrip("\n").split("\t")
+                    offset, length = int(offset), int(length)
+                except ValueError:
+                    # interrupted write of the last entry
+                    continue
+
+                if offset + length <= size:
+                    index[document_id] = (offset, length)
+
+        return index
+
+    def __reduce__(self):
+        # handles kept in pickled DataFrames refer to the store by its path
+        return self.__class__, (str(self.path), self.level)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._index
+
+    def handle(self, document_id: str) -> Optional[LogHandle]:
+        """Get handle of the log of the document, None if the log is NOT stored."""
+        entry = self._index.get(document_id)
+        if entry is None:
+            return None
+
+        return LogHandle(self, document_id, *entry)
+
+    def put(self, document_id: str, log: Optional[str]) -> Optional[LogHandle]:
+        """Store the log, the log of a document is stored only once."""
+        if log is None:
+            return self.handle(document_id)
+
+        if isinstance(log, LogHandle):
+            return log
+
+        if document_id in self._index:
+            return self.handle(document_id)
+
+        data = zlib.compress(log.encode("utf-8", errors="replace"), self.level)
+
+        with open(self._data_path, "ab") as f:
+            offset = f.tell()
+            f.write(data)
+
+        # the index entry is written only once the data are, a crash can leave only unreferenced data
+        with open(self._index_path, "a") as f:
+            f.write(f"{document_id}\t{offset}\t{len(data)}\n")
+
+        self._index[document_id] = (offset, len(data))
+
+        return LogHandle(self, document_id, offset, len(data))
+
+    def read(self, handle: LogHandle) -> str:
+        """Load and decompress the log referenced by the handle."""
+        with open(self._data_path, "rb") as f:
+            f.seek(handle.offset)
+            data = f.read(handle.length)
+
+        return zlib.decompress(data).decode("utf-8")
+
+    def read_many(self, handles: Iterable[Optional[LogHandle]]) -> List[Optional[str]]:
+        """Load logs referenced by handles (None for missing handles), the store is read sequentially."""
+        handles = list(handles)
+        logs: List[Optional[str]] = [None] * len(handles)
+
+        with open(self._data_path, "rb") as f:
+            for i in sorted((i for i, h in enumerate(handles) if h is not None), key=lambda i: handles[i].offset):
+                f.seek(handles[i].offset)
+                logs[i] = zlib.decompress(f.read(handles[i].length)).decode("utf-8")
+
+        return logs
+
+    def prefetch(self, store, document_ids: Iterable[str], *, max_workers: int = 16) -> List[LogHandle]:
+        """Retrieve logs of the documents which are NOT stored yet from the (remote) store.
+
+        :param store: connected `InspectionResultsStore` (or a fixture store)
+        :param document_ids: IDs of the documents whose logs should be available locally
+        :param max_workers: number of concurrent retrievals
+        """
+        document_ids = list(dict.fromkeys(document_ids))
+        missing = [document_id for document_id in document_ids if document_id not in self._index]
+
+        for document_id, document in iter_documents(store, document_ids=missing, max_workers=max_workers):
+            if self.put(document_id, document.get("build_log")) is None:
+                logger.warning(f"Document {document_id!r} has NO build log")
+
+        logger.info(f"Prefetched {len(missing)} build logs, {len(document_ids) - len(missing)} already stored")
+
+        return [h for h in map(self.handle, document_ids) if h is not None]
+
+    def handles(self, document_ids: Iterable[str]) -> pd.Series:
+        """Get handles of logs of the documents (None if NOT stored), e.g. to fill the `build_log` column."""
+        document_ids = list(document_ids)
+
+        return pd.Series([self.handle(d) for d in document_ids], index=document_ids, name="build_log", dtype=object)
+
+    def stats(self) -> Dict[str, Any]:
+        """Describe the store - number of logs and compressed size."""
+        return {
+            "logs": len(self._index),
+            "size": os.path.getsize(self._data_path) if self._data_path.exists() else 0,
+        }
+
+
+def failed_inspection_ids(inspection_df: pd.DataFrame, id_column: str = "inspection_id") -> List[str]:
+    """Get IDs of inspections whose build or job exited with non-zero exit code."""
+    exit_codes = inspection_df.filter(regex=r"^status__(build|job)__exit_code$")
+    if exit_codes.empty:
+        raise KeyError("No `status__*__exit_code` columns found in the inspection DataFrame")
+
+    failed = (exit_codes.fillna(0) != 0).any(axis=1)
+
+    return inspection_df.loc[failed, id_column].tolist()
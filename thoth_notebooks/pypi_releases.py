@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""Streaming aggregation of package info gathered from PyPI.
+
+Files produced by fridex/pypi-gather-package-info (`*_gathered_pypi_package_info.yaml`) are
+parsed event by event, so no file is ever loaded as a whole. Only the upload time of the
+first artifact of each release is kept:
+
+    histogram, releases = aggregate_releases("../data/", cache_dir=".cache/pypi", keep_releases=True)
+
+Files are processed in parallel, each file is turned into a small columnar table
+(package name, version, upload time) which is optionally cached, so subsequent runs
+do NOT parse YAML files again.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FILE_SUFFIX = "_gathered_pypi_package_info.yaml"
+
+
+def _iter_first_uploads(stream) -> Iterator[Tuple[str, str, str]]:
+    """Yield (package name, version, upload time of the first artifact) from the YAML stream."""
+    import yaml
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+    # path of keys (or sequence indexes) to the current node
+    path: list = []
+    # for each open mapping: whether the next scalar is a key
+    expect_key: List[bool] = []
+
+    name: Optional[str] = None
+    uploads: List[Tuple[str, str]] = []
+
+    for event in yaml.parse(stream, Loader=loader):
+        if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+            if isinstance(event, yaml.MappingStartEvent):
+                expect_key.append(True)
+            else:
+                expect_key.append(None)
+                path.append(0)
+
+        elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+            if expect_key.pop() is None:
+                path.pop()
+
+            # end of a package info entry - ["packages_info", i]
+            if len(path) == 2 and path[0] == "packages_info" and isinstance(event, yaml.MappingEndEvent):
+                for version, upload_time in uploads:
+                    yield name, version, upload_time
+
+                name = None
+                uploads = []
+
+            _value_parsed(path, expect_key)
+
+        elif isinstance(event, (yaml.ScalarEvent, yaml.AliasEvent)):
+            if expect_key and expect_key[-1]:
+                path.append(event.value if isinstance(event, yaml.ScalarEvent) else None)
+                expect_key[-1] = False
+                continue
+
+            if len(path) == 4 and path[0] == "packages_info" and path[2:] == ["info", "name"]:
+                name = event.value
+            elif (
+                len(path) == 6
+                and path[0] == "packages_info"
+                and path[2] == "releases"
+                and path[4] == 0
+                and path[5] == "upload_time_iso_8601"
+            ):
+                uploads.append((str(path[3]), event.value))
+
+            _value_parsed(path, expect_key)
+
+
+def _value_parsed(path: list, expect_key: List[Optional[bool]]) -> None:
+    """Update the path once a value of a mapping entry (or a sequence item) has been parsed."""
+    if not expect_key:
+        return
+
+    if expect_key[-1] is False:
+        path.pop()
+        expect_key[-1] = True
+    elif expect_key[-1] is None:
+        path[-1] += 1
+
+
+def _parse_iso8601(values: pd.Series) -> pd.Series:
+    """Parse ISO 8601 timestamps, vectorized."""
+    if int(pd.__version__.split(".")[0]) >= 2:
+        # pandas>=2 infers the format from the first value, timestamps with and without fractions can be mixed
+        return pd.to_datetime(values, utc=True, errors="coerce", format="ISO8601")
+
+    return pd.to_datetime(values, utc=True, errors="coerce")
+
+
+def read_releases(path: Union[str, Path]) -> pd.DataFrame:
+    """Read releases of the gathered package info file into a columnar table."""
+    from .graph import canonicalize_name
+
+    with open(path, "rb") as f:
+        releases = pd.DataFrame.from_records(
+            _iter_first_uploads(f), columns=["package_name", "version", "upload_time"]
+        )
+
+    # normalize each package name once, NOT once per release
+    package_name = releases["package_name"].astype("category")
+    categories = package_name.cat.categories
+    releases["package_name"] = package_name.map(
+        dict(zip(categories, canonicalize_name(pd.Series(categories))))
+    ).astype("category")
+    releases["upload_time"] = _parse_iso8601(releases["upload_time"])
+
+    return releases
+
+
+def _cache_path(path: Path, cache_dir: Path) -> Path:
+    stat = path.stat()
+    key = hashlib.sha256(f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+
+    return cache_dir / f"{path.name}.{key[:16]}.pickle"
+
+
+def _read_releases_cached(path: Path, cache_dir: Optional[Path]) -> pd.DataFrame:
+    """Read releases, the parsed table is stored in the cache (if any) and reused until the file changes."""
+    if cache_dir is None:
+        return read_releases(path)
+
+    cache_path = _cache_path(path, cache_dir)
+    try:
+        return pd.read_pickle(cache_path)
+    except FileNotFoundError:
+        pass
+
+    releases = read_releases(path)
+
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.close(fd)
+    try:
+        releases.to_pickle(tmp_path)
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+    return releases
+
+
+def iter_releases(
+    data_dir: Union[str, Path], *, max_workers: int = None, cache_dir: Union[str, Path] = None
+) -> Iterator[pd.DataFrame]:
+    """Parse gathered package info files in `data_dir` in parallel, yield one releases table per file.
+
+    :param data_dir: directory with `*_gathered_pypi_package_info.yaml` files
+    :param max_workers: number of worker processes, defaults to the number of CPUs
+    :param cache_dir: directory to cache parsed tables in
+    """
+    paths = sorted(p for p in Path(data_dir).iterdir() if p.name.endswith(FILE_SUFFIX))
+    if not paths:
+        raise FileNotFoundError(f"No {FILE_SUFFIX!r} files found in {str(data_dir)!r}")
+
+    if cache_dir is not None:
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        yield from executor.map(_read_releases_cached, paths, [cache_dir] * len(paths))
+
+
+def release_histogram(releases: pd.DataFrame) -> pd.Series:
+    """Count releases per month."""
+    upload_time = releases["upload_time"].dropna()
+
+    return upload_time.dt.tz_localize(None).dt.to_period("M").value_counts(sort=False)
+
+
+def aggregate_releases(
+    data_dir: Union[str, Path],
+    *,
+    max_workers: int = None,
+    cache_dir: Union[str, Path] = None,
+    keep_releases: bool = False,
+) -> Tuple[pd.Series, Optional[pd.DataFrame]]:
+    """Compute number of releases per month over all the gathered package info files.
+
+    Only per-month counts are kept in memory unless `keep_releases` is set, in which case
+    the releases table of all the files is returned as well.
+
+    :param data_dir: directory with `*_gathered_pypi_package_info.yaml` files
+    :param max_workers: number of worker processes, defaults to the number of CPUs
+    :param cache_dir: directory to cache parsed tables in
+    :param keep_releases: return also (package name, version, upload time) of all the releases
+    """
+    histogram = pd.Series(dtype="int64")
+    kept = []
+
+    for releases in iter_releases(data_dir, max_workers=max_workers, cache_dir=cache_dir):
+        histogram = histogram.add(release_histogram(releases), fill_value=0)
+
+        if keep_releases:
+            kept.append(releases)
+
+    if not histogram.empty:
+        months = pd.period_range(histogram.index.min(), histogram.index.max(), freq="M")
+        histogram = histogram.reindex(months, fill_value=0).astype("int64")
+
+    histogram.index.name = "month"
+
+    if not keep_releases:
+        return histogram, None
+
+    releases = pd.concat(kept, ignore_index=True)
+    releases["package_name"] = releases["package_name"].astype("category")
+
+    return histogram, releases
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+
+"""Stratified sampling of inspection results for fast preview analyses.
+
+Taking the first N inspection results skews the preview toward whichever batches are listed
+first. Document IDs are instead sampled in a single streaming pass over the document listing,
+a reservoir of at most `per_stratum` IDs is kept for each stratum - by default the batch identifier
+encoded in the inspection ID - and only the sampled documents are retrieved:
+
+    sampler = StratifiedSampler(per_stratum=20)
+    sampler.update_ids(inspection_store.get_document_listing())
+    sampler.fetch(inspection_store, transform=drop_build_log)
+
+    df = process_inspection_results(sampler.documents(), drop=False)
+    duration_statistics(create_duration_dataframe(df), sampler.labels(), sampler.population())
+
+Strata can be also formed by values of columns matched by the `groupby` keys (the same keys as accepted
+by `group_inspection_dataframe`, e.g. platform and software stack), these are known only from documents,
+so all the documents have to be retrieved - use `update` when documents are iterated anyway:
+
+    sampler = StratifiedSampler(per_stratum=20, groupby=["platform", "ncpus", "base", "requirements_locked"])
+    sampler.update(inspection_store.iterate_results(), transform=drop_build_log)
+
+Duration statistics are reported per stratum and overall (strata weighted by their size in the stream)
+together with confidence intervals of the mean.
+"""
+
+import logging
+import random
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GROUPBY = ("platform", "ncpus", "base", "requirements_locked")
+DEFAULT_EXCLUDE = ("node",)
+
+_Stratum = Tuple[Tuple[str, Any], ...]
+
+
+def flatten_document(document: Dict[str, Any], sep: str = "__", prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested dictionaries, keys are the same as columns created by `process_inspection_results`."""
+    flat = {}
+    for key, value in document.items():
+        column = f"{prefix}{sep}{key}" if prefix else key
+
+        if isinstance(value, dict) and value:
+            flat.update(flatten_document(value, sep=sep, prefix=column))
+        else:
+            flat[column] = value
+
+    return flat
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+
+    if isinstance(value, dict):
+        return repr(value)
+
+    return value
+
+
+def inspection_metadata(inspection_id: str) -> Dict[str, Any]:
+    """Get metadata encoded in the inspection ID (`inspection-<identifier>-<suffix>`) - the batch identifier."""
+    name = inspection_id[len("inspection-"):] if inspection_id.startswith("inspection-") else inspection_id
+    identifier, sep, _ = name.rpartition("-")
+
+    return {"identifier": identifier if sep else None}
+
+
+def drop_build_log(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop build log of the document to save memory."""
+    document["build_log"] = None
+
+    return document
+
+
+class StratifiedSampler:
+    """Keep a uniform random sample of at most `per_stratum` documents of each stratum (reservoir sampling)."""
+
+    def __init__(
+        self,
+        per_stratum: int = 20,
+        groupby: Union[str, Iterable[str]] = DEFAULT_GROUPBY,
+        exclude: Union[str, Iterable[str]] = DEFAULT_EXCLUDE,
+        seed: int = None,
+    ):
+        """Initialize the sampler.
+
+        :param per_stratum: maximum number of documents sampled from each stratum
+        :param groupby: patterns of flattened columns which form the stratum, see `group_inspection_dataframe`
+        :param exclude: patterns of columns which should NOT be considered even if matched by `groupby`
+        :param seed: seed of the random number generator, for reproducible previews
+        """
+        if per_stratum < 1:
+            raise ValueError(f"At least one document per stratum has to be sampled, got {per_stratum}")
+
+        self.per_stratum = per_stratum
+        self.groupby = [groupby] if isinstance(groupby, str) else list(groupby)
+        self.exclude = [exclude] if isinstance(exclude, str) else list(exclude or [])
+
+        self._random = random.Random(seed)
+        # column -> whether it is part of the stratum, columns are matched once
+        self._columns: Dict[str, bool] = {}
+
+        self._strata: Dict[_Stratum, int] = {}
+        self._seen: List[int] = []
+        self._reservoirs: List[List[Tuple[str, Dict[str, Any]]]] = []
+
+    def _is_stratum_column(self, column: str) -> bool:
+        is_stratum = self._columns.get(column)
+        if is_stratum is None:
+            is_stratum = self._columns[column] = any(key in column for key in self.groupby) and not any(
+                e in column for e in self.exclude
+            )
+
+        return is_stratum
+
+    def stratum_of(self, document: Dict[str, Any]) -> _Stratum:
+        """Compute stratum of the document - sorted (column, value) pairs of the columns matched."""
+        flat = flatten_document(document)
+
+        return tuple(
+            sorted((column, _hashable(value)) for column, value in flat.items() if self._is_stratum_column(column))
+        )
+
+    def add(self, document_id: str, document: Dict[str, Any]) -> bool:
+        """Consider the document for the sample, return True if the document has been (so far) sampled."""
+        return self._add(self.stratum_of(document), document_id, document)
+
+    def add_id(self, document_id: str, metadata: Dict[str, Any]) -> bool:
+        """Consider the document ID for the sample given metadata forming its stratum, the document is NOT retrieved."""
+        stratum = tuple(sorted((key, _hashable(value)) for key, value in metadata.items()))
+
+        return self._add(stratum, document_id, None)
+
+    def _add(self, stratum: _Stratum, document_id: str, document: Optional[Dict[str, Any]]) -> bool:
+        index = self._strata.get(stratum)
+        if index is None:
+            index = self._strata[stratum] = len(self._seen)
+            self._seen.append(0)
+            self._reservoirs.append([])
+
+        self._seen[index] += 1
+        seen = self._seen[index]
+        reservoir = self._reservoirs[index]
+
+        if len(reservoir) < self.per_stratum:
+            reservoir.append((document_id, document))
+            return True
+
+        # replace a sampled document with probability per_stratum / seen
+        j = self._random.randrange(seen)
+        if j < self.per_stratum:
+            reservoir[j] = (document_id, document)
+            return True
+
+        return False
+
+    def update(
+        self,
+        documents: Iterable[Tuple[str, Dict[str, Any]]],
+        transform: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    ) -> "StratifiedSampler":
+        """Consume (document ID, document) pairs, e.g. `inspection_store.iterate_results()`.
+
+        :param transform: function applied to documents before they are kept, e.g. `drop_build_log`
+        """
+        n_documents = 0
+        for document_id, document in documents:
+            if transform is not None:
+                document = transform(document)
+
+            self.add(document_id, document)
+            n_documents += 1
+
+        logger.info(f"Sampled {sum(map(len, self._reservoirs))} of {n_documents} documents in {len(self._seen)} strata")
+
+        return self
+
+    def update_ids(
+        self, document_ids: Iterable[str], metadata: Callable[[str], Dict[str, Any]] = inspection_metadata
+    ) -> "StratifiedSampler":
+        """Consume document IDs, e.g. `inspection_store.get_document_listing()`, documents are NOT retrieved.
+
+        :param document_ids: IDs of documents to sample from
+        :param metadata: function computing metadata forming the stratum from the document ID
+        """
+        n_documents = 0
+        for document_id in document_ids:
+            self.add_id(document_id, metadata(document_id))
+            n_documents += 1
+
+        logger.info(f"Sampled {sum(map(len, self._reservoirs))} of {n_documents} document IDs in {len(self._seen)} strata")
+
+        return self
+
+    def fetch(
+        self,
+        store,
+        transform: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+        *,
+        max_workers: int = 16,
+        cache=None,
+    ) -> "StratifiedSampler":
+        """Retrieve sampled documents NOT retrieved yet (sampled by `update_ids`) concurrently from the store.
+
+        :param store: connected store the document IDs come from
+        :param transform: function applied to documents before they are kept, e.g. `drop_build_log`
+        :param max_workers: number of concurrent retrievals
+        :param cache: local cache of retrieved documents, see `thoth_notebooks.solver.DocumentCache`
+        """
+        from .solver import iter_documents
+
+        missing = {
+            document_id: (i, j)
+            for i, reservoir in enumerate(self._reservoirs)
+            for j, (document_id, document) in enumerate(reservoir)
+            if document is None
+        }
+
+        for document_id, document in iter_documents(
+            store, document_ids=list(missing), max_workers=max_workers, cache=cache
+        ):
+            if transform is not None:
+                document = transform(document)
+
+            i, j = missing[document_id]
+            self._reservoirs[i][j] = (document_id, document)
+
+        logger.info(f"Retrieved {len(missing)} sampled documents")
+
+        return self
+
+    def documents(self) -> List[Dict[str, Any]]:
+        """Get sampled documents, grouped by stratum."""
+        if any(document is None for reservoir in self._reservoirs for _, document in reservoir):
+            raise ValueError("Sampled documents have NOT been retrieved yet, use `fetch`")
+
+        return [document for reservoir in self._reservoirs for _, document in reservoir]
+
+    def document_ids(self) -> List[str]:
+        """Get IDs of sampled documents, in the same order as `documents`."""
+        return [document_id for reservoir in self._reservoirs for document_id, _ in reservoir]
+
+    def labels(self) -> np.ndarray:
+        """Get stratum of each sampled document, in the same order as `documents`."""
+        return np.repeat(np.arange(len(self._reservoirs)), [len(r) for r in self._reservoirs])
+
+    def population(self) -> pd.Series:
+        """Get number of documents seen in each stratum."""
+        return pd.Series(self._seen, name="seen", dtype="int64").rename_axis("stratum")
+
+    def strata(self) -> pd.DataFrame:
+        """Describe strata - number of documents seen and sampled and the stratum values."""
+        strata = pd.DataFrame(
+            {
+                "seen": self._seen,
+                "sampled": [len(r) for r in self._reservoirs],
+                "values": [dict(stratum) for stratum in self._strata],
+            }
+        ).rename_axis("stratum")
+        strata["weight"] = strata["seen"] / strata["seen"].sum()
+
+        return strata
+
+
+def duration_statistics(
+    durations: pd.DataFrame,
+    labels: Iterable[int],
+    population: pd.Series,
+    columns: Union[str, List[str]] = None,
+    confidence: float = 0.95,
+) -> pd.DataFrame:
+    """Compute mean duration with confidence intervals per stratum and overall.
+
+    The overall mean is the stratified estimate - means of strata weighted by the number of
+    documents seen in each stratum, its variance accounts for sampling without replacement
+    (a stratum sampled completely does NOT add any uncertainty). Strata with a single document
+    sampled do NOT contribute to the variance of the overall mean.
+
+    :param durations: duration DataFrame as created by `create_duration_dataframe` from the sampled documents
+    :param labels: stratum of each row of `durations`, see `StratifiedSampler.labels`
+    :param population: number of documents seen in each stratum, see `StratifiedSampler.population`
+    :param columns: duration columns, `*_duration` columns by default
+    :param confidence: confidence level of the intervals
+    """
+    from scipy import stats
+
+    if columns is None:
+        columns = durations.filter(regex="duration$").columns.tolist()
+    elif isinstance(columns, str):
+        columns = [columns]
+
+    labels = np.asarray(labels)
+    if len(labels) != len(durations):
+        raise ValueError(f"Number of labels ({len(labels)}) does NOT match number of rows ({len(durations)})")
+
+    grouped = durations[columns].set_axis(labels, axis=0).groupby(level=0)
+    n = grouped.count()
+    mean = grouped.mean()
+    std = grouped.std(ddof=1)
+
+    size = population.reindex(n.index).astype("float64")
+    weights = size / size.sum()
+    q = 1 - (1 - confidence) / 2
+
+    rows = []
+    for column in columns:
+        # per stratum: t interval with the finite population correction
+        fpc = np.clip(1 - n[column] / size, 0, None)
+        sem = (std[column] / np.sqrt(n[column]) * np.sqrt(fpc)).mask(fpc == 0, 0.0)
+        half_width = sem * stats.t.ppf(q, (n[column] - 1).where(n[column] > 1))
+
+        per_stratum = pd.DataFrame(
+            {
+                "stratum": n.index,
+                "column": column,
+                "seen": size.astype("int64").values,
+                "n": n[column].values,
+                "mean": mean[column].values,
+                "std": std[column].values,
+                "ci_low": (mean[column] - half_width).values,
+                "ci_high": (mean[column] + half_width).values,
+            }
+        )
+
+        # overall: stratified estimate of the mean
+        overall_mean = (mean[column] * weights).sum()
+        overall_sem = np.sqrt(((sem * weights) ** 2).sum())
+        half_width = overall_sem * stats.norm.ppf(q)
+
+        overall = {
+            "stratum": "overall",
+            "column": column,
+            "seen": int(size.sum()),
+            "n": int(n[column].sum()),
+            "mean": overall_mean,
+            "std": np.nan,
+            "ci_low": overall_mean - half_width,
+            "ci_high": overall_mean + half_width,
+        }
+
+        rows.extend([per_stratum, pd.DataFrame([overall])])
+
+    return pd.concat(rows, ignore_index=True).set_index(["column", "stratum"]).sort_index(level=0, sort_remaining=False)
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+"""Catalog of key paths found in a corpus of JSON documents.
+
+The whole corpus is streamed once, key paths of all the documents are merged into a trie
+which keeps for each path the number of documents the path is present in, types of values
+observed and an estimate of the number of distinct values (HyperLogLog):
+
+    catalog = SchemaCatalog()
+    catalog.update(document for _, document in inspection_store.iterate_results())
+    catalog.save("inspection-schema.pickle")
+
+    catalog.query("job_log__hwinfo")
+    catalog.query(depth=2)
+
+Paths use the same `__` separator as columns of the flattened inspection DataFrame, constant
+paths (one distinct value present in all the documents) can be excluded when flattening.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = "__"
+
+
+class HyperLogLog:
+    """Estimate number of distinct values using 2 ** p registers."""
+
+    def __init__(self, p: int = 10):
+        """Initialize empty estimator with 2 ** p registers (relative error about 1.04 / sqrt(2 ** p))."""
+        if not 4 <= p <= 16:
+            raise ValueError(f"Precision has to be between 4 and 16, got {p}")
+
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    @staticmethod
+    def _hash(value: Any) -> int:
+        # the built-in hash is randomized per process, persisted estimators have to agree across runs
+        data = f"{type(value).__name__}:{value!r}".encode("utf-8", errors="replace")
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+    def add(self, value: Any) -> None:
+        """Add the value."""
+        h = self._hash(value)
+
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Merge other estimator (of the same precision) into this one."""
+        if other.p != self.p:
+            raise ValueError("Could NOT merge estimators of different precision.")
+
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        """Estimate number of distinct values added."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+
+        if estimate <= 2.5 * m and zeros:
+            # small range correction - linear counting
+            estimate = m * np.log(m / zeros)
+
+        return int(round(estimate))
+
+
+class SchemaNode:
+    """Node of the schema trie, statistics of a single key path."""
+
+    __slots__ = ("children", "count", "types", "cardinality")
+
+    def __init__(self):
+        self.children: Dict[str, "SchemaNode"] = {}
+        self.count = 0
+        self.types: Counter = Counter()
+        self.cardinality: Optional[HyperLogLog] = None
+
+
+class SchemaCatalog:
+    """Trie of key paths with presence counts, observed types and cardinality estimates."""
+
+    def __init__(self, precision: int = 10):
+        """Initialize empty catalog, `precision` is passed to `HyperLogLog` of each leaf path."""
+        self.precision = precision
+        self.root = SchemaNode()
+        self.n_documents = 0
+
+    def add(self, document: Dict[str, Any]) -> None:
+        """Merge key paths of the document into the catalog."""
+        self.n_documents += 1
+        self.root.count += 1
+        self._add(self.root, document)
+
+    def _add(self, node: SchemaNode, obj: Dict[str, Any]) -> None:
+        for key, value in obj.items():
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = SchemaNode()
+
+            child.count += 1
+            child.types[type(value).__name__] += 1
+
+            if isinstance(value, dict):
+                self._add(child, value)
+                continue
+
+            if child.cardinality is None:
+                child.cardinality = HyperLogLog(self.precision)
+
+            if isinstance(value, list):
+                value = tuple(map(repr, value))
+
+            child.cardinality.add(value)
+
+    def update(self, documents: Iterable[Dict[str, Any]]) -> "SchemaCatalog":
+        """Merge key paths of all the documents, the documents are consumed one by one."""
+        for document in documents:
+            self.add(document)
+
+            if self.n_documents % 10000 == 0:
+                logger.info(f"Schema catalog updated with {self.n_documents} documents")
+
+        return self
+
+    @staticmethod
+    def _split(path: Union[str, Tuple[str, ...], None]) -> Tuple[str, ...]:
+        if not path:
+            return ()
+
+        if isinstance(path, str):
+            return tuple(path.strip(SEPARATOR).split(SEPARATOR))
+
+        return tuple(path)
+
+    def node(self, path: Union[str, Tuple[str, ...]]) -> Optional[SchemaNode]:
+        """Look up node of the path, the lookup is linear in the path length."""
+        node = self.root
+        for key in self._split(path):
+            node = node.children.get(key)
+            if node is None:
+                return None
+
+        return node
+
+    def __contains__(self, path: Union[str, Tuple[str, ...]]) -> bool:
+        return self.node(path) is not None
+
+    def _walk(self, node: SchemaNode, path: Tuple[str, ...], max_depth: int = None) -> Iterator[Tuple[Tuple[str, ...], SchemaNode]]:
+        yield path, node
+
+        if max_depth is not None and len(path) >= max_depth:
+            return
+
+        for key, child in node.children.items():
+            yield from self._walk(child, path + (key,), max_depth)
+
+    def iter_paths(
+        self, prefix: Union[str, Tuple[str, ...]] = None, depth: int = None
+    ) -> Iterator[Tuple[Tuple[str, ...], SchemaNode]]:
+        """Iterate over (path, node) pairs under the prefix, optionally only paths of the given depth."""
+        prefix = self._split(prefix)
+        node = self.node(prefix)
+        if node is None:
+            return
+
+        for path, child in self._walk(node, prefix, depth):
+            if path and (depth is None or len(path) == depth):
+                yield path, child
+
+    def query(self, prefix: Union[str, Tuple[str, ...]] = None, depth: int = None):
+        """Describe paths under the prefix (and/or of the given depth) as a DataFrame."""
+        import pandas as pd
+
+        rows = []
+        for path, node in self.iter_paths(prefix, depth):
+            rows.append(
+                {
+                    "path": SEPARATOR.join(path),
+                    "depth": len(path),
+                    "key": path[-1],
+                    "count": node.count,
+                    "presence": node.count / self.n_documents if self.n_documents else float("nan"),
+                    "types": dict(node.types),
+                    "cardinality": node.cardinality.count() if node.cardinality is not None else None,
+                    "children": len(node.children),
+                }
+            )
+
+        columns = ["path", "depth", "key", "count", "presence", "types", "cardinality", "children"]
+        return pd.DataFrame(rows, columns=columns)
+
+    def constant_paths(self, prefix: Union[str, Tuple[str, ...]] = None) -> List[str]:
+        """Get leaf paths present in all the documents with a single distinct value, candidates for dropping."""
+        return [
+            SEPARATOR.join(path)
+            for path, node in self.iter_paths(prefix)
+            if node.cardinality is not None and node.count == self.n_documents and node.cardinality.count() <= 1
+        ]
+
+    def diff(self, other: "SchemaCatalog"):
+        """Compare with other catalog (e.g. built for another Amun version), paths whose presence or types differ."""
+        import pandas as pd
+
+        this = self.query().set_index("path")
+        that = other.query().set_index("path")
+
+        joined = this[["presence", "types"]].join(
+            that[["presence", "types"]], how="outer", lsuffix="_self", rsuffix="_other"
+        )
+        joined[["presence_self", "presence_other"]] = joined[["presence_self", "presence_other"]].fillna(0.0)
+
+        types_differ = joined["types_self"].map(lambda t: set(t or ())) != joined["types_other"].map(
+            lambda t: set(t or ())
+        )
+        return joined[(joined["presence_self"] != joined["presence_other"]) | types_differ]
+
+    def merge(self, other: "SchemaCatalog") -> "SchemaCatalog":
+        """Merge other catalog (built e.g. from another part of the corpus) into this one."""
+        if other.precision != self.precision:
+            raise ValueError("Could NOT merge catalogs of different precision.")
+
+        def merge_nodes(node: SchemaNode, other_node: SchemaNode) -> None:
+            node.count += other_node.count
+            node.types.update(other_node.types)
+
+            if other_node.cardinality is not None:
+                if node.cardinality is None:
+                    node.cardinality = HyperLogLog(self.precision)
+                node.cardinality.merge(other_node.cardinality)
+
+            for key, other_child in other_node.children.items():
+                merge_nodes(node.children.setdefault(key, SchemaNode()), other_child)
+
+        merge_nodes(self.root, other.root)
+        self.n_documents += other.n_documents
+
+        return self
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Persist the catalog."""
+        path = Path(path)
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "SchemaCatalog":
+        """Load persisted catalog."""
+        with open(path, "rb") as f:
+            catalog = pickle.load(f)
+
+        if not isinstance(catalog, cls):
+            raise TypeError(f"File {str(path)!r} does NOT contain {cls.__name__}")
+
+        return catalog
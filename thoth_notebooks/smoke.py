@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+
+"""Smoke-test notebooks by executing them in parallel kernels.
+
+Each notebook is executed in a separate process (and kernel) with a per-notebook timeout,
+wall time, CPU time and peak memory of each cell are recorded and the slowest cells are reported:
+
+    $ python -m thoth_notebooks.smoke tests/ --fixtures tests/fixtures -j 4 --timeout 600
+
+If a fixtures directory is provided (see `thoth_notebooks.fixtures`), stores from `thoth.storages`
+are replaced by stores reading the recorded documents, so the notebooks run without network access.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+from .instrumentation import peak_rss
+
+logger = logging.getLogger(__name__)
+
+_PACKAGE_ROOT = Path(__file__).resolve().parent.parent
+
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+_SETUP_CELL = """\
+from thoth_notebooks.smoke import _setup_kernel
+_setup_kernel(get_ipython(), {records_path!r}, fixtures_dir={fixtures_dir!r})
+del _setup_kernel
+"""
+
+
+def _install_fixture_stores(fixtures_dir: str) -> None:
+    """Replace stores from thoth.storages by stores reading recorded documents."""
+    import types
+
+    from thoth_notebooks.fixtures import FIXTURE_STORE_NAMES, make_fixture_store
+
+    try:
+        import thoth.storages as storages
+    except ImportError:
+        # thoth-storages is not installed, provide a module with the fixture stores only
+        storages = types.ModuleType("thoth.storages")
+        thoth = sys.modules.setdefault("thoth", types.ModuleType("thoth"))
+        if not hasattr(thoth, "__path__"):
+            thoth.__path__ = []
+
+        thoth.storages = storages
+        sys.modules["thoth.storages"] = storages
+
+    for name in FIXTURE_STORE_NAMES:
+        setattr(storages, name, make_fixture_store(name, fixtures_dir))
+
+
+def _setup_kernel(ip, records_path: str, fixtures_dir: str = None) -> None:
+    """Register cell hooks recording resource usage into `records_path`, runs inside the kernel."""
+    if fixtures_dir:
+        _install_fixture_stores(fixtures_dir)
+
+    state: Dict[str, Any] = {"count": 0, "start": None}
+
+    def write(record):
+        # append immediately, the kernel might be killed on timeout
+        with open(records_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def pre_run_cell(info=None):
+        state["start"] = (time.perf_counter(), time.process_time(), peak_rss())
+
+        # marks the cell as running, replaced by the full record once the cell finishes
+        write({"cell": state["count"], "started_at": time.time()})
+
+    def post_run_cell(result):
+        if state["start"] is None:
+            return  # the setup cell itself
+
+        wall_start, cpu_start, peak_rss_start = state["start"]
+        rss = peak_rss()
+
+        record = {
+            "cell": state["count"],
+            "wall_time": time.perf_counter() - wall_start,
+            "cpu_time": time.process_time() - cpu_start,
+            "peak_rss": rss,
+            "peak_rss_delta": rss - peak_rss_start,
+            "success": bool(result.success),
+        }
+
+        state["count"] += 1
+        state["start"] = None
+
+        write(record)
+
+    ip.events.register("pre_run_cell", pre_run_cell)
+    ip.events.register("post_run_cell", post_run_cell)
+
+
+def _executed_cells(nb) -> list:
+    """Get indices and sources of code cells which are executed."""
+    # nbclient skips empty code cells, the records are mapped on the executed ones
+    return [
+        (idx, cell.source) for idx, cell in enumerate(nb.cells) if cell.cell_type == "code" and cell.source.strip()
+    ]
+
+
+def _read_records(records_path: str, nb) -> List[Dict[str, Any]]:
+    """Read records written by the kernel and map them on the notebook cells."""
+    code_cells = _executed_cells(nb)
+
+    try:
+        with open(records_path) as f:
+            records = {}
+            for line in f:
+                record = json.loads(line)
+                records[record["cell"]] = record
+    except FileNotFoundError:
+        return []
+
+    records = list(records.values())
+    for record in records:
+        if "started_at" in record:
+            # the cell did NOT finish (timeout), only the wall time is known
+            started_at = record.pop("started_at")
+            record.update(
+                wall_time=time.time() - started_at, cpu_time=None, peak_rss=None, peak_rss_delta=None, success=False
+            )
+
+        idx, source = code_cells[record.pop("cell")]
+        record.update(cell=idx, source=source.strip().splitlines()[0][:80])
+
+    return records
+
+
+def execute_notebook(
+    path: Union[str, Path],
+    records_path: str,
+    fixtures_dir: Union[str, Path] = None,
+    kernel_name: str = None,
+) -> Dict[str, Any]:
+    """Execute the notebook in a new kernel, per-cell statistics are appended to `records_path`."""
+    import nbformat
+
+    from nbclient import NotebookClient
+
+    path = Path(path)
+    nb = nbformat.read(str(path), as_version=4)
+
+    setup = nbformat.v4.new_code_cell(
+        _SETUP_CELL.format(
+            records_path=records_path, fixtures_dir=str(Path(fixtures_dir).resolve()) if fixtures_dir else None
+        )
+    )
+    nb.cells.insert(0, setup)
+
+    result = {"notebook": str(path), "status": "ok", "error": None}
+
+    kwargs = {"kernel_name": kernel_name} if kernel_name else {}
+    client = NotebookClient(nb, timeout=None, resources={"metadata": {"path": str(path.parent)}}, **kwargs)
+
+    start = time.monotonic()
+    try:
+        client.execute()
+    except Exception as exc:
+        message = _ANSI_ESCAPE.sub("", str(exc)).strip().splitlines() or [""]
+        result.update(status="failed", error=f"{type(exc).__name__}: {message[-1]}")
+    finally:
+        result["duration"] = time.monotonic() - start
+
+    return result
+
+
+def _run_in_subprocess(
+    path: Path, timeout: float = None, fixtures_dir: Union[str, Path] = None, kernel_name: str = None
+) -> Dict[str, Any]:
+    """Execute the notebook in a separate process, the process (and its kernel) is killed on timeout."""
+    import nbformat
+
+    fd, records_path = tempfile.mkstemp(prefix="smoke-", suffix=".jsonl")
+    os.close(fd)
+
+    cmd = [sys.executable, "-m", "thoth_notebooks.smoke", "--execute", str(path), "--records", records_path]
+    if fixtures_dir:
+        cmd += ["--fixtures", str(fixtures_dir)]
+    if kernel_name:
+        cmd += ["--kernel", kernel_name]
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(_PACKAGE_ROOT), env.get("PYTHONPATH")]))
+
+    result = {"notebook": str(path)}
+
+    start = time.monotonic()
+    try:
+        process = subprocess.run(
+            cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, timeout=timeout
+        )
+        result.update(json.loads(process.stdout.strip().splitlines()[-1]))
+    except subprocess.TimeoutExpired:
+        result.update(status="timeout", error=f"Notebook did NOT finish in {timeout}s")
+    except (IndexError, ValueError):
+        result.update(status="failed", error=process.stderr.strip()[-1000:])
+    finally:
+        result.setdefault("duration", time.monotonic() - start)
+
+        # records written so far are available even if the notebook timed out
+        result["cells"] = _read_records(records_path, nbformat.read(str(path), as_version=4))
+        os.unlink(records_path)
+
+    return result
+
+
+def run_notebooks(
+    paths: List[Union[str, Path]],
+    *,
+    max_workers: int = None,
+    timeout: float = None,
+    fixtures_dir: Union[str, Path] = None,
+    kernel_name: str = None,
+) -> List[Dict[str, Any]]:
+    """Execute notebooks in parallel, each in its own process and kernel.
+
+    :param paths: notebooks to be executed
+    :param max_workers: maximum number of notebooks executed concurrently, defaults to the number of CPUs
+    :param timeout: timeout in seconds for a single notebook
+    :param fixtures_dir: directory with recorded documents replacing the remote stores
+    :param kernel_name: kernel to be used instead of the one stated in the notebook metadata
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                _run_in_subprocess, Path(p), timeout=timeout, fixtures_dir=fixtures_dir, kernel_name=kernel_name
+            )
+            for p in paths
+        ]
+
+        return [f.result() for f in futures]
+
+
+def slowest_cells(results: List[Dict[str, Any]], top: int = 10) -> List[Dict[str, Any]]:
+    """Get the slowest cells across all the notebooks executed."""
+    cells = [dict(cell, notebook=r["notebook"]) for r in results for cell in r["cells"]]
+
+    return sorted(cells, key=lambda c: c["wall_time"], reverse=True)[:top]
+
+
+def format_report(results: List[Dict[str, Any]], top: int = 10) -> str:
+    """Format the results as a plain text report."""
+    lines = [f"{'status':8} {'duration [s]':>12}  notebook"]
+    for r in results:
+        lines.append(f"{r['status']:8} {r['duration']:12.2f}  {r['notebook']}")
+        if r["error"]:
+            lines.append(f"{'':22}{r['error']}")
+
+    lines.append("")
+    lines.append("Slowest cells:")
+    lines.append(f"{'wall [s]':>9} {'cpu [s]':>9} {'peak RSS Δ [MiB]':>17}  notebook:cell  source")
+    for c in slowest_cells(results, top=top):
+        cpu_time = f"{c['cpu_time']:9.2f}" if c["cpu_time"] is not None else f"{'-':>9}"
+        rss = f"{c['peak_rss_delta'] / 2 ** 20:17.1f}" if c["peak_rss_delta"] is not None else f"{'-':>17}"
+
+        lines.append(f"{c['wall_time']:9.2f} {cpu_time} {rss}  {Path(c['notebook']).name}:{c['cell']}  {c['source']}")
+
+    return "\n".join(lines)
+
+
+def cli(argv: List[str] = None) -> int:
+    """Run the smoke tests from the command line."""
+    parser = argparse.ArgumentParser(prog="python -m thoth_notebooks.smoke", description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", help="Notebooks or directories with notebooks to be executed.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of notebooks executed concurrently.")
+    parser.add_argument("-t", "--timeout", type=float, default=None, help="Timeout for a single notebook [s].")
+    parser.add_argument("-k", "--kernel", default=None, help="Name of the kernel to execute notebooks with.")
+    parser.add_argument("--fixtures", default=None, help="Directory with recorded documents.")
+    parser.add_argument("--top", type=int, default=10, help="Number of the slowest cells reported.")
+    parser.add_argument("-o", "--output", default=None, help="Store the results as JSON into the given file.")
+    # used by worker processes
+    parser.add_argument("--execute", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--records", default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args(argv)
+
+    if args.execute:
+        result = execute_notebook(
+            args.execute, args.records, fixtures_dir=args.fixtures, kernel_name=args.kernel
+        )
+        print(json.dumps(result))
+        return 0
+
+    logging.basicConfig(level=logging.INFO)
+
+    paths = []
+    for p in map(Path, args.paths):
+        paths.extend(sorted(p.glob("*.ipynb")) if p.is_dir() else [p])
+
+    if not paths:
+        # nothing to smoke-test is NOT a failure, e.g. a checkout without any test notebooks
+        logger.warning(f"No notebooks found in {', '.join(args.paths) or 'the given paths'}, nothing to execute.")
+        return 0
+
+    results = run_notebooks(
+        paths, max_workers=args.jobs, timeout=args.timeout, fixtures_dir=args.fixtures, kernel_name=args.kernel
+    )
+
+    print(format_report(results, top=args.top))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    return 0 if all(r["status"] == "ok" for r in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(cli())
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+
+"""Memory-mapped columnar snapshots of processed inspection DataFrames.
+
+A snapshot is a directory with one NumPy `.npy` file per column (and per index level)
+and a `meta.json` file describing how to assemble them back into a DataFrame:
+
+    snapshot/
+        meta.json
+        column-0.npy
+        column-1.codes.npy
+        column-1.categories.npy
+        index-0.npy
+        ...
+
+Numeric, boolean, datetime and timedelta columns are stored as they are, string columns
+are dictionary encoded (integer codes + unique values) and loaded back as categoricals.
+Both are mapped into memory with `np.load(..., mmap_mode=...)`, so loading a snapshot
+does not read the data and kernels on the same host share the pages through the page cache.
+
+Columns holding arbitrary Python objects (lists, dicts) can NOT be memory-mapped, these
+are pickled and loaded eagerly.
+"""
+
+import json
+import logging
+import pickle
+import shutil
+
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+_META_FILE = "meta.json"
+
+# dtype kinds which can be stored and memory-mapped as they are
+_PLAIN_KINDS = "biufcmM"
+
+
+def _is_string_column(values: pd.Series) -> bool:
+    """Check whether the object column holds only strings (or missing values)."""
+    return values.map(lambda v: isinstance(v, str) or v is None or v != v).all()
+
+
+def _save_array(directory: Path, name: str, array: np.ndarray) -> str:
+    """Save array as `.npy` file and return the file name."""
+    file_name = f"{name}.npy"
+    np.save(directory / file_name, np.ascontiguousarray(array), allow_pickle=False)
+
+    return file_name
+
+
+def _save_values(directory: Path, name: str, values: pd.Series) -> Dict[str, Any]:
+    """Save column values and return the column description."""
+    dtype = values.dtype
+    description = {"name": name}
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = dtype.categories
+        if categories.dtype.kind == "O":
+            categories = categories.astype(str)
+
+        description.update(
+            kind="category",
+            codes=_save_array(directory, f"{name}.codes", values.cat.codes.to_numpy()),
+            categories=_save_array(directory, f"{name}.categories", categories.to_numpy()),
+            ordered=bool(dtype.ordered),
+        )
+
+    elif isinstance(dtype, pd.DatetimeTZDtype):
+        description.update(
+            kind="datetimetz",
+            values=_save_array(
+                directory, name, values.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy()
+            ),
+            tz=str(dtype.tz),
+        )
+
+    elif isinstance(dtype, np.dtype) and dtype.kind in _PLAIN_KINDS:
+        description.update(kind="plain", values=_save_array(directory, name, values.to_numpy()))
+
+    elif (dtype == object and _is_string_column(values)) or (
+        dtype != object and pd.api.types.is_string_dtype(dtype)
+    ):
+        # object columns of strings as well as pandas string dtypes (the default for strings in pandas >= 3)
+        values = values.astype("category")
+
+        description.update(
+            kind="string",
+            codes=_save_array(directory, f"{name}.codes", values.cat.codes.to_numpy()),
+            categories=_save_array(
+                directory, f"{name}.categories", values.cat.categories.to_numpy(dtype=str)
+            ),
+            ordered=False,
+        )
+
+    else:
+        file_name = f"{name}.pkl"
+        with open(directory / file_name, "wb") as f:
+            pickle.dump(values.to_numpy(), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        logger.debug(f"Column '{values.name}' can NOT be memory-mapped, pickled instead.")
+        description.update(kind="object", values=file_name)
+
+    return description
+
+
+def _load_values(directory: Path, description: Dict[str, Any], mmap_mode: str = None, as_category: bool = True):
+    """Load column values given the column description."""
+    kind = description["kind"]
+
+    if kind == "plain":
+        return np.load(directory / description["values"], mmap_mode=mmap_mode)
+
+    if kind == "datetimetz":
+        values = np.load(directory / description["values"], mmap_mode=mmap_mode)
+        return pd.DatetimeIndex(values).tz_localize("UTC").tz_convert(description["tz"])
+
+    if kind in ("category", "string"):
+        codes = np.load(directory / description["codes"], mmap_mode=mmap_mode)
+        # categories are small compared to the data, load them eagerly
+        categories = np.load(directory / description["categories"])
+
+        values = pd.Categorical.from_codes(
+            codes, categories=categories, ordered=description["ordered"], validate=False
+        )
+        if kind == "string" and not as_category:
+            values = np.asarray(values, dtype=object)
+
+        return values
+
+    if kind == "object":
+        with open(directory / description["values"], "rb") as f:
+            return pickle.load(f)
+
+    raise ValueError(f"Unknown column kind in snapshot: {kind!r}")
+
+
+def save_snapshot(
+    inspection_df: pd.DataFrame, path: Union[str, Path], overwrite: bool = False
+) -> Path:
+    """Save (processed) inspection DataFrame as a memory-mappable snapshot directory.
+
+    :param inspection_df: DataFrame to be saved, possibly with a MultiIndex as returned by `query_inspection_dataframe`
+    :param path: snapshot directory, created if it does not exist
+    :param overwrite: whether to overwrite an existing snapshot
+    """
+    path = Path(path)
+    if (path / _META_FILE).exists():
+        if not overwrite:
+            raise FileExistsError(f"Snapshot already exists: {str(path)!r}")
+
+        shutil.rmtree(path)
+
+    path.mkdir(parents=True, exist_ok=True)
+
+    if not inspection_df.columns.is_unique:
+        raise ValueError("Can NOT snapshot DataFrame with duplicate column names.")
+
+    columns: List[Dict[str, Any]] = []
+    for idx, col in enumerate(inspection_df.columns):
+        description = _save_values(path, f"column-{idx}", inspection_df[col])
+        description["label"] = col
+        columns.append(description)
+
+    index = inspection_df.index
+    index_meta: Dict[str, Any] = {"names": list(index.names)}
+
+    if isinstance(index, pd.RangeIndex):
+        index_meta.update(kind="range", start=index.start, stop=index.stop, step=index.step)
+    else:
+        levels = []
+        for idx in range(index.nlevels):
+            values = pd.Series(index.get_level_values(idx))
+            levels.append(_save_values(path, f"index-{idx}", values))
+
+        index_meta.update(kind="multi" if isinstance(index, pd.MultiIndex) else "plain", levels=levels)
+
+    meta = {
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "length": len(inspection_df),
+        "columns": columns,
+        "column_names": list(inspection_df.columns.names),
+        "index": index_meta,
+    }
+
+    # write meta as the last step, a snapshot without meta is considered incomplete
+    with open(path / _META_FILE, "w") as f:
+        json.dump(meta, f, indent=2, default=str)
+
+    return path
+
+
+def load_snapshot(
+    path: Union[str, Path],
+    columns: List[str] = None,
+    mmap_mode: str = "r",
+    as_category: bool = True,
+) -> pd.DataFrame:
+    """Load inspection DataFrame from the snapshot directory without copying the data.
+
+    :param path: snapshot directory as created by `save_snapshot`
+    :param columns: load only the given columns (all by default)
+    :param mmap_mode: mode passed to `np.load`, `"r"` shares read-only pages between processes,
+        `"c"` allows in-place modifications (copy-on-write), `None` reads the data into memory
+    :param as_category: return string columns as categoricals (zero-copy) instead of object arrays
+    """
+    path = Path(path)
+
+    try:
+        with open(path / _META_FILE) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No snapshot found in: {str(path)!r}")
+
+    if meta["version"] != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported snapshot version {meta['version']}, expected {SNAPSHOT_FORMAT_VERSION}"
+        )
+
+    descriptions = meta["columns"]
+    for d in descriptions:
+        # JSON turns tuple labels (of MultiIndex columns) into lists
+        if isinstance(d["label"], list):
+            d["label"] = tuple(d["label"])
+
+    if columns is not None:
+        available = {d["label"]: d for d in descriptions}
+
+        missing = set(columns) - set(available)
+        if missing:
+            raise KeyError(f"Columns NOT found in snapshot: {sorted(missing)}")
+
+        descriptions = [available[col] for col in columns]
+
+    data = {
+        d["label"]: _load_values(path, d, mmap_mode=mmap_mode, as_category=as_category)
+        for d in descriptions
+    }
+
+    index_meta = meta["index"]
+    if index_meta["kind"] == "range":
+        index = pd.RangeIndex(index_meta["start"], index_meta["stop"], index_meta["step"], name=index_meta["names"][0])
+    else:
+        levels = [
+            _load_values(path, d, mmap_mode=mmap_mode, as_category=as_category)
+            for d in index_meta["levels"]
+        ]
+
+        if index_meta["kind"] == "multi":
+            index = pd.MultiIndex.from_arrays(levels, names=index_meta["names"])
+        else:
+            index = pd.Index(levels[0], name=index_meta["names"][0])
+
+    column_index = None
+    if data and all(isinstance(label, tuple) for label in data):
+        column_index = pd.MultiIndex.from_tuples(list(data), names=meta.get("column_names"))
+
+    # copy=False keeps separate (memory-mapped) blocks instead of consolidating them
+    df = pd.DataFrame(data, index=index, columns=list(data), copy=False)
+    if column_index is not None:
+        df.columns = column_index
+
+    return df
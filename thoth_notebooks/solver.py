@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""Retrieval of solver documents used for the solver error classification.
+
+Documents are retrieved concurrently, filtered by a predicate while streaming and
+the retrieval stops as soon as the requested number of documents is gathered:
+
+    documents = retrieve_documents(
+        solvers,
+        predicate=has_single_provided_package_version_error,
+        count=2000,
+        document_ids=all_solver_documents,
+        cache=DocumentCache(".cache/solver"),
+    )
+
+Documents retrieved once are kept in the local cache and are NOT downloaded again on subsequent runs.
+Use `thoth_notebooks.fixtures.FixtureStore` to stand in for the remote store in tests.
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+def has_single_provided_package_version_error(document: Dict[str, Any]) -> bool:
+    """Check whether the solver document has exactly one error and it is the `is_provided_package_version` one."""
+    errors = document["result"]["errors"]
+
+    return len(errors) == 1 and errors[0].get("is_provided_package_version") is True
+
+
+class DocumentCache:
+    """Local directory cache of retrieved documents, one JSON file per document."""
+
+    def __init__(self, cache_dir: Union[str, Path]):
+        """Initialize cache storing documents in `cache_dir`."""
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, document_id: str) -> Path:
+        return self.cache_dir / f"{document_id}.json"
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Get the document from the cache, None if the document is not cached."""
+        try:
+            with open(self._path(document_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, document_id: str, document: Dict[str, Any]) -> None:
+        """Store the document in the cache."""
+        # write atomically, concurrent readers must never see a partial document
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(document, f)
+            os.replace(tmp_path, self._path(document_id))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+def _retrieve(store, document_id: str, cache: Optional[DocumentCache]) -> Dict[str, Any]:
+    """Retrieve the document from the cache or from the store."""
+    document = cache.get(document_id) if cache is not None else None
+
+    if document is None:
+        document = store.retrieve_document(document_id)
+
+        if cache is not None:
+            cache.put(document_id, document)
+
+    return document
+
+
+def iter_documents(
+    store,
+    predicate: Callable[[Dict[str, Any]], bool] = None,
+    document_ids: Iterable[str] = None,
+    *,
+    max_workers: int = 16,
+    cache: DocumentCache = None,
+    rejected: Set[str] = None,
+) -> Iterable[Tuple[str, Dict[str, Any]]]:
+    """Retrieve documents concurrently and yield those matching the predicate.
+
+    Documents are yielded in the order of `document_ids` (the store listing by default), so
+    the result does NOT depend on the order in which the concurrent retrievals finish.
+    At most `2 * max_workers` retrievals are in flight, stop iterating to stop the retrieval.
+
+    :param store: connected store from `thoth.storages` (or a fixture store)
+    :param predicate: function deciding whether the document should be yielded, all documents by default
+    :param document_ids: IDs of the documents to consider
+    :param max_workers: number of concurrent retrievals
+    :param cache: local cache of the retrieved documents
+    :param rejected: set collecting IDs of documents NOT matching the predicate, e.g. to skip them next time
+    """
+    document_ids = iter(document_ids if document_ids is not None else store.get_document_listing())
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+
+        def submit() -> bool:
+            document_id = next(document_ids, None)
+            if document_id is None:
+                return False
+
+            in_flight.append((document_id, executor.submit(_retrieve, store, document_id, cache)))
+            return True
+
+        for _ in range(2 * max_workers):
+            if not submit():
+                break
+
+        try:
+            while in_flight:
+                document_id, future = in_flight.popleft()
+                document = future.result()
+                submit()
+
+                if predicate is None or predicate(document):
+                    yield document_id, document
+                elif rejected is not None:
+                    rejected.add(document_id)
+        finally:
+            # early termination, do NOT wait for retrievals which are not needed anymore
+            for _, future in in_flight:
+                future.cancel()
+
+
+def retrieve_documents(
+    store,
+    predicate: Callable[[Dict[str, Any]], bool] = None,
+    count: int = None,
+    document_ids: Iterable[str] = None,
+    *,
+    max_workers: int = 16,
+    cache: DocumentCache = None,
+    log_every: int = 100,
+) -> List[Dict[str, Any]]:
+    """Retrieve up to `count` documents matching the predicate, see `iter_documents` for the parameters.
+
+    :param log_every: report progress each time the given number of documents matching the predicate is retrieved
+    """
+    documents = []
+
+    for _, document in iter_documents(
+        store, predicate, document_ids=document_ids, max_workers=max_workers, cache=cache
+    ):
+        documents.append(document)
+
+        if log_every and len(documents) % log_every == 0:
+            logger.info(f"Documents retrieved {len(documents)}/{count or '?'}")
+
+        if count is not None and len(documents) >= count:
+            break
+
+    logger.info(f"Retrieved {len(documents)} documents matching the predicate")
+
+    return documents
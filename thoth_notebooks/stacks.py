@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+
+"""Sparse representation of software stacks of inspections.
+
+Locked requirements of inspections are turned into a SciPy CSR matrix of inspections x
+(package name, package version) together with lookup tables, instead of a column per package
+field in a wide DataFrame:
+
+    stacks = PackageMatrix.from_documents(inspection_store.iterate_results())
+
+    stacks.features                  # (package name, package version) of each column
+    stacks.stack_hashes()            # identical software stacks share the hash
+    stacks.similar("inspection-...") # inspections with the most similar software stacks
+    stacks.most_similar(top=5)       # the most similar software stacks of all the inspections
+
+    durations = create_duration_dataframe(df).job_duration
+    stacks.feature_effects(durations.set_axis(df.inspection_id))
+
+Matrices can be also built from the flattened inspection DataFrame (see `PackageMatrix.from_dataframe`).
+"""
+
+import hashlib
+import logging
+
+from typing import Any, Dict, Iterable, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .graph import canonicalize_name
+from .graph import inspection_packages
+
+logger = logging.getLogger(__name__)
+
+
+def _locked_packages(document: Dict[str, Any]) -> Iterable[Tuple[str, str]]:
+    """Get (package name, package version) pairs of the default locked requirements of the inspection document."""
+    specification = document.get("specification") or {}
+    default = ((specification.get("python") or {}).get("requirements_locked") or {}).get("default") or {}
+
+    for package_name, entry in default.items():
+        version = entry.get("version") if isinstance(entry, dict) else entry
+        if version is None:
+            continue
+
+        yield package_name, str(version).lstrip("=")
+
+
+def _feature_hashes(names: Iterable[str]) -> np.ndarray:
+    """Hash feature names into stable 64-bit integers."""
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "big") for name in names],
+        dtype=np.uint64,
+    )
+
+
+class PackageMatrix:
+    """Inspections x (package name, package version) incidence matrix in CSR format."""
+
+    def __init__(self, matrix, index: pd.Index, features: pd.DataFrame):
+        """Initialize the matrix, use `from_documents` or `from_dataframe` to build one.
+
+        :param matrix: scipy.sparse matrix with a row per inspection and a column per package version
+        :param index: inspection IDs, labels of rows
+        :param features: DataFrame with `package_name` and `package_version` columns, labels of columns
+        """
+        if matrix.shape != (len(index), len(features)):
+            raise ValueError(f"Matrix of shape {matrix.shape} does NOT match {len(index)} rows x {len(features)} columns")
+
+        self.matrix = matrix.tocsr()
+        self.index = pd.Index(index, name="inspection_id")
+        self.features = features.reset_index(drop=True)
+        self._positions = pd.Series(np.arange(len(self.index)), index=self.index)
+
+    @classmethod
+    def from_pairs(cls, inspection_ids: Iterable[str], package_names: Iterable[str], package_versions: Iterable[str]):
+        """Build the matrix from (inspection ID, package name, package version) triples."""
+        from scipy import sparse
+
+        pairs = pd.DataFrame(
+            {
+                "inspection_id": pd.Categorical(inspection_ids),
+                "package_name": canonicalize_name(pd.Series(list(package_names), dtype=object)),
+                "package_version": pd.Series(list(package_versions), dtype=object),
+            }
+        )
+
+        rows = pairs["inspection_id"].cat.codes.to_numpy()
+        columns, features = pd.MultiIndex.from_frame(pairs[["package_name", "package_version"]]).factorize()
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(pairs), dtype=np.float32), (rows, columns)),
+            shape=(len(pairs["inspection_id"].cat.categories), len(features)),
+        )
+        # the same package version listed twice in a stack is counted once
+        matrix.data[:] = 1
+
+        features = features.to_frame(index=False)
+        features.columns = ["package_name", "package_version"]
+
+        return cls(matrix, pairs["inspection_id"].cat.categories, features)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Tuple[str, Dict[str, Any]]]) -> "PackageMatrix":
+        """Build the matrix from (inspection ID, inspection document) pairs, e.g. `inspection_store.iterate_results()`.
+
+        Documents are consumed one by one, only the package pairs are kept.
+        """
+        inspection_ids, names, versions = [], [], []
+        for inspection_id, document in documents:
+            for package_name, package_version in _locked_packages(document):
+                inspection_ids.append(inspection_id)
+                names.append(package_name)
+                versions.append(package_version)
+
+        return cls.from_pairs(inspection_ids, names, versions)
+
+    @classmethod
+    def from_dataframe(cls, inspection_df: pd.DataFrame, id_column: str = "inspection_id") -> "PackageMatrix":
+        """Build the matrix from the flattened inspection DataFrame (`process_inspection_results`)."""
+        flat = inspection_df.reset_index(drop=True)
+        packages = inspection_packages(flat.filter(like="requirements_locked"))
+        inspection_ids = flat[id_column].to_numpy()[packages.index.to_numpy()]
+
+        return cls.from_pairs(inspection_ids, packages["package_name"], packages["package_version"])
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.matrix.shape
+
+    def __repr__(self) -> str:
+        return f"<PackageMatrix {self.shape[0]} inspections x {self.shape[1]} package versions, nnz={self.matrix.nnz}>"
+
+    def feature(self, package_name: str, package_version: str = None) -> np.ndarray:
+        """Get columns of the package (version), all versions of the package if no version is given."""
+        selected = self.features["package_name"] == canonicalize_name(pd.Series([package_name]))[0]
+        if package_version is not None:
+            selected &= self.features["package_version"] == package_version.lstrip("=")
+
+        return np.flatnonzero(selected.to_numpy())
+
+    def has(self, package_name: str, package_version: str = None) -> pd.Series:
+        """Check which inspections have the package (version) installed."""
+        columns = self.feature(package_name, package_version)
+        present = np.asarray(self.matrix[:, columns].sum(axis=1)).ravel() > 0
+
+        return pd.Series(present, index=self.index, name=package_name)
+
+    def stack(self, inspection_id: str) -> pd.DataFrame:
+        """Get packages installed in the software stack of the inspection."""
+        row = self.matrix[self._positions[inspection_id]]
+
+        return self.features.iloc[row.indices].sort_values("package_name").reset_index(drop=True)
+
+    def stack_hashes(self) -> pd.Series:
+        """Hash software stacks, the hash does NOT depend on the order of packages nor on other inspections.
+
+        The hash of a stack is the sum (modulo 2 ** 64) of hashes of "name==version" of packages installed.
+        """
+        names = self.features["package_name"].astype(str) + "==" + self.features["package_version"].astype(str)
+        hashes = _feature_hashes(names)
+
+        # row sums of feature hashes, computed directly from the CSR structure
+        csr = self.matrix
+        values = hashes[csr.indices]
+        stack_hashes = np.zeros(len(self.index), dtype=np.uint64)
+        non_empty = np.diff(csr.indptr) > 0
+        if values.size:
+            with np.errstate(over="ignore"):
+                stack_hashes[non_empty] = np.add.reduceat(values, csr.indptr[:-1][non_empty])
+
+        return pd.Series([f"{h:016x}" for h in stack_hashes], index=self.index, name="stack_hash")
+
+    def _rows(self, inspection_ids: Union[str, Iterable[str]]) -> np.ndarray:
+        if isinstance(inspection_ids, str):
+            inspection_ids = [inspection_ids]
+
+        return self._positions.loc[list(inspection_ids)].to_numpy()
+
+    def similarity(self, inspection_ids: Union[str, Iterable[str]]) -> np.ndarray:
+        """Compute Jaccard similarity of software stacks of the given inspections to all the inspections.
+
+        The result is dense, use `most_similar` to compare all the inspections with each other.
+
+        :return: dense array of shape (len(inspection_ids), number of inspections)
+        """
+        rows = self._rows(inspection_ids)
+
+        intersection = (self.matrix[rows] @ self.matrix.T).toarray()
+        sizes = np.diff(self.matrix.indptr)
+        union = sizes[rows][:, None] + sizes[None, :] - intersection
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(union > 0, intersection / union, 1.0)
+
+    def most_similar(
+        self, top: int = 10, inspection_ids: Union[str, Iterable[str]] = None, chunk_size: int = 1024
+    ) -> pd.DataFrame:
+        """Find the most similar software stacks (Jaccard similarity) of each inspection, top `top` per inspection.
+
+        Only inspections sharing at least one package version are compared. Rows are processed in chunks of
+        `chunk_size` and only the top pairs are kept, so no dense inspections x inspections array is created.
+
+        :param top: number of the most similar inspections reported for each inspection
+        :param inspection_ids: inspections to find similar stacks for, all the inspections if not given
+        :param chunk_size: number of inspections compared with all the inspections at once
+        :return: DataFrame with `inspection_id`, `similar_id` and `similarity` columns
+        """
+        rows = self._rows(inspection_ids) if inspection_ids is not None else np.arange(len(self.index))
+        sizes = np.diff(self.matrix.indptr)
+        transposed = self.matrix.T.tocsr()
+
+        chunks = []
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start : start + chunk_size]
+            intersection = (self.matrix[chunk] @ transposed).tocoo()
+
+            selected = chunk[intersection.row] != intersection.col
+            row, target, shared = intersection.row[selected], intersection.col[selected], intersection.data[selected]
+            source = chunk[row]
+            similarity = shared / (sizes[source] + sizes[target] - shared)
+
+            order = np.lexsort((target, -similarity, row))
+            row, source, target, similarity = row[order], source[order], target[order], similarity[order]
+
+            # rank of each pair within its row, pairs are sorted by similarity in each row
+            first = np.r_[True, row[1:] != row[:-1]]
+            starts = np.maximum.accumulate(np.where(first, np.arange(len(row)), 0))
+            kept = np.arange(len(row)) - starts < top
+
+            chunks.append((source[kept], target[kept], similarity[kept]))
+
+        source, target, similarity = (np.concatenate(parts) for parts in zip(*chunks)) if chunks else ([], [], [])
+
+        return pd.DataFrame(
+            {
+                "inspection_id": self.index[np.asarray(source, dtype=np.int64)],
+                "similar_id": self.index[np.asarray(target, dtype=np.int64)],
+                "similarity": np.asarray(similarity, dtype=np.float64),
+            }
+        )
+
+    def similar(self, inspection_id: str, top: int = 10) -> pd.Series:
+        """Find inspections with the most similar software stack (Jaccard similarity)."""
+        similar = self.most_similar(top, inspection_ids=[inspection_id])
+
+        return similar.set_index("similar_id")["similarity"].rename_axis("inspection_id")
+
+    def feature_effects(self, y: pd.Series, min_count: int = 2, alpha: float = 1.0) -> pd.DataFrame:
+        """Estimate how package versions relate to the (duration) values of inspections.
+
+        For each package version, mean of values of inspections with and without the package version are
+        compared (Welch's t-test) and the coefficient of a ridge regression of the values on all the package
+        versions at once is reported. Everything is computed on the sparse matrix.
+
+        :param y: values indexed by inspection ID, e.g. job duration
+        :param min_count: package versions installed in fewer inspections are NOT reported
+        :param alpha: regularization strength of the ridge regression
+        """
+        from scipy.sparse.linalg import lsqr
+        from scipy.special import stdtr
+
+        y = y.reindex(self.index).astype(np.float64)
+        present = y.notna().to_numpy()
+        if not present.any():
+            raise ValueError("No values found for inspections of the matrix.")
+
+        matrix = self.matrix[present]
+        values = y.to_numpy()[present]
+        n = len(values)
+
+        count = np.asarray(matrix.sum(axis=0)).ravel()
+        sums = matrix.T @ values
+        squares = matrix.T @ (values ** 2)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_with = sums / count
+            mean_without = (values.sum() - sums) / (n - count)
+
+            var_with = (squares - count * mean_with ** 2) / (count - 1)
+            var_without = ((values ** 2).sum() - squares - (n - count) * mean_without ** 2) / (n - count - 1)
+
+            se2_with = var_with / count
+            se2_without = var_without / (n - count)
+            t = (mean_with - mean_without) / np.sqrt(se2_with + se2_without)
+            df = (se2_with + se2_without) ** 2 / (
+                se2_with ** 2 / (count - 1) + se2_without ** 2 / (n - count - 1)
+            )
+
+        p_value = 2 * stdtr(df, -np.abs(t))
+
+        coefficient = lsqr(matrix, values - values.mean(), damp=np.sqrt(alpha))[0]
+
+        result = self.features.assign(
+            count=count.astype(np.int64),
+            mean_with=mean_with,
+            mean_without=mean_without,
+            difference=mean_with - mean_without,
+            t=t,
+            p_value=p_value,
+            coefficient=coefficient,
+        )
+        result = result[(result["count"] >= min_count) & (result["count"] < n)]
+
+        return result.sort_values("p_value").reset_index(drop=True)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Convert to a sparse DataFrame with (package name, package version) columns."""
+        columns = pd.MultiIndex.from_frame(self.features)
+
+        return pd.DataFrame.sparse.from_spmatrix(self.matrix, index=self.index, columns=columns)
+
+
+def stack_groups(stacks: PackageMatrix) -> pd.DataFrame:
+    """Group inspections by identical software stacks, number of inspections and packages of each stack."""
+    hashes = stacks.stack_hashes()
+    sizes = pd.Series(np.diff(stacks.matrix.indptr), index=stacks.index)
+
+    return (
+        pd.DataFrame({"stack_hash": hashes, "packages": sizes})
+        .groupby("stack_hash")
+        .agg(inspections=("packages", "size"), packages=("packages", "first"))
+        .sort_values("inspections", ascending=False)
+    )